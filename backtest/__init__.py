@@ -1,7 +1,81 @@
 """
 回测模块
+
+各子模块按需导入（PEP 562），`import backtest` 不会加载 vectorbt 等依赖；
+进程池子进程只导入实际用到的子模块
 """
-from .engine import BacktestEngine
-from .metrics import PerformanceMetrics
+import importlib
+
+# 导出名称 -> 所在模块
+_LAZY_EXPORTS = {
+    "BacktestEngine": ".engine",
+    "format_comparison": ".engine",
+    "BacktestResult": ".result",
+    "PerformanceMetrics": ".metrics",
+    "ParallelExecutor": ".parallel",
+    "SharedOHLCV": ".parallel",
+    "RunLog": ".run_log",
+    "WalkForwardEngine": ".walk_forward",
+    "CombinatorialPurgedCV": ".validation",
+    "pareto_front": ".pareto",
+    "StrategyEnsemble": ".ensemble",
+    "strategy_returns": ".ensemble",
+    "simulate_multi_asset": ".multi_asset",
+    "MonteCarloAnalyzer": ".monte_carlo",
+    "EventDrivenSimulator": ".simulator",
+    "ResultCache": ".cache",
+    "StageProfiler": ".profiling",
+    "StreamingBacktest": ".streaming",
+    "IncrementalBacktest": ".incremental",
+    "GridSearchOptimizer": ".optimizers",
+    "RandomSearchOptimizer": ".optimizers",
+    "BayesianOptimizer": ".optimizers",
+    "SuccessiveHalvingOptimizer": ".optimizers",
+    "HyperbandOptimizer": ".optimizers",
+    "GeneticOptimizer": ".optimizers",
+    "compare_to_grid": ".optimizers",
+    "benchmark_optimizers": ".optimizers",
+}
+
+__all__ = [
+    "BacktestEngine",
+    "format_comparison",
+    "BacktestResult",
+    "PerformanceMetrics",
+    "ParallelExecutor",
+    "SharedOHLCV",
+    "RunLog",
+    "WalkForwardEngine",
+    "CombinatorialPurgedCV",
+    "pareto_front",
+    "StrategyEnsemble",
+    "strategy_returns",
+    "simulate_multi_asset",
+    "MonteCarloAnalyzer",
+    "EventDrivenSimulator",
+    "ResultCache",
+    "StageProfiler",
+    "StreamingBacktest",
+    "IncrementalBacktest",
+    "GridSearchOptimizer",
+    "RandomSearchOptimizer",
+    "BayesianOptimizer",
+    "SuccessiveHalvingOptimizer",
+    "HyperbandOptimizer",
+    "GeneticOptimizer",
+    "compare_to_grid",
+    "benchmark_optimizers",
+]
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        module = importlib.import_module(_LAZY_EXPORTS[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
-__all__ = ["BacktestEngine", "PerformanceMetrics"]
\ No newline at end of file
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
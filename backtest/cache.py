@@ -0,0 +1,186 @@
+"""
+回测结果缓存
+以 (数据指纹, 策略类, 参数, 资金/手续费/滑点/频率) 为键缓存回测结果、信号和权益曲线；
+内存一级 + 磁盘一级，均按最近最少使用（LRU）淘汰
+"""
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import pandas as pd
+import config
+
+
+def data_fingerprint(df: pd.DataFrame) -> str:
+    """
+    价格数据的内容指纹（列名、索引和全部数值）
+
+    相同内容的两份 DataFrame 指纹相同；任何一根K线变化，指纹都会变化。
+    """
+    digest = hashlib.sha1()
+    digest.update(json.dumps([str(c) for c in df.columns]).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def result_key(df: pd.DataFrame, strategy, engine, price_col: str = 'close', fingerprint: Optional[str] = None) -> str:
+    """
+    回测结果的缓存键
+
+    Args:
+        df: 价格数据
+        strategy: 策略对象（以类的导入路径和 get_params() 识别）
+        engine: BacktestEngine（资金、手续费、滑点、频率）
+        price_col: 价格列名
+        fingerprint: 预先计算的数据指纹（同一份数据多次回测时可复用）
+    """
+    cls = type(strategy)
+    payload = {
+        'data': fingerprint or data_fingerprint(df),
+        'strategy': f"{cls.__module__}:{cls.__qualname__}",
+        'params': strategy.get_params(),
+        'initial_capital': engine.initial_capital,
+        'fees': engine.fees,
+        'slippage': engine.slippage,
+        'freq': engine.freq,
+        'price_col': price_col,
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(encoded).hexdigest()
+
+
+class ResultCache:
+    """
+    两级 LRU 回测结果缓存
+
+    缓存条目是一个字典:
+        {'results': 回测结果字典, 'entries': 入场信号, 'exits': 出场信号, 'equity': 权益数组, 'trades': 交易记录}
+
+    内存级保存最近 max_entries 个条目；磁盘级每个条目一个 pickle 文件，
+    读取时更新文件修改时间，总大小超过 max_disk_mb 时删除最久未使用的文件。
+    disk_dir=None 时只使用内存缓存。可以在多个线程之间共用（内存级和磁盘淘汰加锁）。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = config.RESULT_CACHE_MEMORY_ENTRIES,
+        disk_dir: Optional[Path] = config.RESULT_CACHE_DIR,
+        max_disk_mb: float = config.RESULT_CACHE_DISK_MB
+    ):
+        """
+        初始化
+
+        Args:
+            max_entries: 内存中最多保留的条目数
+            disk_dir: 磁盘缓存目录，None 表示不使用磁盘缓存
+            max_disk_mb: 磁盘缓存上限（MB）
+        """
+        self.max_entries = max_entries
+        self.disk_dir = Path(disk_dir) if disk_dir is not None else None
+        self.max_disk_bytes = int(max_disk_mb * 1024 ** 2)
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存条目，不存在时返回 None"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        path = self._path(key)
+        if path is not None and path.exists():
+            try:
+                with open(path, 'rb') as f:
+                    entry = pickle.load(f)
+                os.utime(path)  # 更新最近使用时间
+            except Exception as e:
+                print(f"⚠️  读取回测缓存失败，忽略: {e}")
+                path.unlink(missing_ok=True)
+            else:
+                self._remember(key, entry)
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                return entry
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, entry: Dict[str, Any]):
+        """写入缓存条目（内存，并在启用时写入磁盘）"""
+        self._remember(key, entry)
+
+        path = self._path(key)
+        if path is None:
+            return
+        # 先写临时文件再替换，避免中断时留下半个文件
+        fd, tmp = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except Exception as e:
+            print(f"⚠️  写入回测缓存失败: {e}")
+            Path(tmp).unlink(missing_ok=True)
+            return
+        self._evict_disk()
+
+    def clear(self, disk: bool = True):
+        """清空缓存"""
+        with self._lock:
+            self._memory.clear()
+        if disk and self.disk_dir is not None:
+            for path in self.disk_dir.glob('*.pkl'):
+                path.unlink(missing_ok=True)
+        print("🗑️  回测缓存已清空")
+
+    def __contains__(self, key: str) -> bool:
+        path = self._path(key)
+        return key in self._memory or (path is not None and path.exists())
+
+    def __len__(self):
+        return len(self._memory)
+
+    def _remember(self, key: str, entry: Dict[str, Any]):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> Optional[Path]:
+        return self.disk_dir / f"{key}.pkl" if self.disk_dir is not None else None
+
+    def _evict_disk(self):
+        """磁盘缓存超过上限时，按修改时间删除最久未使用的文件"""
+        with self._lock:
+            files = []
+            for p in self.disk_dir.glob('*.pkl'):
+                try:
+                    files.append((p, p.stat()))
+                except FileNotFoundError:  # 其他进程刚删除
+                    continue
+            total = sum(st.st_size for _, st in files)
+            if total <= self.max_disk_bytes:
+                return
+            for path, st in sorted(files, key=lambda item: item[1].st_mtime):
+                path.unlink(missing_ok=True)
+                total -= st.st_size
+                if total <= self.max_disk_bytes:
+                    break
@@ -2,15 +2,61 @@
 回测引擎
 负责执行策略回测和生成回测报告
 """
+import gc
+import os
+import threading
 import pandas as pd
 import numpy as np
 import vectorbt as vbt
-from typing import Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Callable
 from strategies.base import BaseStrategy
+from strategies.indicators import IndicatorCache
 from .metrics import PerformanceMetrics
+from .profiling import StageProfiler, optional_stage
+from .result import BacktestResult
 import config
 
 
+# 参数优化结果表中记录的指标
+OPTIMIZE_METRICS = ['sharpe_ratio', 'total_return', 'max_drawdown', 'win_rate', 'total_trades']
+
+# 多策略对比表中的指标及其显示格式
+COMPARISON_METRICS = [
+    'total_return', 'annual_return', 'sharpe_ratio', 'max_drawdown',
+    'win_rate', 'total_trades', 'profit_factor'
+]
+COMPARISON_LABELS = {
+    'strategy_name': ('策略名称', '{}'),
+    'total_return': ('总收益率', '{:.2%}'),
+    'annual_return': ('年化收益', '{:.2%}'),
+    'sharpe_ratio': ('夏普比率', '{:.2f}'),
+    'max_drawdown': ('最大回撤', '{:.2%}'),
+    'win_rate': ('胜率', '{:.2%}'),
+    'total_trades': ('交易次数', '{:d}'),
+    'profit_factor': ('盈亏比', '{:.2f}'),
+}
+
+
+def format_comparison(comparison_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    把数值对比表格式化为中文列名和百分比字符串（仅用于显示）
+    
+    Args:
+        comparison_df: run_multiple_strategies 返回的数值对比表
+        
+    Returns:
+        格式化后的 DataFrame
+    """
+    display = {}
+    for col, (label, fmt) in COMPARISON_LABELS.items():
+        if col in comparison_df.columns:
+            display[label] = [fmt.format(v) for v in comparison_df[col]]
+    return pd.DataFrame(display, index=comparison_df.index)
+
+
 class BacktestEngine:
     """
     回测引擎
@@ -22,7 +68,10 @@ class BacktestEngine:
         self,
         initial_capital: float = config.INITIAL_CAPITAL,
         fees: float = config.TRADING_FEE,
-        slippage: float = config.SLIPPAGE
+        slippage: float = config.SLIPPAGE,
+        freq: str = config.BACKTEST_FREQ,
+        cache=None,
+        profile_memory: bool = False
     ):
         """
         初始化回测引擎
@@ -31,21 +80,58 @@ class BacktestEngine:
             initial_capital: 初始资金
             fees: 交易手续费（百分比，如0.001表示0.1%）
             slippage: 滑点（百分比）
+            freq: K线频率，如 '1H'、'4H'、'1D'（用于年化指标）
+            cache: 回测结果缓存（backtest.cache.ResultCache），None 表示不缓存
+            profile_memory: 阶段剖析时是否用 tracemalloc 记录峰值内存（较慢）
         """
         self.initial_capital = initial_capital
         self.fees = fees
         self.slippage = slippage
+        self.freq = freq
+        self.cache = cache
+        self.profile_memory = profile_memory
+        self.profiler = None
+        # 兼容接口 run() / get_results() / get_signals() / get_portfolio() 使用的最近一次回测
         self.portfolio = None
         self.results = {}
+        self.signals = None
+        self._lock = threading.RLock()
+    
+    def execute(
+        self,
+        df: pd.DataFrame,
+        strategy: BaseStrategy,
+        price_col: str = 'close',
+        simulator=None,
+        verbose: bool = False
+    ) -> BacktestResult:
+        """
+        运行回测并返回结果（无状态：不修改引擎，可在多个线程或 asyncio 任务中共用同一个引擎）
+        
+        Args:
+            df: 包含价格数据的DataFrame
+            strategy: 交易策略对象
+            price_col: 价格列名
+            simulator: EventDrivenSimulator 时用事件驱动模拟器（Numba 内核释放 GIL，适合多线程），
+                None 时用 vectorbt
+            verbose: 是否打印结果
+            
+        Returns:
+            只读的 BacktestResult（'profile' 为各阶段的耗时统计，见 backtest/profiling.py）
+        """
+        return self._execute(df, strategy, price_col, simulator, verbose)[0]
     
     def run(
         self,
         df: pd.DataFrame,
         strategy: BaseStrategy,
         price_col: str = 'close'
-    ) -> Dict[str, Any]:
+    ) -> BacktestResult:
         """
-        运行回测
+        运行回测并打印结果（兼容接口）
+        
+        结果同时保存到 self.results / self.signals，供 get_results() / get_signals() / get_portfolio() 读取；
+        多个线程共用一个引擎时这些属性只反映最后完成的一次回测，请直接使用 execute() 的返回值。
         
         Args:
             df: 包含价格数据的DataFrame
@@ -53,191 +139,1111 @@ class BacktestEngine:
             price_col: 价格列名
             
         Returns:
-            回测结果字典
+            BacktestResult（可按字典读取指标，'profile' 为各阶段的耗时统计，见 backtest/profiling.py；
+            只保存权益、交易记录和指标，不持有 vectorbt 组合）
         """
-        print(f"\n{'='*60}")
-        print(f"🚀 开始回测: {strategy.name}")
-        print(f"{'='*60}")
+        results, signals, profiler = self._execute(df, strategy, price_col, verbose=True)
+        with self._lock:
+            self._set_last(results, signals)
+            self.profiler = profiler
+        return results
+    
+    def run_batch(
+        self,
+        df: pd.DataFrame,
+        strategies: list,
+        price_col: str = 'close',
+        simulator=None,
+        n_threads: Optional[int] = None
+    ) -> List[BacktestResult]:
+        """
+        用线程池回测多个策略（共享同一份数据，不复制到子进程）
         
-        # 生成交易信号
-        entries, exits = strategy.generate_signals(df)
+        NumPy 的数组运算和 nogil 的 Numba 内核（EventDrivenSimulator）执行时释放 GIL，
+        多个回测可以在多核上同时进行；vectorbt 的模拟内核不释放 GIL，只有信号和指标计算能重叠，
+        大量组合时优先用 optimize_parameters 的向量化或进程池模式。
         
-        # 使用vectorbt进行回测
-        self.portfolio = vbt.Portfolio.from_signals(
-            close=df[price_col],
-            entries=entries,
-            exits=exits,
-            init_cash=self.initial_capital,
-            fees=self.fees,
-            slippage=self.slippage,
-            freq='1H'  # 假设是1小时数据，根据实际调整
-        )
+        Args:
+            df: 价格数据
+            strategies: 策略列表
+            price_col: 价格列名
+            simulator: 传给 execute() 的事件驱动模拟器，None 时用 vectorbt
+            n_threads: 线程数，None 表示CPU核数
+            
+        Returns:
+            与 strategies 逐个对应的 BacktestResult 列表
+        """
+        n_threads = n_threads or os.cpu_count() or 1
+        print(f"🧵 线程池回测 {len(strategies)} 个策略（{n_threads} 个线程）")
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            return list(executor.map(
+                lambda strategy: self.execute(df, strategy, price_col, simulator), strategies
+            ))
+    
+    def _execute(self, df, strategy, price_col='close', simulator=None, verbose=False):
+        """execute() 的实现，另外返回原始信号和剖析器（供 run() 兼容接口使用）"""
+        profiler = StageProfiler(memory=self.profile_memory)
+        
+        if verbose:
+            print(f"\n{'='*60}")
+            print(f"🚀 开始回测: {strategy.name}")
+            print(f"{'='*60}")
+        
+        # 命中缓存时直接复用结果和信号，组合对象在需要时再用缓存的信号重建
+        # （事件驱动模拟的订单参数不在缓存键中，不使用缓存）
+        key = None
+        if self.cache is not None and simulator is None:
+            from .cache import result_key
+            with profiler.stage('cache_lookup'):
+                key = result_key(df, strategy, self, price_col)
+                entry = self.cache.get(key)
+            if entry is not None and 'trades' in entry:
+                if verbose:
+                    print("📦 命中回测缓存")
+                    with profiler.stage('print'):
+                        self._print_results(entry['results'])
+                metrics = dict(entry['results'], profile=profiler.summary())
+                signals = (entry['entries'], entry['exits'])
+                results = BacktestResult.from_arrays(
+                    metrics, entry['equity'], entry['trades'],
+                    df, *signals, price_col, self._sim_kwargs()
+                )
+                return results, signals, profiler
+        
+        # 生成交易信号
+        with profiler.stage('generate_signals'):
+            entries, exits = strategy.generate_signals(df)
         
-        # 计算性能指标
-        metrics = PerformanceMetrics(self.portfolio, df)
-        results = metrics.calculate_all()
+        if simulator is not None:
+            with profiler.stage('simulate'):
+                sim = simulator.run(df, entries, exits)
+            with profiler.stage('metrics'):
+                metrics = simulator.metrics(sim, df).iloc[0].to_dict()
+                metrics['avg_trade_duration'] = pd.Timedelta(metrics['avg_trade_duration'])
+            equity, trades, sim_kwargs = sim['value'].iloc[:, 0].to_numpy(), sim['trades'], None
+        else:
+            # 使用vectorbt进行回测
+            with profiler.stage('simulate'):
+                portfolio = self._simulate(df[price_col], entries, exits)
+            
+            # 计算性能指标
+            with profiler.stage('metrics'):
+                metrics = PerformanceMetrics(portfolio, df).calculate_all()
+            # 只保留权益和交易记录，组合对象在需要时再用信号重建
+            equity, trades, sim_kwargs = portfolio.value().to_numpy(), portfolio.trades.values.copy(), self._sim_kwargs()
+            del portfolio
         
         # 添加策略信息
-        results['strategy_name'] = strategy.name
-        results['strategy_params'] = strategy.get_params()
-        results['initial_capital'] = self.initial_capital
-        results['fees'] = self.fees
+        metrics['strategy_name'] = strategy.name
+        metrics['strategy_params'] = strategy.get_params()
+        metrics['initial_capital'] = self.initial_capital
+        metrics['fees'] = self.fees
         
         # 添加交易统计
-        results['total_signals'] = {
+        metrics['total_signals'] = {
             'entries': int(entries.sum()),
             'exits': int(exits.sum())
         }
         
-        self.results = results
+        if key is not None:
+            with profiler.stage('cache_store'):
+                self.cache.put(key, {
+                    'results': dict(metrics),
+                    'entries': entries,
+                    'exits': exits,
+                    'equity': equity,
+                    'trades': trades,
+                })
         
         # 打印结果
-        self._print_results()
+        if verbose:
+            with profiler.stage('print'):
+                self._print_results(metrics)
         
-        return results
+        metrics['profile'] = profiler.summary()
+        results = BacktestResult.from_arrays(metrics, equity, trades, df, entries, exits, price_col, sim_kwargs)
+        return results, (entries, exits), profiler
+    
+    def _set_last(self, results, signals=None, portfolio=None):
+        """保存最近一次回测，供兼容接口 get_results() / get_signals() / get_portfolio() 读取"""
+        with self._lock:
+            self.results = results
+            self.signals = signals
+            self.portfolio = portfolio
     
     def run_multiple_strategies(
         self,
         df: pd.DataFrame,
         strategies: list,
-        price_col: str = 'close'
+        price_col: str = 'close',
+        batch_size: int = config.OPTIMIZE_BATCH_SIZE,
+        verbose: bool = True
     ) -> pd.DataFrame:
         """
         运行多个策略的回测并对比
         
+        所有策略的信号按列堆叠成宽表，一次模拟完成（每列是一个独立组合）；
+        同一个支持批量的策略类的多个实例共享指标计算。
+        
         Args:
             df: 价格数据
             strategies: 策略列表
             price_col: 价格列名
+            batch_size: 每次模拟的最大策略数（控制内存）
+            verbose: 是否打印格式化的对比表
             
         Returns:
-            对比结果DataFrame
+            对比结果DataFrame（数值列，第 i 行对应 strategies[i]），
+            列为 strategy_name、strategy_params 和 COMPARISON_METRICS
         """
-        results_list = []
+        entries, exits = self._stack_signals(df, strategies)
         
-        for strategy in strategies:
-            result = self.run(df, strategy, price_col)
-            results_list.append({
-                '策略名称': result['strategy_name'],
-                '总收益率': f"{result['total_return']:.2%}",
-                '年化收益': f"{result['annual_return']:.2%}",
-                '夏普比率': f"{result['sharpe_ratio']:.2f}",
-                '最大回撤': f"{result['max_drawdown']:.2%}",
-                '胜率': f"{result['win_rate']:.2%}",
-                '交易次数': result['total_trades'],
-                '盈亏比': f"{result['profit_factor']:.2f}"
-            })
+        frames = []
+        for start in range(0, len(strategies), batch_size):
+            portfolio = self._simulate(
+                df[price_col],
+                entries.iloc[:, start:start + batch_size],
+                exits.iloc[:, start:start + batch_size]
+            )
+            frames.append(PerformanceMetrics(portfolio, df).calculate_columns()[COMPARISON_METRICS])
+            del portfolio
+            gc.collect()  # 及时释放上一批的宽表数组（见 evaluate_batch）
         
-        comparison_df = pd.DataFrame(results_list)
+        comparison_df = pd.concat(frames, ignore_index=True)
+        comparison_df.insert(0, 'strategy_name', [s.name for s in strategies])
+        comparison_df.insert(1, 'strategy_params', [dict(s.get_params()) for s in strategies])
         
-        print(f"\n{'='*80}")
-        print("📊 策略对比结果")
-        print(f"{'='*80}")
-        print(comparison_df.to_string(index=False))
+        if verbose:
+            print(f"\n{'='*80}")
+            print(f"📊 策略对比结果（{len(strategies)} 个策略）")
+            print(f"{'='*80}")
+            print(format_comparison(comparison_df).to_string(index=False))
         
         return comparison_df
     
+    def _stack_signals(self, df: pd.DataFrame, strategies: list):
+        """
+        生成所有策略的信号并按列堆叠
+        
+        Returns:
+            (entries, exits) 宽表，第 i 列对应 strategies[i]
+        """
+        n = len(strategies)
+        entries = np.zeros((len(df), n), dtype=bool)
+        exits = np.zeros((len(df), n), dtype=bool)
+        
+        # 支持批量的同类策略一起生成信号，共享一个指标缓存
+        groups: Dict[type, List[int]] = {}
+        for i, strategy in enumerate(strategies):
+            if type(strategy).supports_batch:
+                groups.setdefault(type(strategy), []).append(i)
+            else:
+                e, x = strategy.generate_signals(df)
+                entries[:, i] = np.asarray(e, dtype=bool)
+                exits[:, i] = np.asarray(x, dtype=bool)
+        
+        cache = IndicatorCache(df)
+        for strategy_class, positions in groups.items():
+            param_list = [strategies[i].get_params() for i in positions]
+            e, x = strategy_class.generate_signals_batch(df, param_list, cache=cache)
+            entries[:, positions] = e.to_numpy(dtype=bool)
+            exits[:, positions] = x.to_numpy(dtype=bool)
+        
+        return BaseStrategy._signal_frames(df, entries, exits)
+    
+    def cost_sensitivity(
+        self,
+        df: pd.DataFrame,
+        strategy: BaseStrategy,
+        fees: Optional[list] = None,
+        slippage: Optional[list] = None,
+        price_col: str = 'close',
+        simulator=None,
+        verbose: bool = True
+    ) -> pd.DataFrame:
+        """
+        成本敏感性：同一个策略在手续费 x 滑点网格上的表现
+        
+        信号只生成一次，复制成网格大小的宽表，手续费和滑点作为每列一个值广播，
+        整个网格一次模拟完成。
+        
+        Args:
+            df: 价格数据
+            strategy: 交易策略对象
+            fees: 手续费率列表，None 表示 config.SENSITIVITY_FEES
+            slippage: 滑点列表，None 表示 config.SENSITIVITY_SLIPPAGE
+            price_col: 价格列名
+            simulator: EventDrivenSimulator 时用事件驱动模拟器（保留其止损等订单参数，
+                手续费和滑点由网格替换），None 时用 vectorbt
+            verbose: 是否打印夏普和总收益的敏感性曲面
+            
+        Returns:
+            每个 (fees, slippage) 组合一行：fees、slippage 列 + COMPARISON_METRICS；
+            results.pivot(index='fees', columns='slippage', values='sharpe_ratio') 即为曲面
+        """
+        fee_grid, slippage_grid = np.meshgrid(
+            np.asarray(config.SENSITIVITY_FEES if fees is None else fees, dtype=float),
+            np.asarray(config.SENSITIVITY_SLIPPAGE if slippage is None else slippage, dtype=float),
+            indexing='ij'
+        )
+        fee_grid, slippage_grid = fee_grid.ravel(), slippage_grid.ravel()
+        n = len(fee_grid)
+        
+        entries, exits = strategy.generate_signals(df)
+        entries, exits = BaseStrategy._signal_frames(
+            df,
+            np.repeat(np.asarray(entries, dtype=bool)[:, None], n, axis=1),
+            np.repeat(np.asarray(exits, dtype=bool)[:, None], n, axis=1)
+        )
+        
+        if simulator is not None:
+            from .simulator import EventDrivenSimulator
+            simulator = EventDrivenSimulator(**{**vars(simulator), 'fees': fee_grid, 'slippage': slippage_grid})
+            sim = simulator.run(df, entries, exits)
+            metrics_df = simulator.metrics(sim, df)
+        else:
+            # (1, n) 的行向量沿K线方向广播，每列一个费率
+            portfolio = vbt.Portfolio.from_signals(
+                close=df[price_col],
+                entries=entries,
+                exits=exits,
+                **{**self._sim_kwargs(), 'fees': fee_grid[None, :], 'slippage': slippage_grid[None, :]}
+            )
+            metrics_df = PerformanceMetrics(portfolio, df).calculate_columns()
+            del portfolio
+            gc.collect()  # 及时释放宽表数组（见 evaluate_batch）
+        
+        results = metrics_df[COMPARISON_METRICS].reset_index(drop=True)
+        results.insert(0, 'fees', fee_grid)
+        results.insert(1, 'slippage', slippage_grid)
+        
+        if verbose:
+            print(f"\n{'='*60}")
+            print(f"💸 成本敏感性: {strategy.name}（{n} 种手续费 x 滑点组合）")
+            print(f"{'='*60}")
+            for metric in ('sharpe_ratio', 'total_return'):
+                label, fmt = COMPARISON_LABELS[metric]
+                surface = results.pivot(index='fees', columns='slippage', values=metric)
+                print(f"\n{label}（行: 手续费，列: 滑点）")
+                print(surface.to_string(float_format=fmt.format))
+        
+        return results
+    
+    def run_event_driven(
+        self,
+        df: pd.DataFrame,
+        strategy: BaseStrategy,
+        **order_kwargs
+    ) -> Dict[str, Any]:
+        """
+        用事件驱动模拟器回测（止损/止盈/移动止损/限价入场按盘中高低点成交）
+        
+        Args:
+            df: 包含 OHLC 的价格数据
+            strategy: 交易策略对象
+            **order_kwargs: EventDrivenSimulator 的参数，如 sl_stop=0.02, tp_stop=0.04,
+                tsl_stop=0.03, limit_offset=0.005, entry_timing='next_open'
+            
+        Returns:
+            回测结果字典（另含 'trades' 交易记录和 'exit_reasons' 出场原因统计）
+        """
+        from .simulator import EventDrivenSimulator, EXIT_REASONS
+        
+        print(f"\n{'='*60}")
+        print(f"🚀 开始事件驱动回测: {strategy.name}")
+        print(f"{'='*60}")
+        
+        simulator = EventDrivenSimulator.from_engine(self, **order_kwargs)
+        result = self.execute(df, strategy, simulator=simulator)
+        
+        results = result.to_dict()
+        results['order_params'] = order_kwargs
+        results['trades'] = result.trades
+        reasons = pd.Series(result.trades['exit_reason']).map(EXIT_REASONS)
+        results['exit_reasons'] = reasons.value_counts().to_dict()
+        
+        self._set_last(results)
+        self._print_results(results)
+        print(f"🚪 出场原因: {results['exit_reasons']}")
+        
+        return results
+    
+    def run_streaming(
+        self,
+        df: pd.DataFrame,
+        strategy: BaseStrategy,
+        block_size: int = config.STREAM_BLOCK_SIZE,
+        output_dir=None,
+        warmup: Optional[int] = None,
+        **order_kwargs
+    ) -> Dict[str, Any]:
+        """
+        分块回测（超长序列）：按 block_size 根K线一块模拟，资金和持仓状态跨块传递，
+        权益曲线和交易记录逐块写入 output_dir，结果与一次模拟完全一致
+        
+        Args:
+            df: 包含 OHLC 的价格数据
+            strategy: 交易策略对象
+            block_size: 每块的K线数
+            output_dir: 输出目录，None 表示 results/streaming/<时间>
+            warmup: 按块生成信号时向前多取的K线数，None 表示在整段数据上生成信号（见 StreamingBacktest.run_strategy）
+            **order_kwargs: EventDrivenSimulator 的参数（止损、限价等）
+            
+        Returns:
+            回测结果字典（另含 'output_dir'，可用 backtest.streaming.load_equity / load_trades 读取）
+        """
+        from .streaming import StreamingBacktest
+        
+        print(f"\n{'='*60}")
+        print(f"🚀 开始分块回测: {strategy.name}（{len(df):,} 根K线，每块 {block_size:,} 根）")
+        print(f"{'='*60}")
+        
+        stream = StreamingBacktest.from_engine(self, block_size=block_size, **order_kwargs)
+        output = stream.run_strategy(df, strategy, output_dir, warmup)
+        
+        results = output['metrics'].iloc[0].to_dict()
+        results['avg_trade_duration'] = pd.Timedelta(results['avg_trade_duration'])
+        results['strategy_name'] = strategy.name
+        results['strategy_params'] = strategy.get_params()
+        results['initial_capital'] = self.initial_capital
+        results['fees'] = self.fees
+        results['order_params'] = order_kwargs
+        results['output_dir'] = output['output_dir']
+        
+        self._set_last(results)
+        self._print_results(results)
+        print(f"💾 权益曲线和交易记录已写入: {output['output_dir']}")
+        
+        return results
+    
+    def run_incremental(
+        self,
+        df: pd.DataFrame,
+        strategy: BaseStrategy,
+        state_dir=None,
+        symbol: Optional[str] = None,
+        **order_kwargs
+    ) -> Dict[str, Any]:
+        """
+        增量回测：第一次在完整数据上回测并保存状态，之后只模拟上次之后新增的K线
+        
+        策略支持增量信号（supports_incremental）时指标也只计算新K线，否则在整段数据上重新生成信号。
+        结果与用事件驱动模拟器在完整数据上重新回测一致。
+        
+        Args:
+            df: 价格数据（每次传入最新的完整数据或只传新K线均可）
+            strategy: 交易策略对象
+            state_dir: 状态目录，None 表示按数据、策略、参数和引擎配置自动生成（results/incremental/ 下）
+            symbol: 交易对名称，用于区分不同数据的状态（保存在状态中，继续回测时检查）；
+                    None 时用第一根K线识别数据，此时每次都需要传入从头开始的完整数据
+            **order_kwargs: EventDrivenSimulator 的参数（止损、限价等）
+            
+        Returns:
+            回测结果字典（另含 'state_dir' 和 'new_bars'）
+        """
+        from .simulator import EventDrivenSimulator
+        from .incremental import IncrementalBacktest, first_bar_fingerprint, state_dir_for
+        
+        simulator = EventDrivenSimulator.from_engine(self, **order_kwargs)
+        if state_dir is None:
+            data_id = symbol if symbol is not None else first_bar_fingerprint(df)
+            state_dir = state_dir_for(strategy, simulator, data_id)
+        state_dir = Path(state_dir)
+        
+        print(f"\n{'='*60}")
+        if IncrementalBacktest.exists(state_dir):
+            backtest = IncrementalBacktest.load(state_dir)
+            if (type(backtest.strategy) is not type(strategy)
+                    or backtest.strategy.get_params() != strategy.get_params()
+                    or vars(backtest.simulator) != vars(simulator)):
+                raise ValueError(f"{state_dir} 中保存的策略或回测配置与本次不同")
+            if getattr(backtest, 'symbol', None) != symbol:
+                raise ValueError(f"{state_dir} 中保存的交易对 {getattr(backtest, 'symbol', None)!r} 与本次的 {symbol!r} 不同")
+            n_before = backtest.n_bars
+            print(f"⏩ 增量回测: {strategy.name}（已有 {n_before:,} 根K线）")
+            print(f"{'='*60}")
+            results = backtest.extend(df)
+            new_bars = backtest.n_bars - n_before
+            print(f"新增 {new_bars} 根K线")
+        else:
+            print(f"🚀 开始回测并保存增量状态: {strategy.name}")
+            print(f"{'='*60}")
+            backtest = IncrementalBacktest.create(state_dir, df, strategy, simulator, symbol=symbol)
+            results = backtest.metrics()
+            new_bars = backtest.n_bars
+        
+        results['strategy_name'] = strategy.name
+        results['strategy_params'] = strategy.get_params()
+        results['initial_capital'] = self.initial_capital
+        results['fees'] = self.fees
+        results['order_params'] = order_kwargs
+        results['state_dir'] = state_dir
+        results['new_bars'] = new_bars
+        
+        self._set_last(results)
+        self._print_results(results)
+        
+        return results
+    
+    def run_multi_asset(
+        self,
+        data: Dict[str, pd.DataFrame],
+        strategy: BaseStrategy,
+        allocation='equal',
+        price_col: str = 'close'
+    ) -> Dict[str, Any]:
+        """
+        多资产组合回测：所有交易对共享同一资金池，一次模拟完成
+
+        Args:
+            data: {交易对: 价格数据}（如 DataFetcher.fetch_multiple_symbols 的返回值）
+            strategy: 交易策略对象（对每个交易对分别生成信号）
+            allocation: 分配规则 'equal' / 'active'，或 {交易对: 权重}，或权重面板 DataFrame
+            price_col: 价格列名
+
+        Returns:
+            回测结果字典（组合指标 + 'assets' 各交易对统计）
+        """
+        from .multi_asset import align_panels, signal_panels, simulate_multi_asset, asset_breakdown
+
+        print(f"\n{'='*60}")
+        print(f"🚀 开始多资产回测: {strategy.name}（{len(data)} 个交易对）")
+        print(f"{'='*60}")
+
+        close, valid = align_panels(data, price_col)
+        entries, exits = signal_panels(data, strategy, close, valid)
+
+        portfolio = simulate_multi_asset(
+            close, entries, exits,
+            allocation=allocation,
+            init_cash=self.initial_capital,
+            fees=self.fees,
+            slippage=self.slippage,
+            freq=self.freq
+        )
+
+        df = pd.DataFrame({'timestamp': close.index, price_col: close.mean(axis=1).to_numpy()})
+        results = PerformanceMetrics(portfolio, df).calculate_all()
+        results['strategy_name'] = strategy.name
+        results['strategy_params'] = strategy.get_params()
+        results['initial_capital'] = self.initial_capital
+        results['fees'] = self.fees
+        results['allocation'] = allocation if isinstance(allocation, str) else 'custom'
+        results['symbols'] = list(close.columns)
+        results['total_signals'] = {
+            'entries': int(entries.to_numpy().sum()),
+            'exits': int(exits.to_numpy().sum())
+        }
+        results['assets'] = asset_breakdown(portfolio, close.columns)
+
+        self._set_last(results, portfolio=portfolio)
+        self._print_results(results)
+        print("📋 各交易对统计:")
+        print(results['assets'].to_string(float_format=lambda v: f"{v:.4f}"))
+
+        return results
+
     def optimize_parameters(
         self,
         df: pd.DataFrame,
         strategy_class,
         param_ranges: Dict[str, list],
-        price_col: str = 'close'
+        price_col: str = 'close',
+        vectorized: Optional[bool] = None,
+        batch_size: int = config.OPTIMIZE_BATCH_SIZE,
+        n_jobs: int = 1,
+        optimizer=None,
+        run_id: Optional[str] = None,
+        run_log=None
     ):
         """
         参数优化
         
+        向量化模式下，整批参数组合的信号被拼成宽表，一次 from_signals 调用完成模拟，
+        指标按列计算；否则逐个组合回测（n_jobs != 1 时用进程池并行）。
+        传入 optimizer 时改用对应的搜索算法（见 backtest/optimizers.py）。
+        
         Args:
             df: 价格数据
             strategy_class: 策略类
             param_ranges: 参数范围字典，如 {'fast_window': [10, 20, 30], 'slow_window': [50, 60, 70]}
             price_col: 价格列名
+            vectorized: 是否使用宽表批量模拟，None 表示策略支持批量信号时自动启用
+            batch_size: 向量化模式下每次模拟的参数组合数
+            n_jobs: 逐个回测时的进程数，1 表示串行，-1 表示使用全部CPU
+            optimizer: 搜索算法，如 RandomSearchOptimizer(budget=50)，None 表示网格搜索
+            run_id: 运行ID。指定后每个组合的结果都会写入运行日志，
+                    中断后用相同的 run_id 重新运行会跳过已完成的组合
+            run_log: RunLog 对象，None 表示使用默认的 results/optimization_runs.sqlite
             
         Returns:
-            最优参数和结果
+            最优参数和结果（最优结果的 'profile' 为本次优化所有组合累计的阶段耗时，
+            逐条事件保存在 self.profiler 中，可用 self.profiler.to_chrome_trace(path) 导出）
         """
+        if optimizer is not None:
+            return optimizer.optimize(self, df, strategy_class, param_ranges, price_col)
+        
         print(f"\n{'='*60}")
         print("🔍 开始参数优化...")
         print(f"{'='*60}")
         
-        from itertools import product
-        
         # 生成所有参数组合
         param_names = list(param_ranges.keys())
         param_values = list(param_ranges.values())
-        combinations = list(product(*param_values))
+        param_list = [dict(zip(param_names, combo)) for combo in product(*param_values)]
         
-        best_sharpe = -np.inf
+        if vectorized is None:
+            vectorized = getattr(strategy_class, 'supports_batch', False)
+        
+        print(f"总共 {len(param_list)} 种参数组合需要测试\n")
+        
+        # 断点续跑：跳过运行日志中已完成的组合
+        log = None
+        on_records = None
+        pending = param_list
+        if run_id is not None:
+            from .cache import data_fingerprint
+            from .parallel import strategy_path
+            from .run_log import RunLog, param_hash
+            log = run_log or RunLog()
+            settings = {**self._engine_kwargs(), 'price_col': price_col}
+            settings.pop('profile_memory')
+            try:
+                log.start_run(run_id, strategy_path(strategy_class), param_ranges,
+                              data=data_fingerprint(df), settings=settings)
+            except ValueError:
+                if run_log is None:
+                    log.close()
+                raise
+            completed = log.load(run_id)
+            hashes = [param_hash(params) for params in param_list]
+            pending = [params for params, h in zip(param_list, hashes) if h not in completed]
+            print(f"运行 {run_id}: 已完成 {len(param_list) - len(pending)} 个组合，本次需要测试 {len(pending)} 个\n")
+            on_records = lambda records: log.append(run_id, records, param_names)
+        
+        profiler = StageProfiler(memory=self.profile_memory)
+        try:
+            if vectorized:
+                results_list = self._optimize_vectorized(
+                    df, strategy_class, pending, price_col, batch_size, on_records, profiler
+                )
+            elif n_jobs != 1:
+                results_list = self._optimize_parallel(
+                    df, strategy_class, pending, price_col, n_jobs, on_records, profiler
+                )
+            else:
+                results_list = self._optimize_serial(df, strategy_class, pending, price_col, on_records, profiler)
+        except KeyboardInterrupt:
+            if log is not None:
+                print(f"\n⏸️  已中断，已完成的结果保存在运行日志中，使用 run_id={run_id!r} 重新运行即可继续")
+            raise
+        finally:
+            with self._lock:
+                self.profiler = profiler
+            if log is not None and run_log is None:
+                log.close()
+        
+        if run_id is not None:
+            # 合并之前已完成的结果，保持参数组合的原始顺序
+            new = {param_hash({k: r[k] for k in param_names}): r for r in results_list}
+            results_list = []
+            for params, h in zip(param_list, hashes):
+                if h in new:
+                    results_list.append(new[h])
+                elif h in completed:
+                    # 旧版本写入的记录可能缺少后来新增的指标
+                    results_list.append({**params, **{k: completed[h].get(k, np.nan) for k in OPTIMIZE_METRICS}})
+        
+        # 结果汇总（与逐个回测一致：夏普相同时取先出现的组合；没有交易或夏普无效的组合排在最后）
+        from .optimizers import objective_scores
+        
+        results_df = pd.DataFrame(results_list, columns=param_names + OPTIMIZE_METRICS)
         best_params = None
         best_result = None
+        best_sharpe = -np.inf
         
-        results_list = []
+        scores = objective_scores(results_df, 'sharpe_ratio')
+        if np.isfinite(scores).any():
+            best_idx = int(np.argmax(scores))
+            best_sharpe = scores[best_idx]
+            best_params = {k: results_list[best_idx][k] for k in param_names}
+            best_result = self._evaluate_params(df, strategy_class, best_params, price_col)
+            best_result['profile'] = profiler.summary()
+        elif len(scores) > 0:
+            print("⚠️  没有任何参数组合产生交易且夏普比率有效，无法选出最优参数")
         
-        print(f"总共 {len(combinations)} 种参数组合需要测试\n")
+        results_df = results_df.iloc[np.argsort(-scores, kind='stable')]
         
-        for i, combo in enumerate(combinations, 1):
-            # 创建参数字典
-            params = dict(zip(param_names, combo))
+        print(f"\n{'='*60}")
+        print("✅ 优化完成")
+        print(f"{'='*60}")
+        print(f"最优参数: {best_params}")
+        print(f"最优夏普比率: {best_sharpe:.2f}")
+        print(f"\nTop 5 参数组合:")
+        print(results_df.head().to_string())
+        profiler.print_summary(f"阶段耗时（{len(pending)} 个组合累计）")
+        
+        return best_params, best_result, results_df
+    
+    def optimize_pareto(
+        self,
+        df: pd.DataFrame,
+        strategy_class,
+        param_ranges: Dict[str, list],
+        objectives: Optional[Dict[str, str]] = None,
+        price_col: str = 'close',
+        batch_size: int = config.OPTIMIZE_BATCH_SIZE,
+        n_jobs: int = 1
+    ):
+        """
+        多目标参数优化：评估整个网格，返回非支配解（Pareto 前沿）
+        
+        Args:
+            df: 价格数据
+            strategy_class: 策略类
+            param_ranges: 参数范围字典
+            objectives: {指标名: 'max' 或 'min'}（指标需在 OPTIMIZE_METRICS 中），
+                默认夏普越大越好、最大回撤和交易次数越小越好（见 backtest/pareto.py）
+            price_col: 价格列名
+            batch_size: 向量化模式下每次模拟的参数组合数
+            n_jobs: 不支持批量信号的策略逐个回测时的进程数
             
-            # 创建策略
-            strategy = strategy_class(**params)
+        Returns:
+            (前沿 DataFrame（另含 crowding_distance 列）, 全部结果 DataFrame)
+        """
+        from .pareto import PARETO_OBJECTIVES, pareto_front
+        
+        objectives = objectives or PARETO_OBJECTIVES
+        param_names = list(param_ranges.keys())
+        param_list = [dict(zip(param_names, combo)) for combo in product(*param_ranges.values())]
+        
+        print(f"\n{'='*60}")
+        print(f"🎯 多目标参数优化: {', '.join(f'{k}({v})' for k, v in objectives.items())}")
+        print(f"{'='*60}")
+        print(f"总共 {len(param_list)} 种参数组合需要测试\n")
+        
+        results_df = self.evaluate_params(
+            df, strategy_class, param_list, price_col, n_jobs=n_jobs, batch_size=batch_size
+        )
+        front = pareto_front(results_df, objectives)
+        
+        print(f"✅ Pareto 前沿: {len(front)} / {len(results_df)} 个组合")
+        print(front.to_string())
+        
+        return front, results_df
+    
+    def optimize_families(
+        self,
+        df: pd.DataFrame,
+        families: List[tuple],
+        price_col: str = 'close',
+        objective: str = 'sharpe_ratio',
+        direction: Optional[str] = None,
+        batch_size: int = config.OPTIMIZE_BATCH_SIZE,
+        n_jobs: int = 1,
+        top_n: int = 10
+    ) -> pd.DataFrame:
+        """
+        多个策略族的参数搜索，在同一份数据上一次完成并输出统一排名
+        
+        串行时所有策略族共用一个指标缓存（如 MACD 和 MACD 高级策略族的同一组 MACD 参数只算一次）；
+        n_jobs != 1 时所有策略族提交到同一个进程池，价格数据只放入共享内存一次，
+        每个子进程的指标缓存在策略族之间共享。
+        
+        Args:
+            df: 价格数据
+            families: [(策略类, 参数范围字典), ...]，如 [(EMACrossStrategy, {...}), (RSIStrategy, {...})]
+            price_col: 价格列名
+            objective: 排名使用的指标（OPTIMIZE_METRICS 之一）
+            direction: 'max'（越大越好）或 'min'（越小越好），None 表示 max_drawdown 取 'min'，其余取 'max'
+            batch_size: 支持批量信号的策略每次模拟的参数组合数
+            n_jobs: 进程数，1 表示串行，-1 表示使用全部CPU
+            top_n: 打印的排名条数
             
-            # 运行回测
+        Returns:
+            排行榜 DataFrame：rank、strategy（显示名称）、strategy_class、params（参数字典）+ OPTIMIZE_METRICS，
+            按 objective 从好到差排序（没有交易或指标无效的组合排在最后）
+        """
+        from .optimizers import objective_scores
+        
+        if objective not in OPTIMIZE_METRICS:
+            raise ValueError(f"objective 必须是 {OPTIMIZE_METRICS} 之一: {objective}")
+        direction = direction or ('min' if objective == 'max_drawdown' else 'max')
+        if direction not in ('max', 'min'):
+            raise ValueError(f"目标方向只能是 'max' 或 'min': {direction}")
+
+        param_lists = [
+            [dict(zip(ranges.keys(), combo)) for combo in product(*ranges.values())]
+            for _, ranges in families
+        ]
+        total = sum(len(param_list) for param_list in param_lists)
+        
+        print(f"\n{'='*60}")
+        print(f"🏁 策略族搜索: {len(families)} 个策略族，共 {total} 种参数组合")
+        print(f"{'='*60}")
+        
+        profiler = StageProfiler(memory=self.profile_memory)
+        try:
+            if n_jobs == 1:
+                cache = IndicatorCache(df)
+                frames = []
+                for (strategy_class, _), param_list in zip(families, param_lists):
+                    frames.append(self.evaluate_params(
+                        df, strategy_class, param_list, price_col, cache=cache, batch_size=batch_size,
+                        profiler=profiler
+                    ))
+                    print(f"{strategy_class.display_name}: {len(param_list)} 个组合完成，指标缓存 {len(cache)} 项")
+            else:
+                from .parallel import ParallelExecutor
+                executor = ParallelExecutor(n_workers=n_jobs)
+                print(f"使用 {executor.n_workers} 个进程并行回测")
+                rows = [[None] * len(param_list) for param_list in param_lists]
+                done = 0
+                for family, idx, params, metrics, error in executor.imap_families(
+                    df, list(zip([cls for cls, _ in families], param_lists)), self._engine_kwargs(),
+                    price_col, profiler=profiler, batch_size=batch_size
+                ):
+                    if error is not None:
+                        print(f"参数组合 {params} 失败: {error}")
+                    rows[family][idx] = metrics
+                    done += 1
+                    if done % 100 == 0 or done == total:
+                        print(f"进度: {done}/{total}")
+                frames = [
+                    pd.concat([
+                        pd.DataFrame(param_list),
+                        pd.DataFrame([row or {} for row in family_rows], columns=OPTIMIZE_METRICS, dtype=float)
+                    ], axis=1)
+                    for param_list, family_rows in zip(param_lists, rows)
+                ]
+        finally:
+            with self._lock:
+                self.profiler = profiler
+        
+        leaderboard = pd.concat([
+            pd.DataFrame({
+                'strategy': strategy_class.display_name,
+                'strategy_class': strategy_class.__name__,
+                'params': param_list,
+                **{k: frame[k].to_numpy(dtype=float) for k in OPTIMIZE_METRICS},
+            })
+            for (strategy_class, _), param_list, frame in zip(families, param_lists, frames)
+        ], ignore_index=True)
+        scores = objective_scores(leaderboard, objective)
+        if direction == 'min':
+            scores = np.where(np.isfinite(scores), -scores, -np.inf)
+        leaderboard = leaderboard.iloc[np.argsort(-scores, kind='stable')]
+        leaderboard.insert(0, 'rank', np.arange(1, len(leaderboard) + 1))
+        leaderboard = leaderboard.reset_index(drop=True)
+        
+        print(f"\n{'='*60}")
+        print("✅ 策略族搜索完成")
+        print(f"{'='*60}")
+        print("各策略族最优:")
+        print(leaderboard.drop_duplicates('strategy_class').to_string(index=False))
+        print(f"\nTop {top_n}:")
+        print(leaderboard.head(top_n).to_string(index=False))
+        profiler.print_summary(f"阶段耗时（{total} 个组合累计）")
+        
+        return leaderboard
+    
+    def _optimize_serial(
+        self,
+        df: pd.DataFrame,
+        strategy_class,
+        param_list: List[dict],
+        price_col: str = 'close',
+        on_records: Optional[Callable[[List[dict]], None]] = None,
+        profiler: Optional[StageProfiler] = None
+    ) -> List[dict]:
+        """逐个参数组合回测，on_records 在每个组合完成后被调用（用于写运行日志），各阶段耗时计入 profiler"""
+        results_list = []
+        best_sharpe = -np.inf
+        
+        for i, params in enumerate(param_list, 1):
             try:
-                entries, exits = strategy.generate_signals(df)
-                
-                portfolio = vbt.Portfolio.from_signals(
-                    close=df[price_col],
-                    entries=entries,
-                    exits=exits,
-                    init_cash=self.initial_capital,
-                    fees=self.fees
-                )
-                
-                metrics = PerformanceMetrics(portfolio, df)
-                result = metrics.calculate_all()
+                result = self._evaluate_params(df, strategy_class, params, price_col, profiler)
                 
                 # 记录结果
-                result_record = {
-                    **params,
-                    'sharpe_ratio': result['sharpe_ratio'],
-                    'total_return': result['total_return'],
-                    'max_drawdown': result['max_drawdown'],
-                    'win_rate': result['win_rate']
-                }
-                results_list.append(result_record)
+                record = {**params, **{k: result[k] for k in OPTIMIZE_METRICS}}
+                results_list.append(record)
+                if on_records is not None:
+                    on_records([record])
                 
-                # 更新最优结果
                 if result['sharpe_ratio'] > best_sharpe:
                     best_sharpe = result['sharpe_ratio']
-                    best_params = params
-                    best_result = result
                 
                 # 进度提示
-                if i % 10 == 0 or i == len(combinations):
-                    print(f"进度: {i}/{len(combinations)} - 当前最佳夏普: {best_sharpe:.2f}")
+                if i % 10 == 0 or i == len(param_list):
+                    print(f"进度: {i}/{len(param_list)} - 当前最佳夏普: {best_sharpe:.2f}")
                     
             except Exception as e:
                 print(f"参数组合 {params} 失败: {e}")
                 continue
         
-        # 结果汇总
-        results_df = pd.DataFrame(results_list)
-        results_df = results_df.sort_values('sharpe_ratio', ascending=False)
+        return results_list
+    
+    def _optimize_parallel(
+        self,
+        df: pd.DataFrame,
+        strategy_class,
+        param_list: List[dict],
+        price_col: str = 'close',
+        n_jobs: int = -1,
+        on_records: Optional[Callable[[List[dict]], None]] = None,
+        profiler: Optional[StageProfiler] = None
+    ) -> List[dict]:
+        """用进程池逐个回测，结果按完成顺序流式汇总"""
+        from .parallel import ParallelExecutor
         
-        print(f"\n{'='*60}")
-        print("✅ 优化完成")
-        print(f"{'='*60}")
-        print(f"最优参数: {best_params}")
-        print(f"最优夏普比率: {best_sharpe:.2f}")
-        print(f"\nTop 5 参数组合:")
-        print(results_df.head().to_string())
+        executor = ParallelExecutor(n_workers=n_jobs)
+        print(f"使用 {executor.n_workers} 个进程并行回测")
         
-        return best_params, best_result, results_df
+        records = {}
+        best_sharpe = -np.inf
+        
+        for done, (idx, params, metrics, error) in enumerate(
+            executor.imap(df, strategy_class, param_list, self._engine_kwargs(), price_col, profiler=profiler), 1
+        ):
+            if error is not None:
+                print(f"参数组合 {params} 失败: {error}")
+            else:
+                records[idx] = {**params, **metrics}
+                if on_records is not None:
+                    on_records([records[idx]])
+                if metrics['sharpe_ratio'] > best_sharpe:
+                    best_sharpe = metrics['sharpe_ratio']
+            
+            # 进度提示
+            if done % 10 == 0 or done == len(param_list):
+                print(f"进度: {done}/{len(param_list)} - 当前最佳夏普: {best_sharpe:.2f}")
+        
+        # 按参数组合的原始顺序返回
+        return [records[idx] for idx in sorted(records)]
+    
+    def _optimize_vectorized(
+        self,
+        df: pd.DataFrame,
+        strategy_class,
+        param_list: List[dict],
+        price_col: str = 'close',
+        batch_size: int = config.OPTIMIZE_BATCH_SIZE,
+        on_records: Optional[Callable[[List[dict]], None]] = None,
+        profiler: Optional[StageProfiler] = None
+    ) -> List[dict]:
+        """按批把参数组合拼成宽表，一次模拟整批；on_records 在每批完成后被调用"""
+        results_list = []
+        best_sharpe = -np.inf
+        cache = IndicatorCache(df)
+        batch_size = max(1, batch_size or len(param_list))
+        
+        for start in range(0, len(param_list), batch_size):
+            batch = param_list[start:start + batch_size]
+            try:
+                metrics_df = self.evaluate_batch(df, strategy_class, batch, price_col, cache, profiler)
+            except Exception as e:
+                print(f"批量回测失败，改为逐个回测: {e}")
+                results_list.extend(self._optimize_serial(df, strategy_class, batch, price_col, on_records, profiler))
+                continue
+            
+            records = [{**params, **record} for params, record in zip(batch, metrics_df.to_dict('records'))]
+            results_list.extend(records)
+            if on_records is not None:
+                on_records(records)
+            
+            batch_best = metrics_df['sharpe_ratio'].max()
+            if batch_best > best_sharpe:
+                best_sharpe = batch_best
+            
+            done = min(start + batch_size, len(param_list))
+            print(f"进度: {done}/{len(param_list)} - 当前最佳夏普: {best_sharpe:.2f}")
+        
+        return results_list
+    
+    def evaluate_params(
+        self,
+        df: pd.DataFrame,
+        strategy_class,
+        param_list: List[dict],
+        price_col: str = 'close',
+        cache: IndicatorCache = None,
+        n_jobs: int = 1,
+        batch_size: int = config.OPTIMIZE_BATCH_SIZE,
+        profiler: Optional[StageProfiler] = None
+    ) -> pd.DataFrame:
+        """
+        评估一组参数组合（不打印进度），供各种搜索算法调用
+        
+        支持批量信号的策略走宽表模拟，否则逐个回测（n_jobs != 1 时并行）。
+        参数中可以包含订单参数（止损、止盈等，见 simulator.ORDER_PARAMS），此时用事件驱动模拟器回测。
+        传入 profiler 时各阶段耗时计入其中（引擎本身不保存状态，多个线程可以同时调用）。
+        
+        Returns:
+            与 param_list 逐行对应的 DataFrame（参数列 + OPTIMIZE_METRICS），失败的组合指标为 NaN
+        """
+        params_df = pd.DataFrame(param_list)
+        rows: List[Optional[dict]] = [None] * len(param_list)
+        
+        if getattr(strategy_class, 'supports_batch', False):
+            cache = cache if cache is not None else IndicatorCache(df)
+            batch_size = max(1, batch_size or len(param_list))
+            for start in range(0, len(param_list), batch_size):
+                batch = param_list[start:start + batch_size]
+                try:
+                    records = self.evaluate_batch(
+                        df, strategy_class, batch, price_col, cache, profiler
+                    ).to_dict('records')
+                    rows[start:start + len(batch)] = records
+                except Exception as e:
+                    print(f"批量回测失败，改为逐个回测: {e}")
+                    for i, params in enumerate(batch, start):
+                        rows[i] = self._try_evaluate(df, strategy_class, params, price_col, profiler)
+        elif n_jobs != 1:
+            from .parallel import ParallelExecutor
+            executor = ParallelExecutor(n_workers=n_jobs)
+            for idx, _, metrics, _ in executor.imap(
+                df, strategy_class, param_list, self._engine_kwargs(), price_col, profiler=profiler
+            ):
+                rows[idx] = metrics
+        else:
+            for i, params in enumerate(param_list):
+                rows[i] = self._try_evaluate(df, strategy_class, params, price_col, profiler)
+        
+        metrics_df = pd.DataFrame([row or {} for row in rows], columns=OPTIMIZE_METRICS, dtype=float)
+        return pd.concat([params_df.reset_index(drop=True), metrics_df], axis=1)
+    
+    def _try_evaluate(
+        self,
+        df: pd.DataFrame,
+        strategy_class,
+        params: dict,
+        price_col: str = 'close',
+        profiler: Optional[StageProfiler] = None
+    ) -> Optional[dict]:
+        """回测单个参数组合，失败时返回 None"""
+        try:
+            result = self._evaluate_params(df, strategy_class, params, price_col, profiler)
+            return {k: result[k] for k in OPTIMIZE_METRICS}
+        except Exception as e:
+            print(f"参数组合 {params} 失败: {e}")
+            return None
     
-    def _print_results(self):
-        """打印回测结果"""
-        r = self.results
+    def evaluate_batch(
+        self,
+        df: pd.DataFrame,
+        strategy_class,
+        param_list: List[dict],
+        price_col: str = 'close',
+        cache: IndicatorCache = None,
+        profiler: Optional[StageProfiler] = None
+    ) -> pd.DataFrame:
+        """
+        一次模拟评估一批参数组合
+        
+        参数中含订单参数（止损、止盈等）时，整批信号连同每列的订单参数一起交给事件驱动模拟器，
+        仍然是一次模拟；否则用 vectorbt。
+        
+        Args:
+            df: 价格数据
+            strategy_class: 策略类
+            param_list: 参数字典列表
+            price_col: 价格列名
+            cache: 指标缓存（多批之间共享）
+            profiler: 记录各阶段耗时的 StageProfiler，None 表示不记录
+            
+        Returns:
+            第 j 行对应 param_list[j] 的指标 DataFrame（列为 OPTIMIZE_METRICS）
+        """
+        from .simulator import EventDrivenSimulator, split_order_params
+        
+        split = [split_order_params(params) for params in param_list]
+        with optional_stage(profiler, 'generate_signals'):
+            entries, exits = strategy_class.generate_signals_batch(df, [p for p, _ in split], cache=cache)
+        
+        if split and split[0][1]:
+            # 每个订单参数一列一个值（None 为 NaN，表示不启用）
+            order_params = {k: np.array([o[k] for _, o in split], dtype=float) for k in split[0][1]}
+            simulator = EventDrivenSimulator.from_engine(self, **order_params)
+            with optional_stage(profiler, 'simulate'):
+                sim = simulator.run(df, entries, exits)
+            with optional_stage(profiler, 'metrics'):
+                metrics_df = simulator.metrics(sim, df)
+            return metrics_df[OPTIMIZE_METRICS].reset_index(drop=True)
+        
+        with optional_stage(profiler, 'simulate'):
+            portfolio = self._simulate(df[price_col], entries, exits)
+        with optional_stage(profiler, 'metrics'):
+            metrics_df = PerformanceMetrics(portfolio, df).calculate_columns()
+        # vectorbt 组合对象内部有循环引用，宽表数组要等分代回收才释放；
+        # 不主动回收时多批的数组会堆积，内存随组合数线性增长
+        del portfolio
+        gc.collect()
+        return metrics_df[OPTIMIZE_METRICS].reset_index(drop=True)
+    
+    def _evaluate(
+        self,
+        df: pd.DataFrame,
+        strategy: BaseStrategy,
+        price_col: str = 'close',
+        profiler: Optional[StageProfiler] = None
+    ) -> Dict[str, Any]:
+        """回测单个策略并计算全部指标（不打印；各阶段耗时计入 profiler）"""
+        with optional_stage(profiler, 'generate_signals'):
+            entries, exits = strategy.generate_signals(df)
+        with optional_stage(profiler, 'simulate'):
+            portfolio = self._simulate(df[price_col], entries, exits)
+        with optional_stage(profiler, 'metrics'):
+            return PerformanceMetrics(portfolio, df).calculate_all()
+    
+    def _evaluate_params(
+        self,
+        df: pd.DataFrame,
+        strategy_class,
+        params: dict,
+        price_col: str = 'close',
+        profiler: Optional[StageProfiler] = None
+    ) -> Dict[str, Any]:
+        """回测单个参数组合；含订单参数（止损、止盈等）时用事件驱动模拟器"""
+        from .simulator import EventDrivenSimulator, split_order_params
+        
+        strategy_params, order_params = split_order_params(params)
+        strategy = strategy_class(**strategy_params)
+        if not order_params:
+            return self._evaluate(df, strategy, price_col, profiler)
+        simulator = EventDrivenSimulator.from_engine(self, **order_params)
+        return self.execute(df, strategy, price_col, simulator=simulator).to_dict()
+    
+    def _engine_kwargs(self) -> Dict[str, Any]:
+        """重建同配置引擎所需的参数（用于子进程）"""
+        return {
+            'initial_capital': self.initial_capital,
+            'fees': self.fees,
+            'slippage': self.slippage,
+            'freq': self.freq,
+            'profile_memory': self.profile_memory
+        }
+    
+    def _simulate(self, close: pd.Series, entries, exits):
+        """调用 vectorbt 模拟；entries/exits 为宽表时价格自动广播，每列是一个独立组合"""
+        return vbt.Portfolio.from_signals(
+            close=close,
+            entries=entries,
+            exits=exits,
+            **self._sim_kwargs()
+        )
+    
+    def _sim_kwargs(self) -> Dict[str, Any]:
+        """传给 from_signals 的资金和成本参数（BacktestResult 重建组合时也使用）"""
+        return {
+            'init_cash': self.initial_capital,
+            'fees': self.fees,
+            'slippage': self.slippage,
+            'freq': self.freq,
+        }
+    
+    def _print_results(self, results: Optional[Dict[str, Any]] = None):
+        """打印回测结果（默认打印最近一次回测）"""
+        r = self.results if results is None else results
         
         print(f"\n{'='*60}")
         print("📈 回测结果")
@@ -264,8 +1270,15 @@ class BacktestEngine:
         print(f"{'='*60}\n")
     
     def get_portfolio(self):
-        """获取回测的投资组合对象（用于可视化）"""
-        return self.portfolio
+        """获取回测的投资组合对象（按需用保存的信号重建；只需权益和回撤时直接用 run() 的结果即可）"""
+        with self._lock:
+            if self.portfolio is None and isinstance(self.results, BacktestResult):
+                self.portfolio = self.results.portfolio()
+            return self.portfolio
+    
+    def get_signals(self):
+        """获取最近一次 run 的 (entries, exits)，无需再次调用 generate_signals"""
+        return self.signals
     
     def get_results(self):
         """获取回测结果"""
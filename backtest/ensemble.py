@@ -0,0 +1,480 @@
+"""
+策略组合权重优化
+把多个策略（或同一策略的多组参数）的逐K线收益当作资产，计算均值-方差、风险平价或最大夏普权重；
+权重在滚动窗口上定期重新估计，窗口的均值和协方差用外积的加减增量更新
+"""
+import gc
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+import config
+from .metrics import YEAR, equity_stats_by_column
+
+
+ENSEMBLE_METHODS = ('mean_variance', 'risk_parity', 'max_sharpe')
+
+# 组合结果中汇总的指标
+ENSEMBLE_METRICS = ['total_return', 'annual_return', 'sharpe_ratio', 'max_drawdown', 'volatility']
+
+
+# ==================== 收益矩阵 ====================
+
+def strategy_returns(
+    engine,
+    df: pd.DataFrame,
+    strategies: list,
+    price_col: str = 'close',
+    batch_size: int = config.OPTIMIZE_BATCH_SIZE
+) -> pd.DataFrame:
+    """
+    各策略的逐K线收益率矩阵（信号堆叠成宽表，按批一次模拟）
+
+    Args:
+        engine: BacktestEngine（提供资金、手续费、滑点、频率）
+        df: 价格数据
+        strategies: 策略列表
+        price_col: 价格列名
+        batch_size: 每次模拟的最大策略数
+
+    Returns:
+        (n_bars, n_strategies) DataFrame，列名为 repr(strategy)，有 timestamp 列时以其为索引
+    """
+    entries, exits = engine._stack_signals(df, strategies)
+    frames = []
+    for start in range(0, len(strategies), batch_size):
+        portfolio = engine._simulate(
+            df[price_col],
+            entries.iloc[:, start:start + batch_size],
+            exits.iloc[:, start:start + batch_size]
+        )
+        frames.append(portfolio.returns().to_numpy())
+        del portfolio
+        gc.collect()  # 及时释放上一批的宽表数组（见 BacktestEngine.evaluate_batch）
+
+    index = pd.DatetimeIndex(df['timestamp']) if 'timestamp' in df.columns else df.index
+    return pd.DataFrame(np.hstack(frames), index=index, columns=[repr(s) for s in strategies])
+
+
+# ==================== 滚动矩 ====================
+
+class RollingMoments:
+    """
+    滑动窗口的收益均值和协方差
+
+    只维护窗口内收益的和 S1 = sum(r) 与外积和 S2 = R'R。窗口前移 step 根K线时，
+    加上新进入的 step 行、减去移出的 step 行的外积（两次 (step x N)'(step x N) 矩阵乘法），
+    每次更新 O(step·N²)，不必在每个窗口上重新计算 O(window·N²) 的协方差。
+    """
+
+    def __init__(self, n_assets: int):
+        self.s1 = np.zeros(n_assets)
+        self.s2 = np.zeros((n_assets, n_assets))
+        self.count = 0
+
+    def add(self, rows: np.ndarray):
+        """加入若干行收益 (k, n_assets)"""
+        rows = np.atleast_2d(rows)
+        self.s1 += rows.sum(axis=0)
+        self.s2 += rows.T @ rows
+        self.count += len(rows)
+
+    def drop(self, rows: np.ndarray):
+        """移出之前加入过的若干行收益"""
+        rows = np.atleast_2d(rows)
+        self.s1 -= rows.sum(axis=0)
+        self.s2 -= rows.T @ rows
+        self.count -= len(rows)
+
+    def mean(self) -> np.ndarray:
+        return self.s1 / self.count
+
+    def cov(self, ddof: int = 1) -> np.ndarray:
+        mean = self.mean()
+        cov = (self.s2 - self.count * np.outer(mean, mean)) / max(self.count - ddof, 1)
+        # 对称化，消除增量更新累积的舍入误差
+        return (cov + cov.T) / 2
+
+
+def shrink_covariance(cov: np.ndarray, shrinkage: float) -> np.ndarray:
+    """向 (平均方差 x 单位阵) 收缩：策略数接近或超过窗口长度时协方差接近奇异"""
+    if shrinkage <= 0:
+        return cov
+    target = np.trace(cov) / len(cov)
+    return (1 - shrinkage) * cov + shrinkage * target * np.eye(len(cov))
+
+
+# ==================== 权重 ====================
+
+def project_capped_simplex(v: np.ndarray, lower=0.0, upper=1.0) -> np.ndarray:
+    """
+    欧氏投影到 {w: sum(w) = 1, lower <= w <= upper}
+
+    投影的形式为 clip(v - tau, lower, upper)，sum 关于 tau 单调递减且分段线性：
+    用牛顿步求 tau（未触及上下限的分量个数即斜率），步子越出区间时退回二分，通常几步即得到精确解
+    """
+    v = np.asarray(v, dtype=float)
+    lower = np.broadcast_to(np.asarray(lower, dtype=float), v.shape)
+    upper = np.broadcast_to(np.asarray(upper, dtype=float), v.shape)
+    if lower.sum() > 1 + 1e-12 or upper.sum() < 1 - 1e-12:
+        raise ValueError(f"权重上下限无法满足权重和为 1（下限之和 {lower.sum():.4f}，上限之和 {upper.sum():.4f}）")
+
+    lo, hi = (v - upper).min(), (v - lower).max()
+    tau = (v.sum() - 1) / len(v)
+    if not lo < tau < hi:
+        tau = (lo + hi) / 2
+    for _ in range(100):
+        shifted = v - tau
+        w = np.clip(shifted, lower, upper)
+        excess = w.sum() - 1
+        if abs(excess) < 1e-14:
+            break
+        if excess > 0:
+            lo = tau
+        else:
+            hi = tau
+        free = np.count_nonzero((shifted > lower) & (shifted < upper))
+        tau = tau + excess / free if free else (lo + hi) / 2
+        if not lo < tau < hi:
+            tau = (lo + hi) / 2
+    return w
+
+
+def max_eigenvalue(cov: np.ndarray, n_iter: int = 50) -> float:
+    """协方差矩阵的最大特征值（幂迭代，只用矩阵向量乘法）"""
+    x = np.full(len(cov), 1.0 / np.sqrt(len(cov)))
+    value = 0.0
+    for _ in range(n_iter):
+        y = cov @ x
+        norm = np.linalg.norm(y)
+        if norm == 0:
+            return 0.0
+        x = y / norm
+        if abs(norm - value) <= 1e-6 * norm:
+            break
+        value = norm
+    return float(norm)
+
+
+def _mean_variance(mean, cov, risk_aversion, lower, upper, w, lipschitz, max_iter=5000, tol=1e-9):
+    """
+    加速投影梯度（FISTA，目标下降时重启）求解均值-方差问题
+
+    lipschitz 为梯度的 Lipschitz 常数 risk_aversion * λmax(Σ)（幂迭代的估计值略小时由回溯修正）；
+    Σy 由 Σw 线性组合得到，每次迭代只做一次矩阵向量乘法
+    """
+    step = 1.0 / max(lipschitz * 1.01, 1e-300)
+    w = project_capped_simplex(w, lower, upper)
+    cw = cov @ w
+    f = mean @ w - risk_aversion / 2 * (w @ cw)
+    y, cy, f_y, t = w, cw, f, 1.0
+    for _ in range(max_iter):
+        g = mean - risk_aversion * cy
+        while True:
+            candidate = project_capped_simplex(y + step * g, lower, upper)
+            c_candidate = cov @ candidate
+            f_new = mean @ candidate - risk_aversion / 2 * (candidate @ c_candidate)
+            d = candidate - y
+            # 充分上升条件（二次下界）
+            if f_new >= f_y + g @ d - (d @ d) / (2 * step) - 1e-15 * abs(f_y) or step < 1e-300:
+                break
+            step /= 2
+        change = np.abs(candidate - w).max()
+        if f_new < f and t > 1.0:
+            # 动量导致目标下降：从当前点重新开始
+            y, cy, f_y, t = w, cw, f, 1.0
+            continue
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        beta = (t - 1) / t_next
+        y = candidate + beta * (candidate - w)
+        cy = c_candidate + beta * (c_candidate - cw)
+        f_y = mean @ y - risk_aversion / 2 * (y @ cy)
+        w, cw, f, t = candidate, c_candidate, f_new, t_next
+        if change < tol:
+            break
+    return w
+
+
+def mean_variance_weights(
+    mean: np.ndarray,
+    cov: np.ndarray,
+    risk_aversion: float = 1.0,
+    min_weight=0.0,
+    max_weight=1.0,
+    initial: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    均值-方差权重：max w'mu - risk_aversion / 2 * w'Σw，s.t. sum(w) = 1，min_weight <= w <= max_weight
+
+    均值和协方差的时间单位相同即可（按K线或年化，解相同）
+    """
+    n = len(mean)
+    w0 = np.full(n, 1.0 / n) if initial is None else initial
+    return _mean_variance(
+        np.asarray(mean, dtype=float), cov, risk_aversion, min_weight, max_weight, w0,
+        risk_aversion * max_eigenvalue(cov)
+    )
+
+
+def max_sharpe_weights(
+    mean: np.ndarray,
+    cov: np.ndarray,
+    risk_free: float = 0.0,
+    min_weight=0.0,
+    max_weight=1.0,
+    initial: Optional[np.ndarray] = None,
+    max_iter: int = 100,
+    tol: float = 1e-8
+) -> np.ndarray:
+    """
+    最大夏普权重：max (w'mu - risk_free) / sqrt(w'Σw)，约束同 mean_variance_weights
+
+    切点组合满足 risk_aversion = 超额收益 / 方差 时均值-方差问题的最优条件，
+    因此迭代求 risk_aversion 的不动点，每次的均值-方差问题从上一次的权重热启动。
+    任何可行组合的超额收益都不为正时没有切点组合，返回最小方差权重
+    """
+    n = len(mean)
+    excess_mean = np.asarray(mean, dtype=float) - risk_free
+    top = max_eigenvalue(cov)
+    w = project_capped_simplex(np.full(n, 1.0 / n) if initial is None else initial, min_weight, max_weight)
+    if excess_mean @ w <= 0:
+        # 从期望收益最高的可行组合出发
+        w = project_capped_simplex(excess_mean / max(np.abs(excess_mean).max(), 1e-300) * 1e6, min_weight, max_weight)
+    if excess_mean @ w <= 0:
+        return _mean_variance(np.zeros(n), cov, 1.0, min_weight, max_weight, w, top)
+
+    implied = lambda w: (excess_mean @ w) / max(w @ cov @ w, 1e-300)
+    risk_aversion = implied(w)
+    inner_tol = 1e-4
+    for _ in range(max_iter):
+        # 离不动点较远时内层只需粗略求解，精度随外层收敛逐步提高
+        w_new = _mean_variance(
+            excess_mean, cov, risk_aversion, min_weight, max_weight, w, risk_aversion * top, tol=inner_tol
+        )
+        change = np.abs(w_new - w).max()
+        w = w_new
+        if (change < tol and inner_tol <= tol) or excess_mean @ w <= 0:
+            break
+        inner_tol = max(tol, min(inner_tol, 0.01 * change))
+        risk_aversion = implied(w)
+    return w
+
+
+def risk_parity_weights(
+    cov: np.ndarray,
+    budget: Optional[np.ndarray] = None,
+    initial: Optional[np.ndarray] = None,
+    max_iter: int = 100,
+    tol: float = 1e-10
+) -> np.ndarray:
+    """
+    风险平价权重：每个策略的风险贡献 w_i (Σw)_i 与 budget 成比例（默认相等），只做多
+
+    求解 min 0.5 x'Σx - budget'log(x) 的牛顿法（目标严格凸，最优解归一化后即为所求）。
+    方差为 0 的策略（如窗口内没有交易）风险贡献无从定义，权重为 0；不支持权重上下限
+    """
+    n = len(cov)
+    budget = np.full(n, 1.0 / n) if budget is None else np.asarray(budget, dtype=float)
+    weights = np.zeros(n)
+    active = np.flatnonzero(np.diag(cov) > 1e-300)
+    if len(active) == 0:
+        return np.full(n, 1.0 / n)
+
+    sigma = cov[np.ix_(active, active)]
+    b = budget[active] / budget[active].sum()
+    x = 1.0 / np.sqrt(np.diag(sigma))
+    if initial is not None and np.all(initial[active] > 0):
+        x = np.asarray(initial, dtype=float)[active]
+    # 最优解满足 x'Σx = sum(budget) = 1，先按此缩放
+    x *= np.sqrt(1.0 / (x @ sigma @ x))
+    objective = lambda x: 0.5 * (x @ sigma @ x) - b @ np.log(x)
+    for _ in range(max_iter):
+        gradient = sigma @ x - b / x
+        hessian = sigma + np.diag(b / x ** 2)
+        direction = np.linalg.solve(hessian, gradient)
+        # 回溯：保持 x > 0 且目标下降
+        t = 1.0
+        while np.any(x - t * direction <= 0) or objective(x - t * direction) > objective(x) - 1e-4 * t * (gradient @ direction):
+            t /= 2
+            if t < 1e-12:
+                break
+        x = x - t * direction
+        if np.abs(t * direction).max() < tol * np.abs(x).max():
+            break
+
+    weights[active] = x / x.sum()
+    return weights
+
+
+# ==================== 组合 ====================
+
+class StrategyEnsemble:
+    """
+    策略组合
+
+    fit() 在整段收益上估计一次权重；run() 每隔 step 根K线用之前 window 根K线重新估计权重，
+    新权重从下一根K线开始使用（样本外），每根K线按目标权重再平衡（不计再平衡成本）。
+    每次重新估计时从上一次的权重热启动，数百个策略的收益流也能快速完成。
+    """
+
+    def __init__(
+        self,
+        method: str = 'max_sharpe',
+        window: int = config.ENSEMBLE_WINDOW,
+        step: int = config.ENSEMBLE_REFIT_STEP,
+        risk_aversion: float = 1.0,
+        min_weight: float = 0.0,
+        max_weight: float = 1.0,
+        shrinkage: float = 0.0,
+        risk_free: float = 0.0,
+        freq: str = config.BACKTEST_FREQ
+    ):
+        """
+        初始化
+
+        Args:
+            method: 'mean_variance'、'risk_parity' 或 'max_sharpe'
+            window: 估计窗口（K线数）
+            step: 重新估计的间隔（K线数）
+            risk_aversion: 均值-方差的风险厌恶系数
+            min_weight: 单个策略的最小权重（0 表示只做多）
+            max_weight: 单个策略的最大权重（风险平价不使用上下限）
+            shrinkage: 协方差收缩强度 [0, 1]，策略数较多时建议 0.1 左右
+            risk_free: 每根K线的无风险收益（最大夏普使用）
+            freq: K线频率（年化指标使用）
+        """
+        if method not in ENSEMBLE_METHODS:
+            raise ValueError(f"未知的组合方法: {method}，可选 {list(ENSEMBLE_METHODS)}")
+        self.method = method
+        self.window = window
+        self.step = step
+        self.risk_aversion = risk_aversion
+        self.min_weight = min_weight
+        self.max_weight = max_weight
+        self.shrinkage = shrinkage
+        self.risk_free = risk_free
+        self.freq = freq
+
+    def weights(self, mean: np.ndarray, cov: np.ndarray, initial: Optional[np.ndarray] = None) -> np.ndarray:
+        """按配置的方法由均值和协方差计算一组权重"""
+        cov = shrink_covariance(cov, self.shrinkage)
+        if self.method == 'risk_parity':
+            return risk_parity_weights(cov, initial=initial)
+        if self.method == 'mean_variance':
+            return mean_variance_weights(
+                mean, cov, self.risk_aversion, self.min_weight, self.max_weight, initial
+            )
+        return max_sharpe_weights(mean, cov, self.risk_free, self.min_weight, self.max_weight, initial)
+
+    def fit(self, returns: pd.DataFrame) -> pd.Series:
+        """整段收益上的权重（NaN 收益按 0 处理）"""
+        values = np.nan_to_num(np.asarray(returns, dtype=float))
+        moments = RollingMoments(values.shape[1])
+        moments.add(values)
+        return pd.Series(self.weights(moments.mean(), moments.cov()), index=returns.columns, name='weight')
+
+    def rolling_weights(self, returns: pd.DataFrame) -> pd.DataFrame:
+        """
+        滚动估计的权重
+
+        Returns:
+            每次重新估计一行，索引为估计窗口最后一根K线（权重从下一根K线开始使用）
+        """
+        values = np.nan_to_num(np.asarray(returns, dtype=float))
+        n_bars, n_assets = values.shape
+        if n_bars <= self.window:
+            raise ValueError(f"数据长度 {n_bars} 不足以进行窗口为 {self.window} 的滚动估计")
+
+        moments = RollingMoments(n_assets)
+        moments.add(values[:self.window])
+        ends = list(range(self.window, n_bars, self.step))
+        rows = []
+        previous = None
+        for i, end in enumerate(ends):
+            if i > 0:
+                start = end - self.window
+                moments.add(values[ends[i - 1]:end])
+                moments.drop(values[start - (end - ends[i - 1]):start])
+            previous = self.weights(moments.mean(), moments.cov(), previous)
+            rows.append(previous)
+
+        return pd.DataFrame(rows, index=returns.index[[end - 1 for end in ends]], columns=returns.columns)
+
+    def run(self, returns: pd.DataFrame) -> Dict[str, Any]:
+        """
+        滚动权重下的样本外组合表现，并与等权组合对比
+
+        Args:
+            returns: (n_bars, n_strategies) 收益率矩阵（如 strategy_returns 的结果）
+
+        Returns:
+            {
+                'weights': 滚动权重 DataFrame,
+                'returns': 组合的样本外逐K线收益 Series,
+                'equity': 组合净值（从 1 开始）Series,
+                'metrics': 组合指标字典,
+                'equal_weight': 同一时段等权组合的指标字典,
+                'turnover': 每次重新估计的平均换手（权重变化绝对值之和）,
+            }
+        """
+        print(f"\n{'='*60}")
+        print(f"🧺 策略组合: {self.method}（{returns.shape[1]} 个策略，窗口 {self.window}，每 {self.step} 根K线重新估计）")
+        print(f"{'='*60}")
+
+        weights = self.rolling_weights(returns)
+        values = np.nan_to_num(np.asarray(returns, dtype=float))
+
+        # 每次估计的权重用于之后 step 根K线
+        held = np.repeat(weights.to_numpy(), self.step, axis=0)[:len(values) - self.window]
+        oos = values[self.window:]
+        combined = np.column_stack([
+            (held * oos).sum(axis=1),
+            oos.mean(axis=1),
+        ])
+        equity = np.cumprod(1 + combined, axis=0)
+
+        index = returns.index[self.window:]
+        n_years = (index[-1] - index[0]).days / 365.25 if isinstance(index, pd.DatetimeIndex) else 0
+        stats = equity_stats_by_column(equity, np.ones(2), YEAR / pd.Timedelta(self.freq), n_years)
+        metrics, equal_weight = ({k: float(stats[k][j]) for k in ENSEMBLE_METRICS} for j in range(2))
+
+        results = {
+            'weights': weights,
+            'returns': pd.Series(combined[:, 0], index=index, name='ensemble'),
+            'equity': pd.Series(equity[:, 0], index=index, name='ensemble'),
+            'metrics': metrics,
+            'equal_weight': equal_weight,
+            'turnover': float(np.abs(np.diff(weights.to_numpy(), axis=0)).sum(axis=1).mean()) if len(weights) > 1 else 0.0,
+        }
+        self._print_summary(results)
+        return results
+
+    def _print_summary(self, results: Dict[str, Any]):
+        rows = pd.DataFrame({'组合': results['metrics'], '等权': results['equal_weight']}).T
+        print(f"样本外对比（{len(results['returns'])} 根K线，{len(results['weights'])} 次重新估计）:")
+        print(rows.to_string(float_format='{:.4f}'.format))
+        print(f"平均换手: {results['turnover']:.2%}")
+        top = results['weights'].iloc[-1].sort_values(ascending=False).head(5)
+        print("最新权重前 5:")
+        for name, weight in top.items():
+            print(f"  {name}: {weight:.2%}")
+
+
+# ==================== 使用示例 ====================
+if __name__ == "__main__":
+    from data.fetcher import DataFetcher
+    from strategies.ema_cross import EMACrossStrategy
+    from strategies.rsi_strategy import RSIStrategy
+    from backtest.engine import BacktestEngine
+
+    fetcher = DataFetcher()
+    df = fetcher.fetch_ohlcv("BTC/USDT", "1h", 3000)
+
+    engine = BacktestEngine(initial_capital=10000, fees=0.0004)
+    strategies = [EMACrossStrategy(fast, slow) for fast in (5, 10, 20) for slow in (40, 60, 80)]
+    strategies += [RSIStrategy(period, 30, 70) for period in (7, 14, 21)]
+    returns = strategy_returns(engine, df, strategies)
+
+    for method in ENSEMBLE_METHODS:
+        StrategyEnsemble(method=method, window=720, step=24, max_weight=0.3).run(returns)
@@ -0,0 +1,294 @@
+"""
+增量回测
+保存回测结束时的模拟器状态和策略指标状态，追加新K线时只计算新K线，
+权益、交易记录和指标与在完整数据上重新回测一致
+"""
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+import config
+from .cache import data_fingerprint
+from .metrics import CLOSED, YEAR, trade_stats_by_column
+from .simulator import TRADE_DTYPE, EventDrivenSimulator
+from .streaming import (
+    EQUITY_FILE, TIMESTAMP_FILE, TRADES_FILE, META_FILE,
+    EquityAccumulator, load_equity, load_timestamps, bar_timestamps
+)
+
+STATE_FILE = "state.pkl"
+
+
+def first_bar_fingerprint(df: pd.DataFrame) -> str:
+    """第一根K线的指纹（与索引无关），用于识别同一份数据"""
+    return data_fingerprint(df.iloc[:1].reset_index(drop=True))
+
+
+def state_dir_for(
+    strategy,
+    simulator: EventDrivenSimulator,
+    data_id: Optional[str] = None,
+    root: Path = config.INCREMENTAL_DIR
+) -> Path:
+    """
+    按数据、策略类、参数和模拟器配置生成状态目录（配置或数据不同的回测互不覆盖）
+
+    Args:
+        data_id: 数据标识（交易对名称，或 first_bar_fingerprint）
+    """
+    payload = {
+        'data': data_id,
+        'strategy': f"{type(strategy).__module__}:{type(strategy).__qualname__}",
+        'params': strategy.get_params(),
+        'simulator': vars(simulator),
+    }
+    digest = hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return Path(root) / f"{type(strategy).__name__}_{digest[:12]}"
+
+
+class IncrementalBacktest:
+    """
+    可追加的回测
+
+    目录中的权益、时间和交易文件与分块回测相同（可用 backtest.streaming.load_equity 读取），
+    另有 state.pkl 保存数据标识（交易对、第一根K线的指纹）、策略、模拟器配置和状态、信号状态、
+    指标累计器和未平仓记录。
+    交易文件只保存已平仓交易，未平仓的持仓在追加K线后可能平仓，单独保存在状态中。
+
+    用法:
+        backtest = IncrementalBacktest.create(path, df, strategy, simulator)
+        ...  # 之后每天
+        backtest = IncrementalBacktest.load(path)
+        results = backtest.extend(new_df)
+    """
+
+    def __init__(self, path, strategy, simulator: EventDrivenSimulator, symbol: Optional[str] = None):
+        self.path = Path(path)
+        self.symbol = symbol
+        self.first_bar: Optional[str] = None
+        self.strategy = strategy
+        self.simulator = simulator
+        self.sim_state: Optional[np.ndarray] = None
+        self.signal_state: Optional[Dict[str, Any]] = None
+        self.stats: Optional[EquityAccumulator] = None
+        self.open_trades = np.empty(0, dtype=TRADE_DTYPE)
+        self.n_bars = 0
+        self.n_closed = 0
+        self.first_ts = None
+        self.last_ts = None
+        self.last_close = np.nan
+
+    # ==================== 创建 / 读取 ====================
+
+    @classmethod
+    def create(cls, path, df: pd.DataFrame, strategy, simulator: EventDrivenSimulator,
+               block_size: int = config.STREAM_BLOCK_SIZE, symbol: Optional[str] = None) -> 'IncrementalBacktest':
+        """
+        在完整数据上回测并保存状态（已有的同名目录会被覆盖）
+
+        Args:
+            path: 状态目录
+            df: 价格数据（需要 timestamp 和 open/high/low/close 列）
+            strategy: 交易策略对象
+            simulator: 事件驱动模拟器
+            block_size: 首次回测时每块模拟的K线数（控制内存）
+            symbol: 交易对名称（保存在状态中，继续回测时检查）
+        """
+        backtest = cls(path, strategy, simulator, symbol)
+        backtest.first_bar = first_bar_fingerprint(df)
+        backtest.path.mkdir(parents=True, exist_ok=True)
+        for name in (EQUITY_FILE, TIMESTAMP_FILE, TRADES_FILE):
+            (backtest.path / name).unlink(missing_ok=True)
+
+        entries, exits = strategy.generate_signals(df)
+        entries = np.asarray(entries, dtype=bool)
+        exits = np.asarray(exits, dtype=bool)
+        for start in range(0, len(df), block_size):
+            stop = start + block_size
+            backtest._append(df.iloc[start:stop], entries[start:stop], exits[start:stop])
+
+        if strategy.supports_incremental:
+            backtest.signal_state = strategy.signal_state(df)
+        backtest.save()
+        return backtest
+
+    @classmethod
+    def load(cls, path) -> 'IncrementalBacktest':
+        """读取状态；上次追加中途中断时，把文件截断到最后一次保存的长度"""
+        path = Path(path)
+        with open(path / STATE_FILE, 'rb') as f:
+            backtest = pickle.load(f)
+        backtest.path = path
+        backtest._truncate()
+        return backtest
+
+    @staticmethod
+    def exists(path) -> bool:
+        return (Path(path) / STATE_FILE).exists()
+
+    def save(self):
+        """原子地保存状态（先写临时文件再替换）"""
+        meta = {
+            'columns': ['0'],
+            'n_bars': self.n_bars,
+            'n_cols': 1,
+            'initial_capital': float(self.simulator.initial_capital),
+            'freq': self.simulator.freq,
+            'strategy': repr(self.strategy),
+        }
+        with open(self.path / META_FILE, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.path / STATE_FILE)
+        except Exception:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.pop('path', None)
+        return state
+
+    # ==================== 追加 ====================
+
+    def extend(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """
+        追加新K线并保存状态
+
+        Args:
+            df: 新K线，或包含历史的完整数据（时间不晚于上次最后一根K线的部分会被跳过，
+                并检查最后一根K线的收盘价与上次一致；只传新K线时，第一根必须在上次最后一根之后
+                一个周期（freq）以内）。不支持增量信号的策略需要传入完整数据，
+                信号在整段数据上重新生成，模拟仍然只针对新K线
+
+        Returns:
+            metrics() 的结果
+        """
+        timestamps = pd.to_datetime(df['timestamp'])
+        first_bar = getattr(self, 'first_bar', None)
+        if (first_bar is not None and len(df) and timestamps.iloc[0] == pd.Timestamp(self.first_ts)
+                and first_bar_fingerprint(df) != first_bar):
+            raise ValueError("传入的数据与保存的状态不是同一份数据（第一根K线不同），请检查交易对或使用新的状态目录")
+        seen = (timestamps <= self.last_ts).to_numpy() if self.last_ts is not None else np.zeros(len(df), dtype=bool)
+        overlap = df.loc[seen & (timestamps == self.last_ts).to_numpy(), 'close']
+        if len(overlap) and overlap.iloc[-1] != self.last_close:
+            raise ValueError("历史数据与保存的状态不一致（最后一根K线的收盘价不同），请重新完整回测")
+        new = df.loc[~seen]
+        if len(new) == 0:
+            return self.metrics()
+
+        # 不包含上次最后一根K线时，新数据必须紧接着它（否则中间缺失的K线永远不会被模拟）
+        first_new = timestamps[~seen].iloc[0]
+        if self.last_ts is not None and not len(overlap) and first_new > self.last_ts + pd.Timedelta(self.simulator.freq):
+            raise ValueError(
+                f"新数据从 {first_new} 开始，与上次最后一根K线 {self.last_ts} 之间有缺口，"
+                f"请传入从 {self.last_ts} 之后开始的连续K线"
+            )
+
+        if self.signal_state is not None:
+            entries, exits = self.strategy.update_signals(self.signal_state, new)
+        else:
+            if int(seen.sum()) != self.n_bars:
+                raise ValueError(
+                    f"{type(self.strategy).__name__} 不支持增量信号，需要传入包含全部 {self.n_bars} 根历史K线的数据"
+                )
+            entries, exits = self.strategy.generate_signals(df)
+            entries = np.asarray(entries, dtype=bool)[~seen]
+            exits = np.asarray(exits, dtype=bool)[~seen]
+
+        self._append(new, np.asarray(entries, dtype=bool), np.asarray(exits, dtype=bool))
+        self.save()
+        return self.metrics()
+
+    def _append(self, df: pd.DataFrame, entries: np.ndarray, exits: np.ndarray):
+        """模拟一段新K线，追加写入权益、时间和已平仓交易"""
+        if len(df) == 0:
+            return
+        result = self.simulator.run(df, entries, exits, state=self.sim_state, index_offset=self.n_bars)
+        self.sim_state = result['state']
+        value = result['value'].to_numpy()
+        if self.stats is None:
+            self.stats = EquityAccumulator(np.array([float(self.simulator.initial_capital)]))
+        self.stats.update(value)
+
+        trades = result['trades']
+        closed = trades[trades['status'] == CLOSED]
+        self.open_trades = trades[trades['status'] != CLOSED]
+        timestamps = bar_timestamps(df, self.n_bars)
+
+        with open(self.path / EQUITY_FILE, 'ab') as f:
+            np.ascontiguousarray(value).tofile(f)
+        with open(self.path / TIMESTAMP_FILE, 'ab') as f:
+            timestamps.view('int64').tofile(f)
+        with open(self.path / TRADES_FILE, 'ab') as f:
+            closed.tofile(f)
+
+        self.n_bars += len(df)
+        self.n_closed += len(closed)
+        self.first_ts = timestamps[0] if self.first_ts is None else self.first_ts
+        self.last_ts = pd.Timestamp(timestamps[-1])
+        self.last_close = float(df['close'].iloc[-1])
+
+    def _truncate(self):
+        """把数据文件截断到状态记录的长度"""
+        sizes = {
+            EQUITY_FILE: self.n_bars * 8,
+            TIMESTAMP_FILE: self.n_bars * 8,
+            TRADES_FILE: self.n_closed * TRADE_DTYPE.itemsize,
+        }
+        for name, size in sizes.items():
+            path = self.path / name
+            if path.exists() and path.stat().st_size > size:
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+
+    # ==================== 结果 ====================
+
+    def trades(self) -> np.ndarray:
+        """全部交易记录（已平仓 + 未平仓，TRADE_DTYPE，按入场时间排序）"""
+        closed = np.fromfile(self.path / TRADES_FILE, dtype=TRADE_DTYPE, count=self.n_closed)
+        records = np.concatenate([closed, self.open_trades])
+        return records[np.argsort(records['entry_idx'], kind='stable')]
+
+    def equity(self) -> pd.Series:
+        """权益曲线（内存映射）"""
+        return load_equity(self.path).iloc[:, 0]
+
+    def metrics(self) -> Dict[str, Any]:
+        """当前的指标字典（与 EventDrivenSimulator.metrics 的列相同）"""
+        n_years = (pd.Timestamp(self.last_ts) - pd.Timestamp(self.first_ts)).days / 365.25
+        metrics = self.stats.result(YEAR / pd.Timedelta(self.simulator.freq), n_years)
+        index = pd.DatetimeIndex(load_timestamps(self.path)[:self.n_bars])
+        metrics.update(trade_stats_by_column(self.trades(), index, 1))
+        results = {k: v[0] for k, v in metrics.items()}
+        results['avg_trade_duration'] = pd.Timedelta(results['avg_trade_duration'])
+        return results
+
+
+# ==================== 使用示例 ====================
+if __name__ == "__main__":
+    from data.fetcher import DataFetcher
+    from strategies.ema_cross import EMACrossStrategy
+
+    fetcher = DataFetcher()
+    df = fetcher.fetch_ohlcv("BTC/USDT", "1h", 1000)
+
+    simulator = EventDrivenSimulator(initial_capital=10000, fees=0.0004)
+    strategy = EMACrossStrategy(20, 60)
+    path = state_dir_for(strategy, simulator, "BTC/USDT")
+
+    # 先在前 900 根K线上回测，再追加剩余的 100 根
+    IncrementalBacktest.create(path, df.iloc[:900], strategy, simulator, symbol="BTC/USDT")
+    results = IncrementalBacktest.load(path).extend(df)
+    print(f"总收益率: {results['total_return']:.2%}, 交易次数: {results['total_trades']}")
@@ -7,6 +7,248 @@ import numpy as np
 from typing import Dict, Any
 
 
+# TradeStatus.Closed（vectorbt 交易记录中 status 字段的取值）
+CLOSED = 1
+
+
+def max_streak(mask: np.ndarray) -> int:
+    """
+    布尔序列中最长连续 True 的长度（游程编码，无 Python 循环）
+    
+    Args:
+        mask: 布尔数组，如 pnl > 0
+    """
+    mask = np.asarray(mask, dtype=bool)
+    if not mask.any():
+        return 0
+    # 在两端补 False，diff 后 +1 为游程起点、-1 为游程终点
+    edges = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return int((ends - starts).max())
+
+
+def trade_stats(records: np.ndarray, index: pd.Index) -> Dict[str, Any]:
+    """
+    根据交易记录数组计算交易统计（只统计已平仓交易）
+    
+    Args:
+        records: portfolio.trades.values（结构化数组，字段含 status、pnl、return、
+                 entry_idx、exit_idx、entry_fees、exit_fees）
+        index: portfolio.wrapper.index，用于把 entry_idx/exit_idx 换算成时间
+        
+    Returns:
+        与 calculate_all 中交易统计部分相同的指标字典
+    """
+    trades = records[records['status'] == CLOSED]
+    n = len(trades)
+    
+    if n == 0:
+        return {
+            'total_trades': 0,
+            'winning_trades': 0,
+            'losing_trades': 0,
+            'win_rate': 0,
+            'avg_win': 0,
+            'avg_loss': 0,
+            'profit_factor': 0,
+            'avg_trade_duration': pd.Timedelta(0),
+            'max_consecutive_wins': 0,
+            'max_consecutive_losses': 0,
+            'total_fees': 0,
+        }
+    
+    win = trades['pnl'] > 0
+    returns = trades['return']
+    winning_returns = returns[win]
+    losing_returns = returns[~win]
+    n_win = int(win.sum())
+    
+    total_wins = winning_returns.sum() if n_win > 0 else 0
+    total_losses = abs(losing_returns.sum()) if n_win < n else 0
+    
+    # 与 records_readable 的 Entry/Exit Timestamp 一致：index 取值后转换为时间
+    entry_time = pd.to_datetime(np.asarray(index)[trades['entry_idx']])
+    exit_time = pd.to_datetime(np.asarray(index)[trades['exit_idx']])
+    
+    return {
+        'total_trades': n,
+        'winning_trades': n_win,
+        'losing_trades': n - n_win,
+        'win_rate': n_win / n,
+        'avg_win': winning_returns.mean() if n_win > 0 else 0,
+        'avg_loss': losing_returns.mean() if n_win < n else 0,
+        'profit_factor': total_wins / total_losses if total_losses != 0 else 0,
+        'avg_trade_duration': (exit_time - entry_time).mean(),
+        'max_consecutive_wins': max_streak(win),
+        'max_consecutive_losses': max_streak(~win),
+        'total_fees': trades['entry_fees'].sum() + trades['exit_fees'].sum(),
+    }
+
+
+# 年化因子：vectorbt 以 365 天为一年
+YEAR = pd.Timedelta(days=365)
+
+# calculate_all 的 sortino/volatility 按 252 个交易日年化（保持一致）
+TRADING_DAYS = 252
+
+
+def _column_streaks(cols: np.ndarray, flag: np.ndarray, n_cols: int):
+    """
+    按列计算最长连续 True / False 的长度（游程编码；交易记录按列有序）
+    
+    Returns:
+        (最长连续 True, 最长连续 False)，形状均为 (n_cols,)
+    """
+    longest_true = np.zeros(n_cols, dtype=np.int64)
+    longest_false = np.zeros(n_cols, dtype=np.int64)
+    if len(cols) == 0:
+        return longest_true, longest_false
+    
+    # 列变化或取值变化处开始一个新游程
+    new_run = np.ones(len(cols), dtype=bool)
+    new_run[1:] = (cols[1:] != cols[:-1]) | (flag[1:] != flag[:-1])
+    starts = np.flatnonzero(new_run)
+    lengths = np.diff(np.append(starts, len(cols)))
+    run_cols = cols[starts]
+    run_flag = flag[starts]
+    
+    np.maximum.at(longest_true, run_cols[run_flag], lengths[run_flag])
+    np.maximum.at(longest_false, run_cols[~run_flag], lengths[~run_flag])
+    return longest_true, longest_false
+
+
+def trade_stats_by_column(
+    records: np.ndarray,
+    index: pd.Index,
+    n_cols: int,
+    col_map: np.ndarray = None
+) -> Dict[str, np.ndarray]:
+    """
+    按列计算交易统计（trade_stats 的向量化版本，所有列一次完成）
+    
+    Args:
+        records: portfolio.trades.values
+        index: portfolio.wrapper.index
+        n_cols: 列数（或分组数）
+        col_map: 列到分组的映射（cash_sharing 分组组合时使用），None 表示不分组
+        
+    Returns:
+        {指标名: 形状为 (n_cols,) 的数组}，指标与 trade_stats 相同
+    """
+    trades = records[records['status'] == CLOSED]
+    cols = trades['col'] if col_map is None else np.asarray(col_map)[trades['col']]
+    win = trades['pnl'] > 0
+    returns = trades['return']
+    
+    def per_col(mask=None, weights=None):
+        c = cols if mask is None else cols[mask]
+        w = None if weights is None else (weights if mask is None else weights[mask])
+        return np.bincount(c, weights=w, minlength=n_cols)
+    
+    def ratio(a, b):
+        return np.divide(a, b, out=np.zeros(n_cols, dtype=float), where=b != 0)
+    
+    total_trades = per_col()
+    winning_trades = per_col(win)
+    losing_trades = total_trades - winning_trades
+    total_wins = per_col(win, returns)
+    total_losses = np.abs(per_col(~win, returns))
+    
+    # 持仓时长：与 records_readable 一致，index 取值转换为时间后相减
+    times = np.asarray(pd.to_datetime(np.asarray(index)), dtype='datetime64[ns]').view('int64')
+    durations = (times[trades['exit_idx']] - times[trades['entry_idx']]).astype(float)
+    avg_duration = np.round(ratio(per_col(weights=durations), total_trades)).astype('int64')
+    
+    max_wins, max_losses = _column_streaks(cols, win, n_cols)
+    
+    return {
+        'total_trades': total_trades,
+        'winning_trades': winning_trades,
+        'losing_trades': losing_trades,
+        'win_rate': ratio(winning_trades, total_trades),
+        'avg_win': ratio(total_wins, winning_trades),
+        'avg_loss': ratio(per_col(~win, returns), losing_trades),
+        'profit_factor': ratio(total_wins, total_losses),
+        'avg_trade_duration': avg_duration.astype('timedelta64[ns]'),
+        'max_consecutive_wins': max_wins,
+        'max_consecutive_losses': max_losses,
+        'total_fees': per_col(weights=trades['entry_fees'] + trades['exit_fees']),
+    }
+
+
+def equity_stats_by_column(
+    value: np.ndarray,
+    init_cash: np.ndarray,
+    ann_factor: float,
+    n_years: float = 0
+) -> Dict[str, np.ndarray]:
+    """
+    根据权益矩阵按列计算收益和风险指标（与 vectorbt / calculate_all 的定义一致）
+    
+    Args:
+        value: 权益矩阵 (n_bars, n_cols)
+        init_cash: 每列初始资金 (n_cols,)
+        ann_factor: 年化因子（一年包含的K线数，夏普比率使用）
+        n_years: 数据跨越的年数（年化收益使用），<= 0 时年化收益为 0
+        
+    Returns:
+        {指标名: 形状为 (n_cols,) 的数组}
+    """
+    value = np.asarray(value, dtype=float)
+    if value.ndim == 1:
+        value = value[:, None]
+    init_cash = np.broadcast_to(np.asarray(init_cash, dtype=float), value.shape[1:])
+    n_cols = value.shape[1]
+    
+    # 收益率序列：第一根K线相对初始资金
+    prev = np.vstack([init_cash[None, :], value[:-1]])
+    returns = np.divide(value - prev, prev, out=np.full_like(value, np.nan), where=prev != 0)
+    
+    final_value = value[-1]
+    total_return = (final_value - init_cash) / init_cash
+    annual_return = (1 + total_return) ** (1 / n_years) - 1 if n_years > 0 else np.zeros(n_cols)
+    
+    # 最大回撤：相对权益历史最高点
+    drawdown = value / np.maximum.accumulate(value, axis=0) - 1
+    max_drawdown = np.abs(np.nanmin(drawdown, axis=0))
+    
+    # 夏普比率（vectorbt: 样本标准差，标准差为 0 时为 inf）
+    n_valid = np.count_nonzero(~np.isnan(returns), axis=0)
+    mean = np.nanmean(returns, axis=0)
+    std = np.sqrt(np.nanvar(returns, axis=0) * n_valid / np.maximum(n_valid - 1, 1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(std == 0, np.inf, mean / std * np.sqrt(ann_factor))
+    sharpe = np.where(n_valid < 2, np.nan, sharpe)
+    
+    # 索提诺比率：只用下行收益，按交易日年化（与 calculate_sortino_ratio 一致）
+    downside = np.where(returns < 0, returns, 0.0)
+    n_down = np.count_nonzero(returns < 0, axis=0)
+    downside_std = np.sqrt(np.divide(
+        (downside ** 2).sum(axis=0), n_down,
+        out=np.zeros(n_cols), where=n_down > 0
+    ))
+    sortino = np.divide(
+        mean, downside_std,
+        out=np.zeros(n_cols), where=downside_std != 0
+    ) * np.sqrt(TRADING_DAYS)
+    
+    volatility = np.nanstd(returns, axis=0, ddof=1) * np.sqrt(TRADING_DAYS)
+    calmar = np.divide(annual_return, max_drawdown, out=np.zeros(n_cols), where=max_drawdown != 0)
+    
+    return {
+        'initial_capital': init_cash.copy(),
+        'final_value': final_value,
+        'total_return': total_return,
+        'annual_return': annual_return,
+        'max_drawdown': max_drawdown,
+        'sharpe_ratio': sharpe,
+        'sortino_ratio': sortino,
+        'volatility': volatility,
+        'calmar_ratio': calmar,
+    }
+
+
 class PerformanceMetrics:
     """
     性能指标计算器
@@ -45,89 +287,48 @@ class PerformanceMetrics:
         metrics['volatility'] = self.calculate_volatility()
         metrics['calmar_ratio'] = self.calculate_calmar_ratio()
         
-        # 交易统计（只统计已平仓的交易）
-        try:
-            # vectorbt 默认返回所有交易（包括未平仓），我们只要已平仓的
-            all_trades = self.portfolio.trades.records_readable
-            # 筛选已平仓的交易（Status 为 'Closed' 或 Exit Timestamp 不为空）
-            if 'Status' in all_trades.columns:
-                trades = all_trades[all_trades['Status'] == 'Closed']
-            elif 'Exit Timestamp' in all_trades.columns:
-                trades = all_trades[all_trades['Exit Timestamp'].notna()]
-            else:
-                trades = all_trades
-        except Exception:
-            trades = self.portfolio.trades.records_readable
+        # 交易统计（只统计已平仓的交易），直接基于 vectorbt 的结构化交易记录数组
+        metrics.update(trade_stats(self.portfolio.trades.values, self.portfolio.wrapper.index))
         
-        metrics['total_trades'] = len(trades) if len(trades) > 0 else 0
+        return metrics
+    
+    def calculate_columns(self) -> pd.DataFrame:
+        """
+        按列计算全部指标（适用于多列/宽表 Portfolio，如参数网格或多个交易对）
         
-        if len(trades) > 0:
-            try:
-                # 根据 vectorbt 文档，PnL 和 Return 是标准列名
-                metrics['winning_trades'] = len(trades[trades['PnL'] > 0])
-                metrics['losing_trades'] = len(trades[trades['PnL'] <= 0])
-                metrics['win_rate'] = metrics['winning_trades'] / metrics['total_trades'] if metrics['total_trades'] > 0 else 0
-                
-                winning_pnl = trades[trades['PnL'] > 0]['Return'].values
-                losing_pnl = trades[trades['PnL'] <= 0]['Return'].values
-                
-                metrics['avg_win'] = np.mean(winning_pnl) if len(winning_pnl) > 0 else 0
-                metrics['avg_loss'] = np.mean(losing_pnl) if len(losing_pnl) > 0 else 0
-                
-                total_wins = np.sum(winning_pnl) if len(winning_pnl) > 0 else 0
-                total_losses = abs(np.sum(losing_pnl)) if len(losing_pnl) > 0 else 0
-                metrics['profit_factor'] = total_wins / total_losses if total_losses != 0 else 0
-            except KeyError as e:
-                # 如果列不存在，打印可用列帮助调试
-                print(f"\n❌ 错误: 找不到必需的列 {e}")
-                print(f"可用的列: {trades.columns.tolist()}")
-                print(f"前几条记录:\n{trades.head()}\n")
-                raise  # 重新抛出异常，让用户看到问题
-            
-            # 计算交易持续时间（根据 vectorbt 文档使用 Entry/Exit Timestamp）
-            try:
-                if 'Exit Timestamp' in trades.columns and 'Entry Timestamp' in trades.columns:
-                    metrics['avg_trade_duration'] = (
-                        pd.to_datetime(trades['Exit Timestamp']) - 
-                        pd.to_datetime(trades['Entry Timestamp'])
-                    ).mean()
-                else:
-                    print(f"Warning: 找不到时间戳列。可用列: {trades.columns.tolist()}")
-                    metrics['avg_trade_duration'] = pd.Timedelta(0)
-            except Exception as e:
-                print(f"Warning: 无法计算交易持续时间: {e}")
-                metrics['avg_trade_duration'] = pd.Timedelta(0)
-            
-            metrics['max_consecutive_wins'] = self.calculate_max_consecutive_wins(trades)
-            metrics['max_consecutive_losses'] = self.calculate_max_consecutive_losses(trades)
-        else:
-            metrics['winning_trades'] = 0
-            metrics['losing_trades'] = 0
-            metrics['win_rate'] = 0
-            metrics['avg_win'] = 0
-            metrics['avg_loss'] = 0
-            metrics['profit_factor'] = 0
-            metrics['avg_trade_duration'] = pd.Timedelta(0)
-            metrics['max_consecutive_wins'] = 0
-            metrics['max_consecutive_losses'] = 0
+        所有列在一次数组运算中完成，没有逐列的 Python 循环。分组（cash_sharing）
+        组合按分组计算。
         
-        # 其他指标
-        # 计算总手续费（Entry Fees + Exit Fees）
-        try:
-            if len(trades) > 0:
-                total_fees = 0
-                if 'Entry Fees' in trades.columns:
-                    total_fees += trades['Entry Fees'].sum()
-                if 'Exit Fees' in trades.columns:
-                    total_fees += trades['Exit Fees'].sum()
-                metrics['total_fees'] = total_fees
-            else:
-                metrics['total_fees'] = 0
-        except Exception as e:
-            print(f"Warning: Could not calculate total_fees: {e}")
-            metrics['total_fees'] = 0
+        Returns:
+            以列（或分组）为索引的 DataFrame，列与 calculate_all 的指标相同
+        """
+        pf = self.portfolio
+        columns = pf.wrapper.get_columns()
+        grouper = pf.wrapper.grouper
+        col_map = grouper.get_groups() if grouper.is_grouped() else None
         
-        return metrics
+        freq = pf.wrapper.freq
+        ann_factor = YEAR / freq if freq is not None else np.nan
+        
+        metrics = equity_stats_by_column(
+            pf.value().to_numpy(),
+            np.asarray(pf.init_cash, dtype=float).reshape(-1),
+            ann_factor,
+            self._n_years()
+        )
+        metrics.update(trade_stats_by_column(
+            pf.trades.values, pf.wrapper.index, len(columns), col_map
+        ))
+        
+        return pd.DataFrame(metrics, index=columns)
+    
+    def _n_years(self) -> float:
+        """数据跨越的年数（与 calculate_annual_return 一致，无时间列时为 0）"""
+        try:
+            n_days = (self.df['timestamp'].iloc[-1] - self.df['timestamp'].iloc[0]).days
+        except Exception:
+            return 0
+        return n_days / 365.25
     
     def calculate_annual_return(self) -> float:
         """计算年化收益率"""
@@ -186,39 +387,11 @@ class PerformanceMetrics:
     
     def calculate_max_consecutive_wins(self, trades: pd.DataFrame) -> int:
         """计算最大连续盈利次数"""
-        if len(trades) == 0:
-            return 0
-        
-        wins = (trades['PnL'] > 0).astype(int)
-        max_consecutive = 0
-        current_consecutive = 0
-        
-        for win in wins:
-            if win:
-                current_consecutive += 1
-                max_consecutive = max(max_consecutive, current_consecutive)
-            else:
-                current_consecutive = 0
-        
-        return max_consecutive
+        return max_streak(trades['PnL'].to_numpy() > 0)
     
     def calculate_max_consecutive_losses(self, trades: pd.DataFrame) -> int:
         """计算最大连续亏损次数"""
-        if len(trades) == 0:
-            return 0
-        
-        losses = (trades['PnL'] <= 0).astype(int)
-        max_consecutive = 0
-        current_consecutive = 0
-        
-        for loss in losses:
-            if loss:
-                current_consecutive += 1
-                max_consecutive = max(max_consecutive, current_consecutive)
-            else:
-                current_consecutive = 0
-        
-        return max_consecutive
+        return max_streak(trades['PnL'].to_numpy() <= 0)
     
     def get_equity_curve(self) -> pd.Series:
         """获取权益曲线"""
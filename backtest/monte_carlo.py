@@ -0,0 +1,396 @@
+"""
+蒙特卡洛稳健性分析
+对已完成的回测做扰动（交易顺序重排、收益分块自助重采样、随机手续费/滑点），
+给出收益、回撤、夏普比率的置信区间
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .metrics import CLOSED, YEAR, equity_stats_by_column
+import config
+
+
+# 每条路径记录的指标
+PATH_METRICS = ['total_return', 'max_drawdown', 'sharpe_ratio']
+
+
+class MonteCarloAnalyzer:
+    """
+    蒙特卡洛分析器
+
+    三种扰动方法:
+        trade_reshuffle: 打乱交易的先后顺序（或有放回抽样），按笔复利得到权益路径
+        block_bootstrap: 对逐K线收益率做循环分块自助重采样，保留块内的自相关
+        cost_noise:      手续费/滑点在给定区间内随机取值，用同一组信号重新模拟
+
+    路径以 NumPy 矩阵按块生成，每块大小受 chunk_mb 限制；n_jobs > 1 时各块在进程池中并行。
+    每块使用独立的随机数种子（由 seed 派生），结果与 n_jobs 无关。
+    """
+
+    def __init__(
+        self,
+        n_paths: int = config.MONTE_CARLO_PATHS,
+        confidence: float = config.MONTE_CARLO_CONFIDENCE,
+        block_size: int = 24,
+        chunk_mb: float = config.MONTE_CARLO_CHUNK_MB,
+        seed: Optional[int] = None,
+        n_jobs: int = 1
+    ):
+        """
+        初始化
+
+        Args:
+            n_paths: 每种方法的路径数
+            confidence: 置信区间水平（如 0.95）
+            block_size: 分块自助重采样的块长度（K线数）
+            chunk_mb: 每块路径矩阵的内存上限（MB）
+            seed: 随机数种子
+            n_jobs: 并行进程数，1 表示串行，-1 表示使用全部CPU
+        """
+        self.n_paths = n_paths
+        self.confidence = confidence
+        self.block_size = block_size
+        self.chunk_mb = chunk_mb
+        self.seed = seed
+        self.n_jobs = n_jobs
+
+    # ==================== 入口 ====================
+
+    def run(
+        self,
+        engine,
+        df: pd.DataFrame,
+        strategy,
+        price_col: str = 'close',
+        methods: Tuple[str, ...] = ('trade_reshuffle', 'block_bootstrap', 'cost_noise')
+    ) -> Dict[str, Any]:
+        """
+        回测策略并运行蒙特卡洛分析
+
+        Args:
+            engine: BacktestEngine（提供资金、手续费、滑点、频率）
+            df: 价格数据
+            strategy: 策略对象（如 strategy_class(**best_params)）
+            price_col: 价格列名
+            methods: 要运行的扰动方法
+
+        Returns:
+            {'original': 原始回测指标, 方法名: 该方法的结果, ...}
+        """
+        print(f"\n{'='*60}")
+        print(f"🎲 蒙特卡洛分析: {strategy.name}（每种方法 {self.n_paths} 条路径）")
+        print(f"{'='*60}")
+
+        entries, exits = strategy.generate_signals(df)
+        portfolio = engine._simulate(df[price_col], entries, exits)
+        original = self._original(portfolio)
+
+        results: Dict[str, Any] = {'original': original}
+        for method in methods:
+            if method == 'trade_reshuffle':
+                results[method] = self.trade_reshuffle(portfolio)
+            elif method == 'block_bootstrap':
+                results[method] = self.block_bootstrap(portfolio)
+            elif method == 'cost_noise':
+                results[method] = self.cost_noise(engine, df[price_col], entries, exits)
+            else:
+                raise ValueError(f"未知的蒙特卡洛方法: {method}")
+
+        self._print_summary(results)
+        return results
+
+    # ==================== 扰动方法 ====================
+
+    def trade_reshuffle(self, portfolio, replace: bool = False) -> Dict[str, Any]:
+        """
+        交易顺序重排
+
+        每笔交易的收益取持仓期间组合权益的变化（入场前一根K线到离场K线，含手续费和滑点；
+        未平仓的交易计到最后一根K线），各笔复利后恰好等于回测的总收益。
+        总收益与交易顺序无关，重排主要反映回撤对交易顺序的敏感程度；
+        replace=True 时改为有放回抽样（交易自助法），总收益和夏普也会变化。
+
+        Args:
+            portfolio: 单列 vectorbt Portfolio
+            replace: 是否有放回抽样
+        """
+        trade_returns = _trade_equity_returns(portfolio)
+        if len(trade_returns) < 2:
+            print("⚠️  交易少于2笔，跳过交易顺序重排")
+            return {}
+
+        # 按笔计算时的年化因子：每年的交易笔数
+        n_years = _span_years(portfolio.wrapper.index)
+        ann_factor = len(trade_returns) / n_years if n_years > 0 else len(trade_returns)
+        shared = {
+            'trade_returns': trade_returns,
+            'replace': replace,
+            'ann_factor': ann_factor,
+        }
+        stats = self._map_chunks(_reshuffle_chunk, shared, len(trade_returns) * 3)
+        return self._summarize('trade_reshuffle', stats)
+
+    def block_bootstrap(self, portfolio, block_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        收益率循环分块自助重采样
+
+        Args:
+            portfolio: 单列 vectorbt Portfolio
+            block_size: 块长度（K线数），None 表示使用初始化时的设置
+        """
+        returns = np.nan_to_num(np.asarray(portfolio.returns(), dtype=float).reshape(-1))
+        freq = portfolio.wrapper.freq
+        shared = {
+            'returns': returns,
+            'block_size': max(1, min(block_size or self.block_size, len(returns))),
+            'ann_factor': YEAR / freq if freq is not None else np.nan,
+        }
+        stats = self._map_chunks(_bootstrap_chunk, shared, len(returns) * 3)
+        return self._summarize('block_bootstrap', stats)
+
+    def cost_noise(
+        self,
+        engine,
+        close: pd.Series,
+        entries: pd.Series,
+        exits: pd.Series,
+        fee_range: Optional[Tuple[float, float]] = None,
+        slippage_range: Optional[Tuple[float, float]] = None
+    ) -> Dict[str, Any]:
+        """
+        随机手续费/滑点：每条路径在区间内均匀抽取一组费率，用同一组信号重新模拟
+        （每块路径是一次宽表模拟，每列一条路径）
+
+        Args:
+            engine: BacktestEngine
+            close: 价格序列
+            entries, exits: 原始信号
+            fee_range: 手续费区间，None 表示引擎手续费的 0.5~2 倍
+            slippage_range: 滑点区间，None 表示引擎滑点的 0.5~2 倍
+        """
+        fee_range = fee_range or (engine.fees * 0.5, engine.fees * 2)
+        slippage_range = slippage_range or (engine.slippage * 0.5, engine.slippage * 2)
+        if fee_range[1] <= 0 and slippage_range[1] <= 0:
+            print("⚠️  手续费和滑点区间都为0，跳过成本扰动")
+            return {}
+
+        shared = {
+            'close': close.to_numpy(dtype=float),
+            'entries': np.asarray(entries, dtype=bool),
+            'exits': np.asarray(exits, dtype=bool),
+            'fee_range': fee_range,
+            'slippage_range': slippage_range,
+            'engine_kwargs': engine._engine_kwargs(),
+        }
+        # vectorbt 模拟会分配多个与路径矩阵同形的数组
+        stats = self._map_chunks(_cost_chunk, shared, len(close) * 8)
+        return self._summarize('cost_noise', stats)
+
+    # ==================== 内部工具 ====================
+
+    def _map_chunks(self, func: Callable, shared: Dict[str, Any], row_size: int) -> pd.DataFrame:
+        """
+        按块生成路径并合并结果
+
+        Args:
+            func: 块函数 func(shared, n_paths, seed_seq) -> 指标 DataFrame
+            shared: 所有块共用的数据（并行时每个子进程只传一次）
+            row_size: 每条路径占用的 float64 个数（用于确定块大小）
+        """
+        chunk = max(1, int(self.chunk_mb * 1024 ** 2 // (8 * max(row_size, 1))))
+        sizes = [min(chunk, self.n_paths - start) for start in range(0, self.n_paths, chunk)]
+        seeds = np.random.SeedSequence(self.seed).spawn(len(sizes))
+        n_workers = self.n_jobs if self.n_jobs >= 1 else (os.cpu_count() or 1)
+
+        if n_workers == 1 or len(sizes) == 1:
+            frames = [func(shared, size, seq) for size, seq in zip(sizes, seeds)]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=min(n_workers, len(sizes)),
+                initializer=_init_worker,
+                initargs=(shared,)
+            ) as pool:
+                frames = list(pool.map(_run_chunk, [func] * len(sizes), sizes, seeds))
+
+        return pd.concat(frames, ignore_index=True)
+
+    def _summarize(self, method: str, stats: pd.DataFrame) -> Dict[str, Any]:
+        """路径指标的置信区间"""
+        alpha = (1 - self.confidence) / 2
+        values = stats[PATH_METRICS].replace([np.inf, -np.inf], np.nan)
+        intervals = pd.DataFrame({
+            'lower': values.quantile(alpha),
+            'median': values.median(),
+            'upper': values.quantile(1 - alpha),
+            'mean': values.mean(),
+        })
+        return {
+            'method': method,
+            'paths': stats,
+            'intervals': intervals,
+            'prob_loss': float((stats['total_return'] < 0).mean()),
+        }
+
+    @staticmethod
+    def _original(portfolio) -> Dict[str, float]:
+        return {
+            'total_return': float(portfolio.total_return()),
+            'max_drawdown': float(abs(portfolio.max_drawdown())),
+            'sharpe_ratio': float(portfolio.sharpe_ratio()),
+        }
+
+    def _print_summary(self, results: Dict[str, Any]):
+        original = results['original']
+        names = {
+            'trade_reshuffle': '交易顺序重排',
+            'block_bootstrap': '收益分块重采样',
+            'cost_noise': '随机手续费/滑点',
+        }
+        labels = {'total_return': '总收益', 'max_drawdown': '最大回撤', 'sharpe_ratio': '夏普比率'}
+
+        print(f"\n原始回测: 总收益 {original['total_return']:.2%}, "
+              f"最大回撤 {original['max_drawdown']:.2%}, 夏普 {original['sharpe_ratio']:.2f}")
+        for method, result in results.items():
+            if method == 'original' or not result:
+                continue
+            print(f"\n📊 {names.get(method, method)}（{self.confidence:.0%} 置信区间）:")
+            for metric, row in result['intervals'].iterrows():
+                fmt = '{:.2f}' if metric == 'sharpe_ratio' else '{:.2%}'
+                print(f"  {labels[metric]}: [{fmt.format(row['lower'])}, {fmt.format(row['upper'])}]"
+                      f"  中位数 {fmt.format(row['median'])}")
+            print(f"  亏损概率: {result['prob_loss']:.2%}")
+
+
+def _trade_equity_returns(portfolio) -> np.ndarray:
+    """
+    每笔交易期间的权益收益率（按入场时间排序）
+
+    只做多、全仓时，两笔交易之间权益不变，所有笔的 (1 + 收益率) 之积等于 最终权益 / 初始资金
+    """
+    value = np.asarray(portfolio.value(), dtype=float).reshape(-1)
+    records = np.sort(portfolio.trades.values, order='entry_idx')
+    entry_idx = records['entry_idx'].astype(np.int64)
+    exit_idx = np.where(records['status'] == CLOSED, records['exit_idx'], len(value) - 1).astype(np.int64)
+    before = np.where(entry_idx > 0, value[np.maximum(entry_idx - 1, 0)], float(portfolio.init_cash))
+    return value[exit_idx] / before - 1
+
+
+def _span_years(index: pd.Index) -> float:
+    """时间索引跨越的年数（非时间索引时为 0）"""
+    if not isinstance(index, pd.DatetimeIndex) or len(index) < 2:
+        return 0
+    return (index[-1] - index[0]).days / 365.25
+
+
+# ==================== 块函数（可在子进程中运行） ====================
+
+_WORKER: Dict[str, Any] = {}
+
+
+def _init_worker(shared: Dict[str, Any]):
+    _WORKER['shared'] = shared
+
+
+def _run_chunk(func: Callable, n_paths: int, seed_seq: np.random.SeedSequence) -> pd.DataFrame:
+    return func(_WORKER['shared'], n_paths, seed_seq)
+
+
+def _path_stats(value: np.ndarray, init_cash: float, ann_factor: float) -> pd.DataFrame:
+    """权益矩阵 (n_steps, n_paths) 的路径指标"""
+    stats = equity_stats_by_column(value, np.full(value.shape[1], init_cash), ann_factor)
+    return pd.DataFrame({k: stats[k] for k in PATH_METRICS})
+
+
+def _return_path_stats(returns: np.ndarray, ann_factor: float) -> pd.DataFrame:
+    """
+    收益率矩阵 (n_steps, n_paths) 的路径指标
+
+    与 _path_stats 定义相同，但直接基于收益率计算，原地累乘，少分配几个同形矩阵
+    """
+    mean = returns.mean(axis=0)
+    std = returns.std(axis=0, ddof=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(std == 0, np.inf, mean / std * np.sqrt(ann_factor))
+
+    growth = np.add(returns, 1, out=returns)
+    np.cumprod(growth, axis=0, out=growth)
+    total_return = growth[-1] - 1
+    peak = np.maximum.accumulate(growth, axis=0)
+    np.divide(growth, peak, out=peak)
+    max_drawdown = 1 - peak.min(axis=0)
+
+    return pd.DataFrame({
+        'total_return': total_return,
+        'max_drawdown': max_drawdown,
+        'sharpe_ratio': sharpe,
+    })
+
+
+def _reshuffle_chunk(shared: Dict[str, Any], n_paths: int, seed_seq) -> pd.DataFrame:
+    rng = np.random.default_rng(seed_seq)
+    trade_returns = shared['trade_returns']
+    n = len(trade_returns)
+    if shared['replace']:
+        paths = trade_returns[rng.integers(0, n, size=(n, n_paths))]
+    else:
+        paths = rng.permuted(np.broadcast_to(trade_returns[:, None], (n, n_paths)), axis=0)
+    return _return_path_stats(paths, shared['ann_factor'])
+
+
+def _bootstrap_chunk(shared: Dict[str, Any], n_paths: int, seed_seq) -> pd.DataFrame:
+    rng = np.random.default_rng(seed_seq)
+    returns = shared['returns']
+    n, block = len(returns), shared['block_size']
+    n_blocks = -(-n // block)
+    # 循环分块：每条路径由 n_blocks 个随机起点的连续块拼接，超出末尾时回到开头
+    starts = rng.integers(0, n, size=(n_blocks, 1, n_paths))
+    idx = (starts + np.arange(block)[None, :, None]).reshape(n_blocks * block, n_paths)[:n]
+    np.remainder(idx, n, out=idx)
+    return _return_path_stats(returns[idx], shared['ann_factor'])
+
+
+def _cost_chunk(shared: Dict[str, Any], n_paths: int, seed_seq) -> pd.DataFrame:
+    import vectorbt as vbt
+
+    rng = np.random.default_rng(seed_seq)
+    fees = rng.uniform(*shared['fee_range'], size=n_paths)
+    slippage = rng.uniform(*shared['slippage_range'], size=n_paths)
+    kwargs = shared['engine_kwargs']
+
+    # 信号和价格沿列广播，每列使用各自的费率
+    entries = np.broadcast_to(shared['entries'][:, None], (len(shared['close']), n_paths))
+    exits = np.broadcast_to(shared['exits'][:, None], entries.shape)
+    portfolio = vbt.Portfolio.from_signals(
+        close=pd.Series(shared['close']),
+        entries=entries,
+        exits=exits,
+        init_cash=kwargs['initial_capital'],
+        fees=fees[None, :],
+        slippage=slippage[None, :],
+        freq=kwargs['freq']
+    )
+    stats = _path_stats(
+        portfolio.value().to_numpy(), kwargs['initial_capital'],
+        YEAR / pd.Timedelta(kwargs['freq'])
+    )
+    stats['fees'] = fees
+    stats['slippage'] = slippage
+    return stats
+
+
+# ==================== 使用示例 ====================
+if __name__ == "__main__":
+    from data.fetcher import DataFetcher
+    from strategies.ema_cross import EMACrossStrategy
+    from backtest.engine import BacktestEngine
+
+    fetcher = DataFetcher()
+    df = fetcher.fetch_ohlcv("BTC/USDT", "1h", 1000)
+
+    engine = BacktestEngine(initial_capital=10000, fees=0.0004)
+    analyzer = MonteCarloAnalyzer(n_paths=10000, seed=42, n_jobs=-1)
+    results = analyzer.run(engine, df, EMACrossStrategy(20, 60))
@@ -0,0 +1,213 @@
+"""
+多资产组合回测
+把多个交易对的价格和信号对齐成面板（行=时间，列=交易对），作为一个共享资金的组合一次模拟
+"""
+from typing import Dict, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import vectorbt as vbt
+
+
+# 分配规则:
+#   'equal':  每个交易对固定占组合价值的 1/N（N 为交易对数量），空仓的份额保留为现金
+#   'active': 每当持仓发生变化，所有持仓重新均分为 1/k（k 为当前持仓数量）
+#   dict / Series: 每个交易对的固定权重（总和超过1时按比例缩放）
+#   DataFrame: 随时间变化的目标权重（与价格面板同形），在持仓变化时生效
+ALLOCATIONS = ('equal', 'active')
+
+
+def align_panels(data: Dict[str, pd.DataFrame], price_col: str = 'close') -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    把 {交易对: DataFrame} 对齐成价格面板
+
+    Args:
+        data: 每个交易对的K线数据（含 timestamp 列时按时间对齐）
+        price_col: 价格列名
+
+    Returns:
+        (价格面板, 有效数据掩码)。上市前/缺失的K线用前后价格填充，掩码为 False，不允许交易
+    """
+    series = {}
+    for symbol, df in data.items():
+        close = df[price_col]
+        if 'timestamp' in df.columns:
+            close = pd.Series(close.to_numpy(), index=pd.DatetimeIndex(df['timestamp']))
+        series[symbol] = close[~close.index.duplicated(keep='last')]
+
+    close = pd.concat(series, axis=1, sort=True)
+    close.columns.name = 'symbol'
+    valid = close.notna()
+    close = close.ffill().bfill()
+    return close, valid
+
+
+def signal_panels(
+    data: Dict[str, pd.DataFrame],
+    strategy,
+    close: pd.DataFrame,
+    valid: pd.DataFrame
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    对每个交易对生成信号，并对齐到价格面板
+
+    Returns:
+        (entries 面板, exits 面板)，缺失K线上没有入场信号；
+        数据比面板先结束的交易对在最后一根有效K线上强制离场（之后的价格是向前填充的，不能再持仓）
+    """
+    entries = np.zeros(close.shape, dtype=bool)
+    exits = np.zeros(close.shape, dtype=bool)
+
+    for j, symbol in enumerate(close.columns):
+        df = data[symbol]
+        e, x = strategy.generate_signals(df)
+        index = pd.DatetimeIndex(df['timestamp']) if 'timestamp' in df.columns else df.index
+        e = pd.Series(e.to_numpy(dtype=bool), index=index)
+        x = pd.Series(x.to_numpy(dtype=bool), index=index)
+        e = e[~e.index.duplicated(keep='last')]
+        x = x[~x.index.duplicated(keep='last')]
+        entries[:, j] = e.reindex(close.index, fill_value=False).to_numpy()
+        exits[:, j] = x.reindex(close.index, fill_value=False).to_numpy()
+
+    mask = valid.to_numpy()
+    entries &= mask
+    ended = mask.any(axis=0) & ~mask[-1]
+    last_valid = len(mask) - 1 - np.argmax(mask[::-1], axis=0)
+    for j in np.flatnonzero(ended):
+        entries[last_valid[j], j] = False
+        exits[last_valid[j], j] = True
+    return (
+        pd.DataFrame(entries, index=close.index, columns=close.columns),
+        pd.DataFrame(exits, index=close.index, columns=close.columns)
+    )
+
+
+def position_panel(entries: pd.DataFrame, exits: pd.DataFrame) -> np.ndarray:
+    """
+    由信号得到每根K线的持仓状态（只做多，与 from_signals 的语义一致）
+
+    入场信号后持仓为1，直到出现离场信号；同一根K线同时有入场和离场时保持原状态。
+    """
+    e = entries.to_numpy(dtype=bool)
+    x = exits.to_numpy(dtype=bool)
+    state = np.where(e & ~x, 1.0, np.where(x & ~e, 0.0, np.nan))
+    state = pd.DataFrame(state).ffill().fillna(0.0).to_numpy()
+    return state
+
+
+def target_weights(
+    held: np.ndarray,
+    allocation: Union[str, dict, pd.Series, pd.DataFrame],
+    columns: pd.Index
+) -> np.ndarray:
+    """
+    按分配规则计算订单面板（目标权重，NaN 表示该K线不下单）
+
+    Args:
+        held: 持仓状态 (n_bars, n_assets)，1 为持有
+        allocation: 分配规则（见 ALLOCATIONS）
+        columns: 交易对列表
+
+    Returns:
+        与 held 同形的目标权重数组
+    """
+    n_bars, n_assets = held.shape
+    prev = np.vstack([np.zeros((1, n_assets)), held[:-1]])
+    changed = held != prev
+
+    if isinstance(allocation, str):
+        if allocation == 'equal':
+            weights = held / n_assets
+        elif allocation == 'active':
+            n_held = held.sum(axis=1, keepdims=True)
+            weights = np.divide(held, n_held, out=np.zeros_like(held), where=n_held > 0)
+            # 持仓数量变化时，所有持仓都重新均分
+            changed = changed | (changed.any(axis=1, keepdims=True) & (held > 0))
+        else:
+            raise ValueError(f"未知的分配规则: {allocation}，可选 {ALLOCATIONS} 或权重")
+    elif isinstance(allocation, pd.DataFrame):
+        w = allocation.reindex(columns=columns).to_numpy(dtype=float)
+        if w.shape != held.shape:
+            raise ValueError(f"权重面板形状 {w.shape} 与价格面板 {held.shape} 不一致")
+        weights = held * np.nan_to_num(w)
+    else:
+        w = pd.Series(allocation, dtype=float).reindex(columns).fillna(0.0).to_numpy()
+        if w.sum() > 1:
+            w = w / w.sum()
+        weights = held * w
+
+    return np.where(changed, weights, np.nan)
+
+
+def simulate_multi_asset(
+    close: pd.DataFrame,
+    entries: pd.DataFrame,
+    exits: pd.DataFrame,
+    allocation: Union[str, dict, pd.Series, pd.DataFrame] = 'equal',
+    init_cash: float = 10000,
+    fees: float = 0.0,
+    slippage: float = 0.0,
+    freq: str = None
+):
+    """
+    把整个面板作为一个共享资金的组合模拟
+
+    只在持仓变化的K线上按目标权重下单；同一根K线先卖后买（call_seq='auto'），
+    卖出释放的现金可立即用于买入。所有交易对在一次 vectorbt 调用中完成。
+
+    Returns:
+        vectorbt Portfolio（单一分组，cash_sharing=True）
+    """
+    held = position_panel(entries, exits)
+    size = target_weights(held, allocation, close.columns)
+
+    return vbt.Portfolio.from_orders(
+        close=close,
+        size=pd.DataFrame(size, index=close.index, columns=close.columns),
+        size_type='targetpercent',
+        init_cash=init_cash,
+        fees=fees,
+        slippage=slippage,
+        group_by=True,
+        cash_sharing=True,
+        call_seq='auto',
+        freq=freq
+    )
+
+
+def asset_breakdown(portfolio, columns: pd.Index) -> pd.DataFrame:
+    """
+    按交易对统计已平仓交易
+
+    Returns:
+        以交易对为索引的 DataFrame: trades, win_rate, pnl, fees
+    """
+    n_cols = len(columns)
+    records = portfolio.trades.values
+    closed = records['status'] == 1  # TradeStatus.Closed
+    cols = records['col'][closed]
+    pnl = records['pnl'][closed]
+
+    trades = np.bincount(cols, minlength=n_cols)
+    wins = np.bincount(cols[pnl > 0], minlength=n_cols)
+    fees = records['entry_fees'] + records['exit_fees']
+
+    return pd.DataFrame({
+        'trades': trades,
+        'win_rate': np.divide(wins, trades, out=np.zeros(n_cols), where=trades > 0),
+        'pnl': np.bincount(cols, weights=pnl, minlength=n_cols),
+        'fees': np.bincount(records['col'], weights=fees, minlength=n_cols),
+    }, index=columns)
+
+
+# ==================== 使用示例 ====================
+if __name__ == "__main__":
+    from data.fetcher import DataFetcher
+    from strategies.ema_cross import EMACrossStrategy
+    from backtest.engine import BacktestEngine
+
+    fetcher = DataFetcher()
+    data = fetcher.fetch_multiple_symbols(["BTC/USDT", "ETH/USDT", "BNB/USDT", "SOL/USDT"], "1h", 1000)
+
+    engine = BacktestEngine(initial_capital=10000, fees=0.0004)
+    results = engine.run_multi_asset(data, EMACrossStrategy(20, 60), allocation='active')
@@ -0,0 +1,728 @@
+"""
+参数搜索算法
+网格搜索之外的可插拔优化器：随机搜索、贝叶斯优化（TPE / 高斯过程）、逐次减半 / Hyperband、遗传算法
+与 optimize_parameters 使用相同的 strategy_class + param_ranges 接口，并有评估预算；
+param_ranges 中可以包含止损、止盈等订单参数（见 simulator.ORDER_PARAMS）
+"""
+import math
+import time
+from abc import ABC, abstractmethod
+from itertools import product
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from strategies.indicators import IndicatorCache
+from .engine import OPTIMIZE_METRICS
+
+
+class SearchSpace:
+    """
+    离散参数空间
+
+    每个参数是一个候选值列表，参数组合用各参数的索引坐标表示
+    """
+
+    def __init__(self, param_ranges: Dict[str, list]):
+        self.names = list(param_ranges.keys())
+        self.values = [list(v) for v in param_ranges.values()]
+        self.shape = tuple(len(v) for v in self.values)
+        self.size = int(np.prod(self.shape, dtype=np.int64)) if self.shape else 0
+
+    def params(self, coords: Tuple[int, ...]) -> dict:
+        """坐标 -> 参数字典"""
+        return {name: values[i] for name, values, i in zip(self.names, self.values, coords)}
+
+    def all_coords(self) -> List[Tuple[int, ...]]:
+        """全部坐标（网格搜索）"""
+        return list(product(*[range(n) for n in self.shape]))
+
+    def sample(self, rng: np.random.Generator, n: int, exclude=frozenset()) -> List[Tuple[int, ...]]:
+        """无放回地随机抽取 n 个未评估过的坐标"""
+        n = min(n, self.size - len(exclude))
+        if n <= 0:
+            return []
+
+        # 空间不大时直接在展开的索引上抽样
+        if self.size <= 1_000_000:
+            excluded = {int(np.ravel_multi_index(c, self.shape)) for c in exclude}
+            pool = np.setdiff1d(np.arange(self.size), np.fromiter(excluded, dtype=np.int64, count=len(excluded)))
+            flat = rng.choice(pool, size=n, replace=False)
+            return [tuple(int(i) for i in np.unravel_index(f, self.shape)) for f in flat]
+
+        chosen = []
+        seen = set(exclude)
+        while len(chosen) < n:
+            coords = tuple(int(rng.integers(m)) for m in self.shape)
+            if coords not in seen:
+                seen.add(coords)
+                chosen.append(coords)
+        return chosen
+
+    def normalize(self, coords: np.ndarray) -> np.ndarray:
+        """坐标缩放到 [0, 1]（高斯过程使用）"""
+        scale = np.maximum(np.array(self.shape, dtype=float) - 1, 1)
+        return np.asarray(coords, dtype=float) / scale
+
+
+class BaseOptimizer(ABC):
+    """
+    优化器基类
+
+    子类实现 _search，返回在全量数据上评估过的结果表。
+    预算 budget 以“全量数据回测次数”计：在一半数据上回测一次计 0.5。
+    """
+
+    name = "base"
+
+    def __init__(
+        self,
+        budget: Optional[int] = None,
+        objective: str = 'sharpe_ratio',
+        seed: Optional[int] = None,
+        n_jobs: int = 1
+    ):
+        """
+        初始化优化器
+
+        Args:
+            budget: 评估预算（全量数据回测次数），None 表示不限
+            objective: 最大化的目标指标
+            seed: 随机种子
+            n_jobs: 逐个回测时的进程数（策略不支持批量信号时生效）
+        """
+        self.budget = budget
+        self.objective = objective
+        self.seed = seed
+        self.n_jobs = n_jobs
+        self.history: List[pd.DataFrame] = []
+        self.n_evaluations = 0
+        self.cost = 0.0
+
+    def optimize(
+        self,
+        engine,
+        df: pd.DataFrame,
+        strategy_class,
+        param_ranges: Dict[str, list],
+        price_col: str = 'close'
+    ):
+        """
+        执行搜索
+
+        Returns:
+            (best_params, best_result, results_df)，与 optimize_parameters 一致
+        """
+        print(f"\n{'='*60}")
+        print(f"🔍 开始参数优化（{self.name}）...")
+        print(f"{'='*60}")
+
+        self.space = SearchSpace(param_ranges)
+        self.rng = np.random.default_rng(self.seed)
+        self.history = []
+        self.n_evaluations = 0
+        self.cost = 0.0
+        self._engine = engine
+        self._df = df
+        self._strategy_class = strategy_class
+        self._price_col = price_col
+        self._cache = IndicatorCache(df)
+
+        budget_str = "不限" if self.budget is None else self.budget
+        print(f"参数空间 {self.space.size} 种组合，评估预算 {budget_str}\n")
+
+        start = time.perf_counter()
+        results_df = self._search()
+        self.elapsed = time.perf_counter() - start
+
+        best_params = None
+        best_result = None
+        best_score = -np.inf
+        scores = self._scores(results_df)
+        if len(scores) > 0 and np.isfinite(scores).any():
+            best_idx = int(np.argmax(scores))
+            best_score = scores[best_idx]
+            best_params = {k: results_df[k].iloc[best_idx] for k in self.space.names}
+            best_params = {k: v.item() if hasattr(v, 'item') else v for k, v in best_params.items()}
+            best_result = engine._evaluate_params(df, strategy_class, best_params, price_col)
+
+        results_df = results_df.iloc[np.argsort(-scores, kind='stable')]
+
+        print(f"\n{'='*60}")
+        print("✅ 优化完成")
+        print(f"{'='*60}")
+        print(f"评估次数: {self.n_evaluations}（折合全量回测 {self.cost:.1f} 次），耗时 {self.elapsed:.2f}s")
+        print(f"最优参数: {best_params}")
+        print(f"最优{self.objective}: {best_score:.2f}")
+        print(f"\nTop 5 参数组合:")
+        print(results_df.head().to_string())
+
+        return best_params, best_result, results_df
+
+    @abstractmethod
+    def _search(self) -> pd.DataFrame:
+        """执行搜索，返回全量数据上的评估结果（参数列 + OPTIMIZE_METRICS）"""
+
+    # ==================== 工具方法 ====================
+
+    def _remaining(self) -> float:
+        return np.inf if self.budget is None else self.budget - self.cost
+
+    def _evaluate(self, coords_list: List[Tuple[int, ...]], df: pd.DataFrame = None, cache=None) -> pd.DataFrame:
+        """评估一组坐标，df 为数据子集时按数据比例计入成本"""
+        df = self._df if df is None else df
+        cache = self._cache if df is self._df else cache
+        fraction = len(df) / len(self._df)
+
+        param_list = [self.space.params(c) for c in coords_list]
+        results = self._engine.evaluate_params(
+            df, self._strategy_class, param_list, self._price_col, cache=cache, n_jobs=self.n_jobs
+        )
+        results['_coords'] = coords_list
+        results['_fraction'] = fraction
+
+        self.n_evaluations += len(coords_list)
+        self.cost += len(coords_list) * fraction
+        self.history.append(results)
+        return results
+
+    def _scores(self, results: pd.DataFrame) -> np.ndarray:
+        return objective_scores(results, self.objective)
+
+    def _report(self, results: pd.DataFrame, label: str = ""):
+        """打印进度；还没有全量数据上的结果时显示当前子集上的最优值"""
+        full = [h for h in self.history if h['_fraction'].iloc[0] >= 1.0]
+        best = max(self._scores(h).max() for h in (full or [results]))
+        print(f"进度: {self.n_evaluations} 次评估{label} - 当前最佳{self.objective}: {best:.2f}")
+
+    def _finalize(self, frames: List[pd.DataFrame]) -> pd.DataFrame:
+        """合并全量数据上的评估结果，去掉内部列和重复组合"""
+        columns = self.space.names + OPTIMIZE_METRICS
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        results = pd.concat(frames, ignore_index=True)
+        results = results.drop_duplicates('_coords', keep='last')
+        return results[columns].reset_index(drop=True)
+
+
+class GridSearchOptimizer(BaseOptimizer):
+    """网格搜索（作为基准）"""
+
+    name = "网格搜索"
+
+    def _search(self) -> pd.DataFrame:
+        coords = self.space.all_coords()
+        if self.budget is not None:
+            coords = coords[:int(self.budget)]
+        results = self._evaluate(coords)
+        self._report(results)
+        return self._finalize([results])
+
+
+class RandomSearchOptimizer(BaseOptimizer):
+    """随机搜索：在预算内无放回地随机抽取参数组合"""
+
+    name = "随机搜索"
+
+    def __init__(self, budget: int = 50, batch_size: int = 100, **kwargs):
+        """
+        Args:
+            budget: 评估次数
+            batch_size: 每批评估的组合数
+        """
+        super().__init__(budget=budget, **kwargs)
+        self.batch_size = batch_size
+
+    def _search(self) -> pd.DataFrame:
+        frames = []
+        seen = set()
+        while self._remaining() >= 1 and len(seen) < self.space.size:
+            coords = self.space.sample(self.rng, int(min(self.batch_size, self._remaining())), seen)
+            seen.update(coords)
+            frames.append(self._evaluate(coords))
+            self._report(frames[-1])
+        return self._finalize(frames)
+
+
+class BayesianOptimizer(BaseOptimizer):
+    """
+    贝叶斯优化
+
+    method='tpe': Tree-structured Parzen Estimator，按好/坏两组样本的核密度比选点
+    method='gp':  高斯过程 + Expected Improvement（需要 scikit-learn）
+    每轮提出 batch_size 个候选点，一起批量评估
+    """
+
+    name = "贝叶斯优化"
+
+    def __init__(
+        self,
+        budget: int = 50,
+        method: str = 'tpe',
+        n_initial: Optional[int] = None,
+        batch_size: int = 5,
+        gamma: float = 0.25,
+        n_candidates: int = 256,
+        **kwargs
+    ):
+        """
+        Args:
+            budget: 评估次数
+            method: 'tpe' 或 'gp'
+            n_initial: 随机初始化的点数，默认为预算的 1/5（至少5个；不限预算时按参数空间大小计算）
+            batch_size: 每轮提出的候选点数
+            gamma: TPE 中“好”样本所占比例
+            n_candidates: 每轮打分的候选点数
+        """
+        super().__init__(budget=budget, **kwargs)
+        if method not in ('tpe', 'gp'):
+            raise ValueError(f"未知的贝叶斯优化方法: {method}")
+        self.method = method
+        self.name = f"贝叶斯优化-{method.upper()}"
+        self.n_initial = n_initial
+        self.batch_size = batch_size
+        self.gamma = gamma
+        self.n_candidates = n_candidates
+
+    def _search(self) -> pd.DataFrame:
+        limit = self.space.size if self.budget is None else self.budget
+        n_initial = self.n_initial or max(5, int(limit) // 5)
+        n_initial = int(min(n_initial, self._remaining(), self.space.size))
+
+        frames = [self._evaluate(self.space.sample(self.rng, n_initial))]
+        seen = set(frames[0]['_coords'])
+        self._report(frames[-1], "（随机初始化）")
+
+        while self._remaining() >= 1 and len(seen) < self.space.size:
+            observed = pd.concat(frames, ignore_index=True)
+            X = np.array(observed['_coords'].tolist())
+            y = self._scores(observed)
+            k = int(min(self.batch_size, self._remaining(), self.space.size - len(seen)))
+
+            if self.method == 'gp':
+                coords = self._propose_gp(X, y, k, seen)
+            else:
+                coords = self._propose_tpe(X, y, k, seen)
+
+            seen.update(coords)
+            frames.append(self._evaluate(coords))
+            self._report(frames[-1])
+
+        return self._finalize(frames)
+
+    def _propose_tpe(self, X: np.ndarray, y: np.ndarray, k: int, seen: set) -> List[Tuple[int, ...]]:
+        """按 l(x)/g(x) 最大的原则选点，每个参数独立建模（有序候选值上的高斯核）"""
+        order = np.argsort(-y, kind='stable')
+        n_good = max(1, int(math.ceil(self.gamma * len(y))))
+        good, bad = X[order[:n_good]], X[order[n_good:]]
+
+        densities = []
+        for j, m in enumerate(self.space.shape):
+            grid = np.arange(m)
+            bandwidth = max(1.0, m / 5)
+            l = self._parzen(grid, good[:, j], bandwidth)
+            g = self._parzen(grid, bad[:, j], bandwidth) if len(bad) else np.full(m, 1.0 / m)
+            densities.append((l, g))
+
+        candidates = np.column_stack([
+            self.rng.choice(m, size=self.n_candidates, p=l)
+            for m, (l, _) in zip(self.space.shape, densities)
+        ])
+        score = sum(np.log(l[candidates[:, j]]) - np.log(g[candidates[:, j]])
+                    for j, (l, g) in enumerate(densities))
+
+        chosen = []
+        for i in np.argsort(-score, kind='stable'):
+            coords = tuple(int(c) for c in candidates[i])
+            if coords not in seen and coords not in chosen:
+                chosen.append(coords)
+            if len(chosen) == k:
+                break
+
+        # 候选点都评估过时随机补足
+        if len(chosen) < k:
+            chosen += self.space.sample(self.rng, k - len(chosen), seen | set(chosen))
+        return chosen
+
+    @staticmethod
+    def _parzen(grid: np.ndarray, points: np.ndarray, bandwidth: float) -> np.ndarray:
+        """离散网格上的高斯核密度（加均匀先验平滑）"""
+        weights = np.exp(-0.5 * ((grid[:, None] - points[None, :]) / bandwidth) ** 2).sum(axis=1)
+        density = weights + 1.0 / len(grid)
+        return density / density.sum()
+
+    def _propose_gp(self, X: np.ndarray, y: np.ndarray, k: int, seen: set) -> List[Tuple[int, ...]]:
+        """高斯过程 + Expected Improvement"""
+        try:
+            from scipy.stats import norm
+            from sklearn.gaussian_process import GaussianProcessRegressor
+            from sklearn.gaussian_process.kernels import Matern, WhiteKernel
+        except ImportError:
+            print("⚠️  未安装 scikit-learn，改用 TPE")
+            return self._propose_tpe(X, y, k, seen)
+
+        finite = np.isfinite(y)
+        if finite.sum() < 2:
+            return self.space.sample(self.rng, k, seen)
+
+        gp = GaussianProcessRegressor(
+            kernel=Matern(nu=2.5) + WhiteKernel(),
+            normalize_y=True,
+            random_state=self.seed
+        )
+        gp.fit(self.space.normalize(X[finite]), y[finite])
+
+        candidates = self.space.sample(self.rng, self.n_candidates, seen)
+        mu, sigma = gp.predict(self.space.normalize(np.array(candidates)), return_std=True)
+        sigma = np.maximum(sigma, 1e-9)
+        z = (mu - y[finite].max()) / sigma
+        ei = (mu - y[finite].max()) * norm.cdf(z) + sigma * norm.pdf(z)
+
+        return [candidates[i] for i in np.argsort(-ei, kind='stable')[:k]]
+
+
+class SuccessiveHalvingOptimizer(BaseOptimizer):
+    """
+    逐次减半
+
+    先在最近一小段数据上评估大量参数组合，每一轮保留前 1/eta，
+    数据量扩大 eta 倍，直到在全量数据上评估剩下的组合
+    """
+
+    name = "逐次减半"
+
+    def __init__(
+        self,
+        budget: int = 50,
+        eta: int = 3,
+        min_fraction: float = 1 / 9,
+        n_configs: Optional[int] = None,
+        min_bars: int = 200,
+        **kwargs
+    ):
+        """
+        Args:
+            budget: 预算（全量数据回测次数）
+            eta: 每轮淘汰比例（保留 1/eta）
+            min_fraction: 第一轮使用的数据比例
+            n_configs: 初始组合数，None 表示按预算自动确定
+            min_bars: 子集最少K线数（保证指标能算出来）
+        """
+        super().__init__(budget=budget, **kwargs)
+        self.eta = eta
+        self.min_fraction = min_fraction
+        self.n_configs = n_configs
+        self.min_bars = min_bars
+
+    def _rungs(self, min_fraction: float) -> List[float]:
+        """各轮使用的数据比例"""
+        rungs = []
+        r = min_fraction
+        while r < 1.0 - 1e-9:
+            rungs.append(r)
+            r *= self.eta
+        return rungs + [1.0]
+
+    def _bracket_cost(self, n: int, min_fraction: float) -> float:
+        cost = 0.0
+        for r in self._rungs(min_fraction):
+            cost += n * r
+            n = max(1, n // self.eta)
+        return cost
+
+    def _max_configs(self, budget: float, min_fraction: float) -> int:
+        """预算内能负担的最大初始组合数"""
+        n = 1
+        while n < self.space.size and self._bracket_cost(n + 1, min_fraction) <= budget:
+            n += 1
+        return n
+
+    def _subset(self, fraction: float) -> pd.DataFrame:
+        """最近 fraction 比例的数据"""
+        if fraction >= 1.0:
+            return self._df
+        n_bars = min(len(self._df), max(self.min_bars, int(len(self._df) * fraction)))
+        return self._df.iloc[-n_bars:]
+
+    def _run_bracket(self, n: int, min_fraction: float, exclude: set, label: str = "") -> Optional[pd.DataFrame]:
+        coords = self.space.sample(self.rng, n, exclude)
+        if not coords:
+            return None
+
+        results = None
+        for r in self._rungs(min_fraction):
+            df = self._subset(r)
+            results = self._evaluate(coords, df, cache=IndicatorCache(df))
+            self._report(results, f"{label}（数据比例 {r:.0%}，{len(coords)} 个组合）")
+            if r >= 1.0:
+                break
+            keep = max(1, len(coords) // self.eta)
+            order = np.argsort(-self._scores(results), kind='stable')[:keep]
+            coords = [coords[i] for i in order]
+
+        exclude.update(coords)
+        return results
+
+    def _search(self) -> pd.DataFrame:
+        n = self.n_configs or self._max_configs(self._remaining(), self.min_fraction)
+        results = self._run_bracket(n, self.min_fraction, set())
+        return self._finalize([results] if results is not None else [])
+
+
+class HyperbandOptimizer(SuccessiveHalvingOptimizer):
+    """
+    Hyperband
+
+    依次运行多个逐次减半分组（从“多组合、少数据”到“少组合、全量数据”），
+    对起始数据比例不敏感；预算用完即停止
+    """
+
+    name = "Hyperband"
+
+    def _search(self) -> pd.DataFrame:
+        s_max = max(0, int(round(math.log(1 / self.min_fraction, self.eta))))
+        frames = []
+        exclude = set()
+
+        while self._remaining() >= 1 and len(exclude) < self.space.size:
+            progressed = False
+            for s in range(s_max, -1, -1):
+                n = int(math.ceil((s_max + 1) / (s + 1) * self.eta ** s))
+                min_fraction = self.eta ** -s
+                # 预算不够跑满这个分组时缩小组合数
+                n = min(n, self._max_configs(self._remaining(), min_fraction))
+                if self._bracket_cost(n, min_fraction) > self._remaining():
+                    continue
+                results = self._run_bracket(n, min_fraction, exclude, f" [分组 s={s}]")
+                if results is not None:
+                    frames.append(results)
+                    progressed = True
+                if self._remaining() < 1:
+                    break
+            if not progressed:
+                break
+
+        return self._finalize(frames)
+
+
+class GeneticOptimizer(BaseOptimizer):
+    """
+    遗传算法
+
+    基因是各参数在候选值列表中的索引，连续参数可以给出很细的候选值
+    （如止损 0.5%~5% 每 0.1% 一档），参数空间不会被展开。每一代保留最优的 n_elite 个个体（精英），
+    其余个体由锦标赛选出的父代均匀交叉、再按索引做高斯变异产生。
+    一代中新出现的基因一次交给 evaluate_params（批量信号宽表 / 事件驱动模拟的逐列订单参数 / 进程池），
+    评估过的基因直接复用结果，不重复回测也不计入预算。相同 seed 的搜索过程完全可复现。
+    """
+
+    name = "遗传算法"
+
+    def __init__(
+        self,
+        budget: int = 200,
+        population_size: int = 20,
+        n_generations: Optional[int] = None,
+        n_elite: int = 2,
+        tournament_size: int = 3,
+        crossover_rate: float = 0.9,
+        mutation_rate: Optional[float] = None,
+        mutation_scale: float = 0.1,
+        patience: Optional[int] = None,
+        **kwargs
+    ):
+        """
+        Args:
+            budget: 评估次数（不同基因的回测次数）
+            population_size: 种群大小
+            n_generations: 最多进化的代数，None 表示直到预算用完
+            n_elite: 每代直接保留的最优个体数
+            tournament_size: 锦标赛选择每次比较的个体数
+            crossover_rate: 交叉概率（否则直接复制父代）
+            mutation_rate: 每个参数的变异概率，默认 1 / 参数个数
+            mutation_scale: 变异步长的标准差（占该参数候选值个数的比例）
+            patience: 连续多少代最优值没有提高时提前停止，None 表示不提前停止
+        """
+        super().__init__(budget=budget, **kwargs)
+        self.population_size = population_size
+        self.n_generations = n_generations
+        self.n_elite = n_elite
+        self.tournament_size = tournament_size
+        self.crossover_rate = crossover_rate
+        self.mutation_rate = mutation_rate
+        self.mutation_scale = mutation_scale
+        self.patience = patience
+
+    def _search(self) -> pd.DataFrame:
+        # 基因 -> 目标值（评估结果缓存）
+        self.genome_scores: Dict[Tuple[int, ...], float] = {}
+        self.cache_hits = 0
+        frames = []
+
+        n = int(min(self.population_size, self._remaining(), self.space.size))
+        population = self._evaluate_population(self.space.sample(self.rng, n), frames)
+        self._report(frames[-1], "（第 0 代）")
+
+        generation = 0
+        best = max(self.genome_scores.values(), default=-np.inf)
+        stall = 0
+        while self._remaining() >= 1 and len(self.genome_scores) < self.space.size:
+            if self.n_generations is not None and generation >= self.n_generations:
+                break
+            if self.patience is not None and stall >= self.patience:
+                print(f"连续 {stall} 代没有提高，提前停止")
+                break
+            generation += 1
+            population = self._evaluate_population(self._next_generation(population), frames)
+            self._report(frames[-1], f"（第 {generation} 代，复用 {self.cache_hits} 次）")
+
+            generation_best = max(self.genome_scores[c] for c in population)
+            stall = 0 if generation_best > best else stall + 1
+            best = max(best, generation_best)
+
+        return self._finalize(frames)
+
+    def _evaluate_population(self, population: List[Tuple[int, ...]], frames: List[pd.DataFrame]) -> List[Tuple[int, ...]]:
+        """整代一次评估未见过的基因，返回已有评估结果的个体（预算不够时丢弃多出的新基因）"""
+        new = [c for c in dict.fromkeys(population) if c not in self.genome_scores]
+        new = new[:int(min(len(new), self._remaining()))]
+        if new:
+            results = self._evaluate(new)
+            self.genome_scores.update(zip(new, self._scores(results)))
+            frames.append(results)
+        self.cache_hits += sum(c in self.genome_scores for c in population) - len(new)
+        return [c for c in population if c in self.genome_scores]
+
+    def _next_generation(self, population: List[Tuple[int, ...]]) -> List[Tuple[int, ...]]:
+        """精英 + 交叉变异产生的子代；子代全部评估过时引入随机个体，避免种群停滞"""
+        scores = np.array([self.genome_scores[c] for c in population])
+        order = np.argsort(-scores, kind='stable')
+        elites = list(dict.fromkeys(population[i] for i in order))[:self.n_elite]
+
+        children = []
+        while len(children) < self.population_size - len(elites):
+            parent_a = self._tournament(population, scores)
+            parent_b = self._tournament(population, scores)
+            children.append(self._mutate(self._crossover(parent_a, parent_b)))
+
+        if children and all(c in self.genome_scores for c in children):
+            n_random = max(1, len(children) // 10)
+            immigrants = self.space.sample(self.rng, n_random, self.genome_scores.keys())
+            children[len(children) - len(immigrants):] = immigrants
+        return elites + children
+
+    def _tournament(self, population: List[Tuple[int, ...]], scores: np.ndarray) -> Tuple[int, ...]:
+        """随机抽取 tournament_size 个个体，取目标值最高的"""
+        candidates = self.rng.integers(len(population), size=self.tournament_size)
+        return population[candidates[int(np.argmax(scores[candidates]))]]
+
+    def _crossover(self, parent_a: Tuple[int, ...], parent_b: Tuple[int, ...]) -> np.ndarray:
+        """均匀交叉：每个参数随机取自一个父代"""
+        child = np.array(parent_a)
+        if self.rng.random() < self.crossover_rate:
+            mask = self.rng.random(len(child)) < 0.5
+            child[mask] = np.array(parent_b)[mask]
+        return child
+
+    def _mutate(self, genome: np.ndarray) -> Tuple[int, ...]:
+        """按索引做高斯变异（步长至少一档），并限制在候选值范围内"""
+        shape = np.array(self.space.shape)
+        rate = self.mutation_rate if self.mutation_rate is not None else 1.0 / len(shape)
+        for j in np.flatnonzero((self.rng.random(len(shape)) < rate) & (shape > 1)):
+            step = int(round(self.rng.normal(0.0, self.mutation_scale * (shape[j] - 1))))
+            if step == 0:
+                step = 1 if self.rng.random() < 0.5 else -1
+            genome[j] = min(max(genome[j] + step, 0), shape[j] - 1)
+        return tuple(int(g) for g in genome)
+
+
+# ==================== 与网格最优对比 ====================
+
+def objective_scores(results: pd.DataFrame, objective: str = 'sharpe_ratio') -> np.ndarray:
+    """
+    用于比较的目标值：NaN、±inf 和没有交易的组合视为 -inf
+
+    没有交易时权益不变，夏普比率的分母为 0（结果为 inf），不能算作最优
+    """
+    scores = results[objective].to_numpy(dtype=float)
+    valid = np.isfinite(scores)
+    if 'total_trades' in results:
+        valid &= results['total_trades'].to_numpy(dtype=float) > 0
+    return np.where(valid, scores, -np.inf)
+
+
+def compare_to_grid(
+    results_df: pd.DataFrame,
+    grid_df: pd.DataFrame,
+    objective: str = 'sharpe_ratio'
+) -> Dict[str, float]:
+    """
+    对比搜索结果与网格搜索的最优值
+
+    Args:
+        results_df: 优化器返回的结果表
+        grid_df: 全网格评估结果
+        objective: 目标指标
+
+    Returns:
+        {'best_found', 'grid_optimum', 'gap', 'rank', 'percentile', 'grid_size'}
+        rank 为找到的最优值在全网格中的名次（1 表示找到了网格最优）；
+        两边都只比较有交易且目标值有限的组合（见 objective_scores）
+    """
+    grid_scores = objective_scores(grid_df, objective)
+    grid_scores = grid_scores[np.isfinite(grid_scores)]
+    found = objective_scores(results_df, objective).max(initial=-np.inf)
+    optimum = grid_scores.max() if len(grid_scores) else np.nan
+
+    return {
+        'best_found': found if np.isfinite(found) else np.nan,
+        'grid_optimum': optimum,
+        'gap': optimum - found,
+        'rank': int((grid_scores > found).sum()) + 1,
+        'percentile': float((grid_scores <= found).mean()) if len(grid_scores) else np.nan,
+        'grid_size': len(grid_df),
+    }
+
+
+def benchmark_optimizers(
+    engine,
+    df: pd.DataFrame,
+    strategy_class,
+    param_ranges: Dict[str, list],
+    optimizers: List[BaseOptimizer],
+    price_col: str = 'close',
+    grid_df: pd.DataFrame = None
+) -> pd.DataFrame:
+    """
+    用同一份数据比较多个优化器与网格最优的差距
+
+    Args:
+        grid_df: 已有的全网格结果，None 时自动评估全网格
+
+    Returns:
+        每个优化器一行：评估次数、成本、耗时、找到的最优值、与网格最优的差距和名次
+    """
+    if grid_df is None:
+        grid = SearchSpace(param_ranges)
+        grid_df = engine.evaluate_params(
+            df, strategy_class, [grid.params(c) for c in grid.all_coords()], price_col
+        )
+
+    rows = []
+    for optimizer in optimizers:
+        _, _, results_df = optimizer.optimize(engine, df, strategy_class, param_ranges, price_col)
+        rows.append({
+            '优化器': optimizer.name,
+            '评估次数': optimizer.n_evaluations,
+            '成本': round(optimizer.cost, 2),
+            '耗时(s)': round(optimizer.elapsed, 2),
+            **compare_to_grid(results_df, grid_df, optimizer.objective)
+        })
+
+    report = pd.DataFrame(rows)
+    print(f"\n{'='*80}")
+    print("📊 优化器对比（与网格最优）")
+    print(f"{'='*80}")
+    print(report.to_string(index=False))
+    return report
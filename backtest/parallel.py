@@ -0,0 +1,324 @@
+"""
+并行回测执行器
+用进程池逐个评估参数组合，价格数据通过共享内存只放一次；
+多个策略族可以共用同一个进程池（imap_families）
+"""
+import importlib
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def strategy_path(strategy_class) -> str:
+    """策略类的 'module:Class' 导入路径（传给子进程，子进程只导入这个策略）"""
+    return f"{strategy_class.__module__}:{strategy_class.__qualname__}"
+
+
+def load_strategy(path: str):
+    """根据 'module:Class' 导入策略类"""
+    module, _, class_name = path.partition(":")
+    return getattr(importlib.import_module(module), class_name)
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """在子进程中附加共享内存块，不让 resource_tracker 接管（由父进程负责释放）"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 没有 track 参数：子进程与父进程共用同一个 resource_tracker，
+        # 附加时临时跳过登记，否则父进程 unlink 后会重复注销
+        from multiprocessing import resource_tracker
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args, **kwargs: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+class SharedOHLCV:
+    """
+    共享内存中的价格数据
+
+    每个数值/时间列放进一个 SharedMemory 块，子进程按 handle 零拷贝地重建 DataFrame，
+    避免每个任务都 pickle 整个 DataFrame。
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        """
+        把 df 的数值列和时间列复制到共享内存
+
+        Args:
+            df: 价格数据（object 类型的列会被跳过）
+        """
+        self._blocks: List[shared_memory.SharedMemory] = []
+        self.columns: List[Tuple[str, str, str]] = []  # (列名, 共享内存名, dtype)
+        self.length = len(df)
+        self.index = None if isinstance(df.index, pd.RangeIndex) and df.index.start == 0 \
+            and df.index.step == 1 else self._put('__index__', df.index.to_numpy())
+
+        for col in df.columns:
+            values = df[col].to_numpy()
+            if values.dtype.kind not in 'biufM':
+                print(f"⚠️  列 {col} 不是数值类型，不放入共享内存")
+                continue
+            self.columns.append(self._put(col, values))
+
+    def _put(self, name: str, values: np.ndarray) -> Tuple[str, str, str]:
+        values = np.ascontiguousarray(values)
+        shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[:] = values
+        self._blocks.append(shm)
+        return name, shm.name, values.dtype.str
+
+    @property
+    def handle(self) -> Dict[str, Any]:
+        """可 pickle 的描述信息，传给子进程"""
+        return {'length': self.length, 'columns': self.columns, 'index': self.index}
+
+    @staticmethod
+    def attach(handle: Dict[str, Any]) -> Tuple[pd.DataFrame, List[shared_memory.SharedMemory]]:
+        """
+        在子进程中根据 handle 重建 DataFrame
+
+        Returns:
+            (DataFrame, 共享内存块列表) —— 块必须在 DataFrame 使用期间保持引用
+        """
+        blocks = []
+
+        def view(name: str, dtype: str) -> np.ndarray:
+            shm = _attach(name)
+            blocks.append(shm)
+            return np.ndarray((handle['length'],), dtype=np.dtype(dtype), buffer=shm.buf)
+
+        data = {col: view(name, dtype) for col, name, dtype in handle['columns']}
+        index = None
+        if handle['index'] is not None:
+            _, name, dtype = handle['index']
+            index = pd.Index(view(name, dtype))
+
+        return pd.DataFrame(data, index=index, copy=False), blocks
+
+    def close(self):
+        """释放共享内存"""
+        for shm in self._blocks:
+            try:
+                shm.close()
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ==================== 子进程 ====================
+
+# 每个子进程在初始化时附加一次共享数据，之后所有任务复用
+_WORKER: Dict[str, Any] = {}
+
+
+def _init_worker(handle: Dict[str, Any], engine_kwargs: Dict[str, Any]):
+    from strategies.indicators import IndicatorCache
+    from .engine import BacktestEngine
+
+    df, blocks = SharedOHLCV.attach(handle)
+    _WORKER['df'] = df
+    _WORKER['blocks'] = blocks
+    _WORKER['engine'] = BacktestEngine(**engine_kwargs)
+    _WORKER['strategies'] = {}
+    # 子进程内所有任务（包括不同策略族）共享的指标缓存
+    _WORKER['cache'] = IndicatorCache(df)
+
+
+def _worker_strategy(path: str):
+    strategies = _WORKER['strategies']
+    if path not in strategies:
+        strategies[path] = load_strategy(path)
+    return strategies[path]
+
+
+def _run_chunk(path: str, tasks: List[Tuple[int, dict]], price_col: str, metric_names: List[str]):
+    """在子进程中评估一批参数组合，只把少量指标和这批的阶段耗时传回父进程"""
+    from .profiling import StageProfiler
+
+    strategy_class = _worker_strategy(path)
+    engine = _WORKER['engine']
+    df = _WORKER['df']
+    profiler = StageProfiler(memory=engine.profile_memory, max_events=0)
+
+    output = []
+    for idx, params in tasks:
+        try:
+            result = engine._evaluate_params(df, strategy_class, params, price_col, profiler)
+            output.append((idx, params, {k: result[k] for k in metric_names}, None))
+        except Exception as e:
+            output.append((idx, params, None, repr(e)))
+    return output, profiler.summary()
+
+
+def _run_batch_chunk(path: str, tasks: List[Tuple[int, dict]], price_col: str, metric_names: List[str]):
+    """支持批量信号的策略：整块参数组合一次宽表模拟，指标取自子进程的共享指标缓存"""
+    from .engine import OPTIMIZE_METRICS
+    from .profiling import StageProfiler
+
+    strategy_class = _worker_strategy(path)
+    engine = _WORKER['engine']
+    if not getattr(strategy_class, 'supports_batch', False) or not set(metric_names) <= set(OPTIMIZE_METRICS):
+        return _run_chunk(path, tasks, price_col, metric_names)
+
+    profiler = StageProfiler(memory=engine.profile_memory, max_events=0)
+    try:
+        metrics_df = engine.evaluate_batch(
+            _WORKER['df'], strategy_class, [params for _, params in tasks], price_col, _WORKER['cache'], profiler
+        )
+    except Exception:
+        return _run_chunk(path, tasks, price_col, metric_names)
+    records = metrics_df[metric_names].to_dict('records')
+    output = [(idx, params, record, None) for (idx, params), record in zip(tasks, records)]
+    return output, profiler.summary()
+
+
+# ==================== 父进程 ====================
+
+class ParallelExecutor:
+    """
+    进程池执行器
+
+    价格数据在启动时放入共享内存，每个子进程附加一次；任务只携带
+    (策略导入路径, 参数)，结果按完成顺序流式返回。
+    """
+
+    def __init__(
+        self,
+        n_workers: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        mp_context=None
+    ):
+        """
+        初始化
+
+        Args:
+            n_workers: 进程数，None 或 -1 表示使用全部CPU
+            chunk_size: 每个任务包含的参数组合数，None 表示自动
+            mp_context: multiprocessing 上下文（如 get_context('spawn')）
+        """
+        if n_workers is None or n_workers < 1:
+            n_workers = os.cpu_count() or 1
+        self.n_workers = n_workers
+        self.chunk_size = chunk_size
+        self.mp_context = mp_context
+
+    def imap(
+        self,
+        df: pd.DataFrame,
+        strategy_class,
+        param_list: List[dict],
+        engine_kwargs: Dict[str, Any],
+        price_col: str = 'close',
+        metric_names: Optional[List[str]] = None,
+        profiler=None
+    ) -> Iterator[Tuple[int, dict, Optional[dict], Optional[str]]]:
+        """
+        并行评估参数组合，按完成顺序产出结果
+
+        Args:
+            df: 价格数据
+            strategy_class: 策略类（必须可以在子进程中按模块路径导入）
+            param_list: 参数字典列表
+            engine_kwargs: 子进程中创建 BacktestEngine 的参数
+            price_col: 价格列名
+            metric_names: 需要传回的指标名
+            profiler: StageProfiler，传入时累加各子进程的阶段耗时
+
+        Yields:
+            (参数序号, 参数, 指标字典, 错误信息)，成功时错误信息为 None
+        """
+        from .engine import OPTIMIZE_METRICS
+
+        metric_names = metric_names or OPTIMIZE_METRICS
+        path = strategy_path(strategy_class)
+        chunk_size = self.chunk_size or max(1, min(50, len(param_list) // (self.n_workers * 4)))
+        jobs = [(_run_chunk, path, chunk, None) for chunk in _chunks(list(enumerate(param_list)), chunk_size)]
+        for _, output in self._run(df, engine_kwargs, jobs, price_col, metric_names, profiler):
+            yield from output
+
+    def imap_families(
+        self,
+        df: pd.DataFrame,
+        families: List[Tuple[Any, List[dict]]],
+        engine_kwargs: Dict[str, Any],
+        price_col: str = 'close',
+        metric_names: Optional[List[str]] = None,
+        profiler=None,
+        batch_size: Optional[int] = None
+    ) -> Iterator[Tuple[int, int, dict, Optional[dict], Optional[str]]]:
+        """
+        在同一个进程池中评估多个策略族，按完成顺序产出结果
+
+        价格数据只放入共享内存一次；每个子进程有一个指标缓存，在所有策略族和任务之间共享。
+        支持批量信号的策略每个任务是一块参数组合的宽表模拟，其他策略逐个回测。
+
+        Args:
+            df: 价格数据
+            families: [(策略类, 参数字典列表), ...]
+            engine_kwargs: 子进程中创建 BacktestEngine 的参数
+            price_col: 价格列名
+            metric_names: 需要传回的指标名
+            profiler: StageProfiler，传入时累加各子进程的阶段耗时
+            batch_size: 批量策略每个任务的参数组合数，None 表示按进程数均分
+
+        Yields:
+            (策略族序号, 参数序号, 参数, 指标字典, 错误信息)，成功时错误信息为 None
+        """
+        from .engine import OPTIMIZE_METRICS
+
+        metric_names = metric_names or OPTIMIZE_METRICS
+        jobs = []
+        for family, (strategy_class, param_list) in enumerate(families):
+            tasks = list(enumerate(param_list))
+            if getattr(strategy_class, 'supports_batch', False):
+                size = batch_size or max(1, -(-len(tasks) // self.n_workers))
+                func = _run_batch_chunk
+            else:
+                size = self.chunk_size or max(1, min(50, len(tasks) // (self.n_workers * 4)))
+                func = _run_chunk
+            jobs += [(func, strategy_path(strategy_class), chunk, family) for chunk in _chunks(tasks, size)]
+
+        for family, output in self._run(df, engine_kwargs, jobs, price_col, metric_names, profiler):
+            for idx, params, metrics, error in output:
+                yield family, idx, params, metrics, error
+
+    def _run(self, df, engine_kwargs, jobs, price_col, metric_names, profiler):
+        """启动进程池并提交 (函数, 策略路径, 任务块, 标记) 列表，按完成顺序产出 (标记, 结果)"""
+        with SharedOHLCV(df) as shared, ProcessPoolExecutor(
+            max_workers=self.n_workers,
+            mp_context=self.mp_context,
+            initializer=_init_worker,
+            initargs=(shared.handle, engine_kwargs)
+        ) as pool:
+            futures = {
+                pool.submit(func, path, chunk, price_col, metric_names): tag
+                for func, path, chunk, tag in jobs
+            }
+            try:
+                for future in as_completed(futures):
+                    output, profile = future.result()
+                    if profiler is not None:
+                        profiler.merge(profile)
+                    yield futures[future], output
+            finally:
+                for future in futures:
+                    future.cancel()
+
+
+def _chunks(tasks: list, size: int) -> List[list]:
+    return [tasks[i:i + size] for i in range(0, len(tasks), size)]
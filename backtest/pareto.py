@@ -0,0 +1,205 @@
+"""
+多目标（Pareto）优化
+在参数网格的评估结果上精确筛选非支配解（Pareto 前沿），并按 NSGA-II 的方式
+做非支配排序和拥挤距离，用于在夏普、回撤、交易次数之间权衡
+"""
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+
+# 默认目标：指标名 -> 'max'（越大越好）或 'min'（越小越好）
+PARETO_OBJECTIVES = {
+    'sharpe_ratio': 'max',
+    'max_drawdown': 'min',
+    'total_trades': 'min',
+}
+
+# 分块筛选时每块的点数（先在块内去掉被支配的点，再合并筛选）
+PARETO_CHUNK_SIZE = 100_000
+
+
+def pareto_mask(costs: np.ndarray, chunk_size: int = PARETO_CHUNK_SIZE) -> np.ndarray:
+    """
+    非支配点的掩码（所有目标越小越好）
+
+    a 支配 b：a 的每个目标都不差于 b，且至少一个目标严格更好；完全相同的点互不支配，都会保留。
+    含 NaN 的点视为无效，不在前沿中。
+
+    两个目标时按第一个目标排序后扫描一遍（O(n log n)，与前沿大小无关）。
+    三个及以上目标时先按块筛选（块内被支配的点在全局也被支配），再在各块的前沿上做一次全局筛选；
+    每一步用当前点一次性剔除所有被它支配的点，耗时约为 O(前沿大小 x 点数)：
+    10^6 个点、前沿几百个点时在一秒左右完成，前沿有上万个点时会慢到分钟级。
+
+    Args:
+        costs: (n_points, n_objectives) 数组
+        chunk_size: 每块的点数
+
+    Returns:
+        (n_points,) 布尔数组
+    """
+    costs = np.asarray(costs, dtype=float)
+    if costs.ndim == 1:
+        costs = costs[:, None]
+    mask = np.zeros(len(costs), dtype=bool)
+    candidates = np.flatnonzero(~np.isnan(costs).any(axis=1))
+    if costs.shape[1] <= 2:
+        mask[candidates[_sweep(costs[candidates])]] = True
+        return mask
+
+    if len(candidates) > chunk_size:
+        candidates = np.concatenate([
+            chunk[_cull(costs[chunk])]
+            for chunk in np.array_split(candidates, -(-len(candidates) // chunk_size))
+        ])
+    mask[candidates[_cull(costs[candidates])]] = True
+    return mask
+
+
+def _sweep(costs: np.ndarray) -> np.ndarray:
+    """一个或两个目标时非支配点的位置（排序扫描）"""
+    if len(costs) == 0:
+        return np.empty(0, dtype=np.int64)
+    if costs.shape[1] == 1:
+        return np.flatnonzero(costs[:, 0] == costs[:, 0].min())
+    order = np.lexsort((costs[:, 1], costs[:, 0]))
+    first, second = costs[order, 0], costs[order, 1]
+    # 第一个目标相同的点为一组（组内按第二个目标升序），只有组内第二个目标最小的点可能不被支配
+    new_group = np.r_[True, first[1:] != first[:-1]]
+    group = np.cumsum(new_group) - 1
+    group_min = second[new_group]
+    # 第一个目标严格更小的各组中，第二个目标的最小值；组内最小值比它严格更小才不被支配
+    previous_min = np.r_[np.inf, np.minimum.accumulate(group_min)[:-1]]
+    keep = (second == group_min[group]) & (group_min < previous_min)[group]
+    return np.sort(order[keep])
+
+
+def _cull(costs: np.ndarray) -> np.ndarray:
+    """返回 costs 中非支配点的位置"""
+    # 按各目标排名之和排序，先处理的点往往能支配大量其他点，剩余点数下降得快
+    ranks = np.argsort(np.argsort(costs, axis=0), axis=0).sum(axis=1)
+    order = np.argsort(ranks, kind='stable')
+    remaining = costs[order]
+    index = order
+    i = 0
+    while i < len(remaining):
+        point = remaining[i]
+        # 保留：至少一个目标严格更好，或与当前点完全相同（包括当前点自己）
+        keep = (remaining < point).any(axis=1) | (remaining == point).all(axis=1)
+        index = index[keep]
+        remaining = remaining[keep]
+        i = int(keep[:i].sum()) + 1
+    return np.sort(index)
+
+
+def non_dominated_sort(costs: np.ndarray, max_fronts: Optional[int] = None) -> np.ndarray:
+    """
+    非支配排序（NSGA-II）：逐层剥离 Pareto 前沿
+
+    Args:
+        costs: (n_points, n_objectives) 数组，所有目标越小越好
+        max_fronts: 最多剥离的层数，None 表示全部
+
+    Returns:
+        每个点所在的层（0 为 Pareto 前沿），未分层或含 NaN 的点为 -1
+    """
+    costs = np.asarray(costs, dtype=float)
+    rank = np.full(len(costs), -1)
+    remaining = np.flatnonzero(~np.isnan(costs).any(axis=1))
+    front = 0
+    while len(remaining) and (max_fronts is None or front < max_fronts):
+        mask = pareto_mask(costs[remaining])
+        rank[remaining[mask]] = front
+        remaining = remaining[~mask]
+        front += 1
+    return rank
+
+
+def crowding_distance(costs: np.ndarray) -> np.ndarray:
+    """
+    拥挤距离（NSGA-II）：每个点在各目标上相邻两点间距（按目标取值范围归一化）之和，
+    每个目标上的边界点为 inf。距离越大，点所在的区域越稀疏
+
+    Args:
+        costs: 同一层前沿上的点 (n_points, n_objectives)
+    """
+    costs = np.asarray(costs, dtype=float)
+    n, m = costs.shape
+    distance = np.zeros(n)
+    if n <= 2:
+        return np.full(n, np.inf)
+    for j in range(m):
+        order = np.argsort(costs[:, j], kind='stable')
+        values = costs[order, j]
+        span = values[-1] - values[0]
+        distance[order[[0, -1]]] = np.inf
+        if span > 0:
+            distance[order[1:-1]] += (values[2:] - values[:-2]) / span
+    return distance
+
+
+def to_costs(results: pd.DataFrame, objectives: Dict[str, str]) -> np.ndarray:
+    """
+    把结果表中的目标列转换为越小越好的成本矩阵（'max' 目标取负）
+
+    任一目标值无效（NaN、±inf）或没有交易的行整行设为 NaN，不参与筛选：
+    没有交易时夏普为 inf、回撤为 0，会支配所有真实的参数组合
+    """
+    from .optimizers import objective_scores
+
+    for direction in objectives.values():
+        if direction not in ('max', 'min'):
+            raise ValueError(f"目标方向只能是 'max' 或 'min': {direction}")
+    costs = np.column_stack([
+        -results[name].to_numpy(dtype=float) if direction == 'max' else results[name].to_numpy(dtype=float)
+        for name, direction in objectives.items()
+    ])
+    invalid = np.zeros(len(results), dtype=bool)
+    for name in objectives:
+        invalid |= ~np.isfinite(objective_scores(results, name))
+    costs[invalid] = np.nan
+    return costs
+
+
+def pareto_front(
+    results: pd.DataFrame,
+    objectives: Optional[Dict[str, str]] = None,
+    chunk_size: int = PARETO_CHUNK_SIZE
+) -> pd.DataFrame:
+    """
+    从优化结果表中筛选 Pareto 前沿
+
+    Args:
+        results: optimize_parameters / evaluate_params 返回的结果表（参数列 + 指标列）
+        objectives: {指标名: 'max' 或 'min'}，默认 PARETO_OBJECTIVES
+        chunk_size: 分块筛选时每块的点数
+
+    Returns:
+        前沿上的行（保留原索引），另加 crowding_distance 列，按第一个目标从好到差排序
+    """
+    objectives = objectives or PARETO_OBJECTIVES
+    costs = to_costs(results, objectives)
+    mask = pareto_mask(costs, chunk_size)
+    front = results[mask].copy()
+    front['crowding_distance'] = crowding_distance(costs[mask])
+    first, direction = next(iter(objectives.items()))
+    return front.sort_values(first, ascending=direction == 'min', kind='stable')
+
+
+# ==================== 使用示例 ====================
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(42)
+    n = 1_000_000
+    results = pd.DataFrame({
+        'sharpe_ratio': rng.normal(0.5, 0.5, n),
+        'max_drawdown': rng.uniform(0.05, 0.6, n),
+        'total_trades': rng.integers(5, 500, n),
+    })
+
+    start = time.perf_counter()
+    front = pareto_front(results)
+    print(f"{n:,} 个点，前沿 {len(front)} 个点，耗时 {time.perf_counter() - start:.2f}s")
+    print(front.head(10).to_string())
@@ -0,0 +1,208 @@
+"""
+回测阶段剖析
+记录每个阶段（生成信号、模拟、计算指标、打印）的墙钟时间、CPU时间和峰值内存，
+可跨多次回测累计，并导出为 Chrome trace JSON（在 chrome://tracing 或 Perfetto 中查看）
+"""
+import json
+import math
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+
+# 单个阶段的统计项
+STAGE_FIELDS = ['calls', 'wall', 'cpu', 'peak_mb']
+
+# tracemalloc 是进程级的：所有剖析器共用一次跟踪，从第一个活动阶段开始，到最后一个活动阶段结束
+_TRACE_LOCK = threading.Lock()
+_trace_active = 0
+_trace_started = False
+
+
+def _trace_enter() -> int:
+    """进入一个记录内存的阶段，返回当前已分配内存（字节）"""
+    global _trace_active, _trace_started
+    with _TRACE_LOCK:
+        if _trace_active == 0:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _trace_started = True
+            tracemalloc.reset_peak()
+        _trace_active += 1
+        return tracemalloc.get_traced_memory()[0]
+
+
+def _trace_exit() -> int:
+    """离开一个记录内存的阶段，返回峰值内存（字节）；最后一个阶段结束时停止由这里启动的跟踪"""
+    global _trace_active, _trace_started
+    with _TRACE_LOCK:
+        peak = tracemalloc.get_traced_memory()[1]
+        _trace_active -= 1
+        if _trace_active == 0 and _trace_started:
+            tracemalloc.stop()
+            _trace_started = False
+        return peak
+
+
+class StageProfiler:
+    """
+    阶段剖析器
+
+    用法:
+        profiler = StageProfiler()
+        with profiler.stage('simulate'):
+            ...
+        profiler.summary()  # {'simulate': {'calls': 1, 'wall': 0.12, 'cpu': 0.11, 'peak_mb': nan}}
+
+    墙钟时间用 perf_counter，CPU 时间用 thread_time（只计当前线程，多线程并发时各阶段互不影响）；
+    memory=True 时用 tracemalloc 记录每个阶段内新分配内存的峰值（会明显拖慢运行，默认关闭）。
+    tracemalloc 的峰值是全进程的，只在没有其他活动阶段时重置；阶段嵌套或在多个线程中并发时，
+    峰值从最早仍在运行的阶段开始计算（包含其他线程的分配），是该阶段峰值的上界。
+    """
+
+    def __init__(self, memory: bool = False, max_events: int = 100000):
+        """
+        初始化
+
+        Args:
+            memory: 是否记录峰值内存（tracemalloc）
+            max_events: 最多保留的 trace 事件数（统计不受影响）
+        """
+        self.memory = memory
+        self.max_events = max_events
+        self.stats: Dict[str, Dict[str, float]] = {}
+        self.events: List[dict] = []
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        """记录一个阶段"""
+        base = _trace_enter() if self.memory else 0
+
+        wall0 = time.perf_counter()
+        cpu0 = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall0
+            cpu = time.thread_time() - cpu0
+            peak_mb = float('nan')
+            if self.memory:
+                peak_mb = max(_trace_exit() - base, 0) / 1024 ** 2
+            self._record(name, wall, cpu, peak_mb)
+            if len(self.events) < self.max_events:
+                self.events.append({
+                    'name': name,
+                    'start': wall0 - self._origin,
+                    'wall': wall,
+                    'cpu': cpu,
+                    'peak_mb': peak_mb,
+                    'tid': threading.get_ident(),
+                })
+
+    def _record(self, name: str, wall: float, cpu: float, peak_mb: float, calls: int = 1):
+        s = self.stats.setdefault(name, {'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'peak_mb': float('nan')})
+        s['calls'] += calls
+        s['wall'] += wall
+        s['cpu'] += cpu
+        # nan 表示未记录内存
+        if not math.isnan(peak_mb) and (math.isnan(s['peak_mb']) or peak_mb > s['peak_mb']):
+            s['peak_mb'] = peak_mb
+
+    def merge(self, summary: Dict[str, Dict[str, float]]):
+        """
+        累加另一次运行的统计（如 results['profile'] 或子进程传回的 summary()）
+
+        调用次数、时间相加，峰值内存取最大值。
+        """
+        for name, s in summary.items():
+            self._record(name, s['wall'], s['cpu'], s['peak_mb'], calls=int(s['calls']))
+        return self
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """{阶段名: {'calls', 'wall', 'cpu', 'peak_mb'}}，按阶段首次出现的顺序"""
+        return {name: dict(s) for name, s in self.stats.items()}
+
+    def to_frame(self) -> pd.DataFrame:
+        """统计表（每行一个阶段，另含占总墙钟时间的比例 share）"""
+        frame = pd.DataFrame.from_dict(self.stats, orient='index', columns=STAGE_FIELDS)
+        frame['calls'] = frame['calls'].astype(int)
+        total = frame['wall'].sum()
+        frame['share'] = frame['wall'] / total if total > 0 else 0.0
+        return frame
+
+    def print_summary(self, title: str = "阶段耗时"):
+        """打印统计表"""
+        if not self.stats:
+            return
+        frame = self.to_frame()
+        print(f"\n⏱️  {title}:")
+        for name, row in frame.iterrows():
+            peak = '' if math.isnan(row['peak_mb']) else f"  峰值内存 {row['peak_mb']:.1f}MB"
+            print(f"  {name:<18} {row['wall']:8.3f}s ({row['share']:6.1%})  CPU {row['cpu']:8.3f}s  "
+                  f"{int(row['calls'])} 次{peak}")
+
+    def to_chrome_trace(self, path) -> Path:
+        """
+        导出为 Chrome trace JSON（Trace Event Format，'X' 完整事件，时间单位微秒）
+
+        Args:
+            path: 输出文件路径
+
+        Returns:
+            输出文件路径
+        """
+        pid = os.getpid()
+        trace = []
+        for e in self.events:
+            args = {'cpu_ms': e['cpu'] * 1e3}
+            if not math.isnan(e['peak_mb']):
+                args['peak_mb'] = e['peak_mb']
+            trace.append({
+                'name': e['name'],
+                'cat': 'backtest',
+                'ph': 'X',
+                'ts': e['start'] * 1e6,
+                'dur': e['wall'] * 1e6,
+                'pid': pid,
+                'tid': e['tid'],
+                'args': args,
+            })
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
+        print(f"💾 trace 已保存到: {path}")
+        return path
+
+
+@contextmanager
+def optional_stage(profiler: Optional[StageProfiler], name: str):
+    """profiler 为 None 时不做任何记录"""
+    if profiler is None:
+        yield
+    else:
+        with profiler.stage(name):
+            yield
+
+
+# ==================== 使用示例 ====================
+if __name__ == "__main__":
+    import numpy as np
+
+    profiler = StageProfiler(memory=True)
+    for _ in range(3):
+        with profiler.stage('allocate'):
+            data = np.random.rand(1_000_000)
+        with profiler.stage('sort'):
+            np.sort(data)
+
+    profiler.print_summary()
+    profiler.to_chrome_trace(Path("results") / "profile_example.json")
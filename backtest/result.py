@@ -0,0 +1,226 @@
+"""
+回测结果
+只保存报告需要的数组（权益、交易记录、指标），不持有 vectorbt Portfolio；
+需要完整组合对象时用保存的信号重新模拟
+"""
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class BacktestResult(Mapping):
+    """
+    轻量回测结果
+
+    创建后不可修改（属性不能重新赋值，数组只读），可以在线程之间安全共享。
+    兼容只读字典访问（result['sharpe_ratio']、result.get(...)、dict(result)），
+    另外提供 value() / drawdown()（与 Portfolio 同名，可直接传给 Visualizer.plot_backtest_results）
+    和 portfolio()（按需重建 vectorbt Portfolio）。
+
+    每个结果占用的内存约为 K线数 x 8.25 字节（权益 float64 + 两列位压缩的信号）加上交易记录，
+    价格和时间只引用回测时的数据，不复制。
+    """
+
+    __slots__ = ('metrics', 'equity', 'trades', 'timestamps', '_entries', '_exits', '_close', '_sim_kwargs')
+
+    def __init__(
+        self,
+        metrics: Dict[str, Any],
+        equity: np.ndarray,
+        trades: np.ndarray,
+        timestamps: Optional[np.ndarray] = None,
+        signals: Optional[Tuple[Any, Any]] = None,
+        close: Optional[np.ndarray] = None,
+        sim_kwargs: Optional[Dict[str, Any]] = None
+    ):
+        """
+        初始化
+
+        Args:
+            metrics: 指标和策略信息（标量、小字典）
+            equity: 权益曲线
+            trades: 交易记录结构化数组（如 portfolio.trades.values）
+            timestamps: K线时间
+            signals: (entries, exits)，用于重建组合和 signals()
+            close: 回测使用的价格（用于重建组合）
+            sim_kwargs: 重建组合时传给 from_signals 的参数（init_cash、fees、slippage、freq）
+        """
+        entries = exits = None
+        if signals is not None:
+            entries = np.packbits(np.asarray(signals[0], dtype=bool))
+            exits = np.packbits(np.asarray(signals[1], dtype=bool))
+        self.__setstate__((None, {
+            'metrics': dict(metrics),
+            'equity': np.asarray(equity, dtype=np.float64),
+            'trades': trades,
+            'timestamps': timestamps,
+            '_entries': entries,
+            '_exits': exits,
+            '_close': close,
+            '_sim_kwargs': sim_kwargs,
+        }))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} 是只读的")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} 是只读的")
+
+    def __getstate__(self):
+        state = {name: getattr(self, name) for name in self.__slots__}
+        state['metrics'] = dict(self.metrics)
+        return None, state
+
+    def __setstate__(self, state):
+        """设置全部属性（构造和反序列化共用）：指标包装为只读映射，数组设为只读"""
+        for name, value in state[1].items():
+            if name == 'metrics':
+                value = MappingProxyType(dict(value))
+            elif isinstance(value, np.ndarray):
+                if value.flags.writeable:
+                    value = value.view()
+                value.flags.writeable = False
+            object.__setattr__(self, name, value)
+
+    @classmethod
+    def from_arrays(
+        cls,
+        metrics: Dict[str, Any],
+        equity,
+        trades: np.ndarray,
+        df: pd.DataFrame,
+        entries,
+        exits,
+        price_col: str = 'close',
+        sim_kwargs: Optional[Dict[str, Any]] = None
+    ) -> 'BacktestResult':
+        """由回测数据 df 和已有的权益、交易记录构造（如命中缓存时）"""
+        return cls(
+            metrics,
+            np.asarray(equity, dtype=np.float64),
+            trades,
+            timestamps=_timestamps(df),
+            signals=(entries, exits),
+            close=df[price_col].to_numpy(),
+            sim_kwargs=sim_kwargs
+        )
+
+    @classmethod
+    def from_portfolio(
+        cls,
+        portfolio,
+        metrics: Dict[str, Any],
+        df: pd.DataFrame,
+        entries,
+        exits,
+        price_col: str = 'close',
+        sim_kwargs: Optional[Dict[str, Any]] = None
+    ) -> 'BacktestResult':
+        """从 vectorbt 组合中取出权益和交易记录（之后不再引用组合对象）"""
+        return cls.from_arrays(
+            metrics, portfolio.value().to_numpy(), portfolio.trades.values.copy(),
+            df, entries, exits, price_col, sim_kwargs
+        )
+
+    # ==================== Mapping ====================
+
+    def __getitem__(self, key: str):
+        return self.metrics[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.metrics)
+
+    def __len__(self) -> int:
+        return len(self.metrics)
+
+    def __repr__(self):
+        name = self.metrics.get('strategy_name', '')
+        total_return = self.metrics.get('total_return', np.nan)
+        sharpe = self.metrics.get('sharpe_ratio', np.nan)
+        return (f"BacktestResult({name}, bars={len(self.equity)}, trades={len(self.trades)}, "
+                f"total_return={total_return:.2%}, sharpe={sharpe:.2f})")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """指标字典的副本"""
+        return dict(self.metrics)
+
+    # ==================== 报告数据 ====================
+
+    def value(self) -> pd.Series:
+        """权益曲线"""
+        return pd.Series(self.equity, index=self._index(), name='value')
+
+    def drawdown(self) -> pd.Series:
+        """回撤序列（相对权益历史最高点，负数）"""
+        return pd.Series(self.equity / np.maximum.accumulate(self.equity) - 1, index=self._index(), name='drawdown')
+
+    def trades_frame(self) -> pd.DataFrame:
+        """交易记录表（入场/离场时间由K线位置换算）"""
+        frame = pd.DataFrame(self.trades)
+        if self.timestamps is not None and len(frame):
+            frame['entry_time'] = self.timestamps[frame['entry_idx'].to_numpy()]
+            frame['exit_time'] = self.timestamps[frame['exit_idx'].to_numpy()]
+        return frame
+
+    def signals(self) -> Tuple[pd.Series, pd.Series]:
+        """回测使用的 (entries, exits)"""
+        if self._entries is None:
+            raise ValueError("结果中没有保存信号")
+        n = len(self.equity)
+        return (
+            pd.Series(np.unpackbits(self._entries, count=n).astype(bool)),
+            pd.Series(np.unpackbits(self._exits, count=n).astype(bool)),
+        )
+
+    def portfolio(self):
+        """用保存的信号和价格重新模拟，得到完整的 vectorbt Portfolio（不缓存）"""
+        import vectorbt as vbt
+
+        if self._close is None or self._entries is None or self._sim_kwargs is None:
+            raise ValueError("结果中没有保存重建组合所需的价格、信号或回测参数")
+        entries, exits = self.signals()
+        return vbt.Portfolio.from_signals(
+            close=pd.Series(self._close),
+            entries=entries,
+            exits=exits,
+            **self._sim_kwargs
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """结果自身持有的数组字节数（不含引用的价格和时间）"""
+        signals = 0 if self._entries is None else self._entries.nbytes + self._exits.nbytes
+        return self.equity.nbytes + self.trades.nbytes + signals
+
+    def _index(self):
+        return pd.DatetimeIndex(self.timestamps) if self.timestamps is not None else None
+
+
+def _timestamps(df: pd.DataFrame) -> Optional[np.ndarray]:
+    """df 的 timestamp 列（不复制）"""
+    if 'timestamp' not in df.columns:
+        return None
+    return df['timestamp'].to_numpy()
+
+
+# ==================== 使用示例 ====================
+if __name__ == "__main__":
+    from data.fetcher import DataFetcher
+    from strategies.ema_cross import EMACrossStrategy
+    from .engine import BacktestEngine
+
+    fetcher = DataFetcher()
+    df = fetcher.fetch_ohlcv("BTC/USDT", "1h", 1000)
+
+    # 保存大量结果时只占用权益和交易记录的内存
+    engine = BacktestEngine(initial_capital=10000, fees=0.0004)
+    runs = [engine.run(df, EMACrossStrategy(fast, 60)) for fast in (10, 20, 30)]
+    for result in runs:
+        print(result, f"{result.nbytes / 1024:.1f}KB")
+
+    print(runs[0].trades_frame().head())
+    portfolio = runs[0].portfolio()  # 需要 vectorbt 的完整分析时再重建
+    print(portfolio.stats())
@@ -0,0 +1,201 @@
+"""
+优化运行日志
+每评估完一个参数组合就写入 SQLite，中断后用相同 run_id 重新运行可跳过已完成的组合
+"""
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+import config
+
+
+DEFAULT_RUN_LOG = config.RESULTS_DIR / "optimization_runs.sqlite"
+
+
+def _plain(value):
+    """把 NumPy 标量（np.int64、np.float64 等）递归转换为 Python 内置类型，使哈希与类型无关"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    return value
+
+
+def _dumps(value) -> str:
+    return json.dumps(_plain(value), sort_keys=True, default=str)
+
+
+def param_hash(params: dict) -> str:
+    """参数字典的稳定哈希（与键顺序、NumPy/Python 数值类型无关）"""
+    return hashlib.sha1(_dumps(params).encode("utf-8")).hexdigest()
+
+
+class RunLog:
+    """
+    SQLite 运行日志
+
+    表结构:
+        runs(run_id, strategy, param_ranges, data, settings, created_at)
+            strategy 为策略类的导入路径，data 为数据指纹，settings 为引擎配置和价格列
+        results(run_id, param_hash, params, metrics, created_at)，主键 (run_id, param_hash)
+    """
+
+    def __init__(self, path: Path = DEFAULT_RUN_LOG):
+        """
+        打开（或创建）运行日志
+
+        Args:
+            path: SQLite 文件路径
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        # WAL 模式下每次提交都是持久的，且写入不阻塞读取
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                strategy TEXT,
+                param_ranges TEXT,
+                data TEXT,
+                settings TEXT,
+                created_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS results (
+                run_id TEXT NOT NULL,
+                param_hash TEXT NOT NULL,
+                params TEXT NOT NULL,
+                metrics TEXT NOT NULL,
+                created_at REAL,
+                PRIMARY KEY (run_id, param_hash)
+            );
+            """
+        )
+        # 旧版本创建的 runs 表没有 data / settings 列
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(runs)")}
+        for column in ('data', 'settings'):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE runs ADD COLUMN {column} TEXT")
+        self._conn.commit()
+
+    def start_run(
+        self,
+        run_id: str,
+        strategy: str,
+        param_ranges: Dict[str, list],
+        data: Optional[str] = None,
+        settings: Optional[dict] = None
+    ):
+        """
+        登记一次运行；run_id 已存在时检查是否是同一次运行
+
+        Args:
+            run_id: 运行ID
+            strategy: 策略类的导入路径
+            param_ranges: 参数范围
+            data: 数据指纹（backtest.cache.data_fingerprint）
+            settings: 影响结果的引擎配置（资金、手续费、滑点、频率、价格列）
+
+        Raises:
+            ValueError: 已有的同名运行的策略、参数范围、数据或引擎配置不同
+                （继续运行会跳过已完成的组合并返回旧结果）
+        """
+        record = {
+            'strategy': strategy,
+            'param_ranges': _dumps(param_ranges),
+            'data': data,
+            'settings': None if settings is None else _dumps(settings),
+        }
+        self._conn.execute(
+            "INSERT OR IGNORE INTO runs (run_id, strategy, param_ranges, data, settings, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (run_id, *record.values(), time.time())
+        )
+        self._conn.commit()
+
+        stored = self._conn.execute(
+            "SELECT strategy, param_ranges, data, settings FROM runs WHERE run_id = ?", (run_id,)
+        ).fetchone()
+        mismatched = [name for name, old in zip(record, stored) if old != record[name]]
+        if mismatched:
+            raise ValueError(
+                f"运行 {run_id!r} 已存在，但 {', '.join(mismatched)} 与本次不同，"
+                f"不能继续；请换一个 run_id，或先 delete_run({run_id!r})"
+            )
+
+    def completed(self, run_id: str) -> Set[str]:
+        """已完成的参数哈希集合"""
+        rows = self._conn.execute("SELECT param_hash FROM results WHERE run_id = ?", (run_id,))
+        return {row[0] for row in rows}
+
+    def append(self, run_id: str, records: Iterable[dict], param_names: List[str]):
+        """
+        追加评估结果并立即提交
+
+        Args:
+            run_id: 运行ID
+            records: 结果记录（参数 + 指标）
+            param_names: 参数列名，其余列视为指标
+        """
+        now = time.time()
+        rows = []
+        for record in records:
+            params = {k: record[k] for k in param_names}
+            metrics = {k: v for k, v in record.items() if k not in params}
+            rows.append((
+                run_id,
+                param_hash(params),
+                json.dumps(_plain(params), default=str),
+                json.dumps(metrics, default=float),
+                now
+            ))
+        if rows:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO results (run_id, param_hash, params, metrics, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def load(self, run_id: str) -> Dict[str, dict]:
+        """读取某次运行的全部结果 {参数哈希: 参数 + 指标}"""
+        rows = self._conn.execute(
+            "SELECT param_hash, params, metrics FROM results WHERE run_id = ?", (run_id,)
+        )
+        return {h: {**json.loads(p), **json.loads(m)} for h, p, m in rows}
+
+    def to_dataframe(self, run_id: str) -> pd.DataFrame:
+        """某次运行的结果表"""
+        return pd.DataFrame(list(self.load(run_id).values()))
+
+    def runs(self) -> pd.DataFrame:
+        """所有运行及其已完成的组合数"""
+        return pd.read_sql_query(
+            "SELECT r.run_id, r.strategy, r.created_at, COUNT(s.param_hash) AS completed "
+            "FROM runs r LEFT JOIN results s ON r.run_id = s.run_id GROUP BY r.run_id",
+            self._conn
+        )
+
+    def delete_run(self, run_id: str):
+        """删除某次运行"""
+        self._conn.execute("DELETE FROM results WHERE run_id = ?", (run_id,))
+        self._conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,519 @@
+"""
+事件驱动模拟器
+逐K线撮合，止损、止盈、移动止损和限价入场按 OHLC 的盘中高低点成交；
+核心循环用 Numba 编译，速度接近向量化回测，可以在参数优化中使用；
+编译时释放 GIL（nogil），多个线程可以同时模拟（见 BacktestEngine.run_batch）
+"""
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .metrics import YEAR, equity_stats_by_column, trade_stats_by_column
+
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover - numba 是 vectorbt 的依赖，通常都已安装
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+# 出场原因
+EXIT_SIGNAL = 0
+EXIT_STOP_LOSS = 1
+EXIT_TAKE_PROFIT = 2
+EXIT_TRAILING_STOP = 3
+EXIT_REASONS = {
+    EXIT_SIGNAL: '信号',
+    EXIT_STOP_LOSS: '止损',
+    EXIT_TAKE_PROFIT: '止盈',
+    EXIT_TRAILING_STOP: '移动止损',
+    -1: '未平仓',
+}
+
+# 入场时机
+ENTRY_TIMINGS = {'close': 0, 'next_open': 1}
+
+# 同一根K线上止损和止盈都被触及时，按哪个成交（K线内部路径未知）
+STOP_PRIORITIES = {'stop': 0, 'take_profit': 1}
+
+# 可以作为优化参数的订单参数：出现在参数网格中时按参数组合逐列设置，用事件驱动模拟器回测
+ORDER_PARAMS = ('sl_stop', 'tp_stop', 'tsl_stop', 'limit_offset', 'limit_expiry')
+
+# 交易记录（字段与 vectorbt 的 trades.values 兼容，可直接用于 trade_stats_by_column）
+TRADE_DTYPE = np.dtype([
+    ('col', np.int64),
+    ('size', np.float64),
+    ('entry_idx', np.int64),
+    ('entry_price', np.float64),
+    ('entry_fees', np.float64),
+    ('exit_idx', np.int64),
+    ('exit_price', np.float64),
+    ('exit_fees', np.float64),
+    ('pnl', np.float64),
+    ('return', np.float64),
+    ('status', np.int64),
+    ('exit_reason', np.int64),
+])
+
+# 每列的模拟状态（分块/增量回测时在调用之间传递）
+STATE_FIELDS = [
+    'cash',           # 现金
+    'size',           # 持仓数量
+    'entry_idx',      # 入场K线（全局位置）
+    'entry_price',    # 入场成交价（含滑点）
+    'entry_fees',     # 入场手续费
+    'peak',           # 入场以来的最高价（移动止损）
+    'pending_kind',   # 挂单类型: 0 无, 1 开盘市价, 2 限价
+    'pending_price',  # 限价
+    'pending_until',  # 挂单有效期（全局位置，含）
+]
+N_STATE = len(STATE_FIELDS)
+
+
+@njit(cache=True, nogil=True)
+def _buy(cash, price, fees, slippage):
+    """全仓买入，返回 (数量, 成交价, 手续费)"""
+    fill = price * (1.0 + slippage)
+    size = cash / (fill * (1.0 + fees))
+    return size, fill, size * fill * fees
+
+
+@njit(cache=True, nogil=True)
+def _sell(size, price, fees, slippage):
+    """全部卖出，返回 (成交价, 到手现金, 手续费)"""
+    fill = price * (1.0 - slippage)
+    value = size * fill
+    fee = value * fees
+    return fill, value - fee, fee
+
+
+@njit(cache=True, nogil=True)
+def simulate_nb(
+    open_, high, low, close,
+    entries, exits,
+    sl_stop, tp_stop, tsl_stop, limit_offset, limit_expiry,
+    fees, slippage,
+    entry_timing, stop_priority,
+    state, index_offset, max_records
+):
+    """
+    逐K线撮合（只做多，全仓）
+
+    每根K线的处理顺序:
+        1. 挂单：开盘市价单按开盘价成交；限价单在开盘价或最低价触及时成交，过期则撤销
+        2. 持仓（包括本根K线刚成交的）：先看开盘价是否跳空越过止损/止盈（按开盘价成交），
+           再看最低/最高价是否触及（按触发价成交），两者都触及时按 stop_priority
+        3. 收盘信号：离场信号按收盘价卖出；入场信号按收盘价买入、挂到下一根开盘或挂限价单
+           （同一根K线已经出场时不再入场，入场和离场信号同时出现时都忽略）
+
+    挂单成交的K线上只使用成交之后一定出现的价格：开盘成交时整根K线都在成交之后；
+    限价单在盘中触及时，价格先下探到限价才成交，最低价在成交之后，但最高价可能在成交之前，
+    这根K线上止盈和移动止损的最高价改用 max(成交价, 收盘价)。
+
+    Args:
+        open_, high, low, close: 价格 (n_bars,)
+        entries, exits: 信号 (n_bars, n_cols)
+        sl_stop, tp_stop, tsl_stop, limit_offset: 每列参数 (n_cols,)，NaN 表示不启用
+        limit_expiry: 限价单有效K线数 (n_cols,)
+        fees, slippage: 每列费率 (n_cols,)
+        entry_timing: 0 收盘价入场, 1 下一根开盘价入场
+        stop_priority: 0 止损优先, 1 止盈优先
+        state: 初始状态 (n_cols, N_STATE)，会被原地更新为结束状态
+        index_offset: 本段数据第一根K线的全局位置
+        max_records: 交易记录容量
+
+    Returns:
+        (权益矩阵, 交易记录各字段数组, 记录数)
+    """
+    n_bars, n_cols = entries.shape
+    # 列优先存储：内层循环沿K线方向连续访问
+    value = np.empty((n_cols, n_bars)).T
+
+    rec_col = np.empty(max_records, dtype=np.int64)
+    rec_size = np.empty(max_records)
+    rec_entry_idx = np.empty(max_records, dtype=np.int64)
+    rec_entry_price = np.empty(max_records)
+    rec_entry_fees = np.empty(max_records)
+    rec_exit_idx = np.empty(max_records, dtype=np.int64)
+    rec_exit_price = np.empty(max_records)
+    rec_exit_fees = np.empty(max_records)
+    rec_reason = np.empty(max_records, dtype=np.int64)
+    n_rec = 0
+
+    for c in range(n_cols):
+        cash = state[c, 0]
+        size = state[c, 1]
+        entry_idx = int(state[c, 2])
+        entry_price = state[c, 3]
+        entry_fees = state[c, 4]
+        peak = state[c, 5]
+        pending_kind = int(state[c, 6])
+        pending_price = state[c, 7]
+        pending_until = int(state[c, 8])
+
+        for i in range(n_bars):
+            g = index_offset + i
+            exited = False
+
+            # ---------- 1. 挂单 ----------
+            bar_open = open_[i]
+            bar_high = high[i]
+            if size == 0 and pending_kind != 0:
+                if g > pending_until:
+                    pending_kind = 0
+                else:
+                    fill_price = np.nan
+                    if pending_kind == 1:
+                        fill_price = open_[i]
+                    elif open_[i] <= pending_price:
+                        fill_price = open_[i]
+                    elif low[i] <= pending_price:
+                        fill_price = pending_price
+                    if not np.isnan(fill_price):
+                        size, entry_price, entry_fees = _buy(cash, fill_price, fees[c], slippage[c])
+                        cash -= size * entry_price + entry_fees
+                        entry_idx = g
+                        peak = entry_price
+                        pending_kind = 0
+                        # 成交之后的价格区间（见文档说明）
+                        if fill_price < open_[i]:
+                            bar_open = fill_price
+                            bar_high = max(fill_price, close[i])
+
+            # ---------- 2. 盘中止损/止盈 ----------
+            if size > 0:
+                stop_level = -np.inf
+                stop_reason = EXIT_STOP_LOSS
+                if not np.isnan(sl_stop[c]):
+                    stop_level = entry_price * (1.0 - sl_stop[c])
+                if not np.isnan(tsl_stop[c]):
+                    trail = peak * (1.0 - tsl_stop[c])
+                    if trail > stop_level:
+                        stop_level = trail
+                        stop_reason = EXIT_TRAILING_STOP
+                tp_level = np.inf
+                if not np.isnan(tp_stop[c]):
+                    tp_level = entry_price * (1.0 + tp_stop[c])
+
+                exit_price = np.nan
+                reason = EXIT_SIGNAL
+                if bar_open <= stop_level:
+                    exit_price, reason = bar_open, stop_reason
+                elif bar_open >= tp_level:
+                    exit_price, reason = bar_open, EXIT_TAKE_PROFIT
+                else:
+                    hit_stop = low[i] <= stop_level
+                    hit_tp = bar_high >= tp_level
+                    if hit_stop and (not hit_tp or stop_priority == 0):
+                        exit_price, reason = stop_level, stop_reason
+                    elif hit_tp:
+                        exit_price, reason = tp_level, EXIT_TAKE_PROFIT
+
+                if not np.isnan(exit_price):
+                    fill, proceeds, fee = _sell(size, exit_price, fees[c], slippage[c])
+                    if n_rec < max_records:
+                        rec_col[n_rec] = c
+                        rec_size[n_rec] = size
+                        rec_entry_idx[n_rec] = entry_idx
+                        rec_entry_price[n_rec] = entry_price
+                        rec_entry_fees[n_rec] = entry_fees
+                        rec_exit_idx[n_rec] = g
+                        rec_exit_price[n_rec] = fill
+                        rec_exit_fees[n_rec] = fee
+                        rec_reason[n_rec] = reason
+                        n_rec += 1
+                    cash += proceeds
+                    size = 0.0
+                    exited = True
+                elif bar_high > peak:
+                    peak = bar_high
+
+            # ---------- 3. 收盘信号 ----------
+            is_entry = entries[i, c] and not exits[i, c]
+            is_exit = exits[i, c] and not entries[i, c]
+
+            if is_exit and size > 0:
+                fill, proceeds, fee = _sell(size, close[i], fees[c], slippage[c])
+                if n_rec < max_records:
+                    rec_col[n_rec] = c
+                    rec_size[n_rec] = size
+                    rec_entry_idx[n_rec] = entry_idx
+                    rec_entry_price[n_rec] = entry_price
+                    rec_entry_fees[n_rec] = entry_fees
+                    rec_exit_idx[n_rec] = g
+                    rec_exit_price[n_rec] = fill
+                    rec_exit_fees[n_rec] = fee
+                    rec_reason[n_rec] = EXIT_SIGNAL
+                    n_rec += 1
+                cash += proceeds
+                size = 0.0
+                exited = True
+            elif is_entry and size == 0 and not exited:
+                if not np.isnan(limit_offset[c]):
+                    pending_kind = 2
+                    pending_price = close[i] * (1.0 - limit_offset[c])
+                    pending_until = g + int(limit_expiry[c])
+                elif entry_timing == 1:
+                    pending_kind = 1
+                    pending_until = g + 1
+                else:
+                    size, entry_price, entry_fees = _buy(cash, close[i], fees[c], slippage[c])
+                    cash -= size * entry_price + entry_fees
+                    entry_idx = g
+                    peak = max(entry_price, close[i])
+                    pending_kind = 0
+            elif is_exit and pending_kind != 0:
+                # 离场信号撤销尚未成交的挂单
+                pending_kind = 0
+
+            value[i, c] = cash + size * close[i]
+
+        state[c, 0] = cash
+        state[c, 1] = size
+        state[c, 2] = entry_idx
+        state[c, 3] = entry_price
+        state[c, 4] = entry_fees
+        state[c, 5] = peak
+        state[c, 6] = pending_kind
+        state[c, 7] = pending_price
+        state[c, 8] = pending_until
+
+    return (
+        value,
+        rec_col[:n_rec], rec_size[:n_rec], rec_entry_idx[:n_rec], rec_entry_price[:n_rec],
+        rec_entry_fees[:n_rec], rec_exit_idx[:n_rec], rec_exit_price[:n_rec],
+        rec_exit_fees[:n_rec], rec_reason[:n_rec],
+        n_rec
+    )
+
+
+def initial_state(n_cols: int, init_cash) -> np.ndarray:
+    """空仓的初始状态 (n_cols, N_STATE)"""
+    state = np.zeros((n_cols, N_STATE))
+    state[:, 0] = init_cash
+    state[:, 2] = -1
+    state[:, 8] = -1
+    return state
+
+
+def _as_matrix(signal, n_bars: int) -> np.ndarray:
+    array = np.asarray(signal, dtype=bool)
+    if array.ndim == 1:
+        array = array[:, None]
+    if array.shape[0] != n_bars:
+        raise ValueError(f"信号长度 {array.shape[0]} 与价格数据 {n_bars} 不一致")
+    # 列优先：模拟器逐列遍历K线
+    return np.asfortranarray(array)
+
+
+def _per_column(value, n_cols: int) -> np.ndarray:
+    """把标量或每列参数广播成 (n_cols,) 的 float 数组，None 表示不启用（NaN）"""
+    if value is None:
+        return np.full(n_cols, np.nan)
+    return np.ascontiguousarray(np.broadcast_to(np.asarray(value, dtype=float), (n_cols,)))
+
+
+def split_order_params(params: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """把参数组合拆成 (策略参数, 订单参数)"""
+    strategy_params = {k: v for k, v in params.items() if k not in ORDER_PARAMS}
+    order_params = {k: v for k, v in params.items() if k in ORDER_PARAMS}
+    return strategy_params, order_params
+
+
+class EventDrivenSimulator:
+    """
+    事件驱动模拟器
+
+    与 vectorbt 的 from_signals 一样全仓买入、全部卖出；不设置止损/限价且按收盘价入场时，
+    结果与 BacktestEngine 的向量化回测一致。止损、止盈等参数可以是标量或每列一个值
+    （信号宽表的每一列是一个独立组合，可直接用于参数网格）。
+    """
+
+    def __init__(
+        self,
+        initial_capital: float = 10000,
+        fees: float = 0.0,
+        slippage: float = 0.0,
+        freq: str = '1H',
+        sl_stop=None,
+        tp_stop=None,
+        tsl_stop=None,
+        limit_offset=None,
+        limit_expiry=1,
+        entry_timing: str = 'close',
+        stop_priority: str = 'stop'
+    ):
+        """
+        初始化
+
+        Args:
+            initial_capital: 初始资金
+            fees: 手续费率（标量或每列）
+            slippage: 滑点（标量或每列）
+            freq: K线频率（用于年化指标）
+            sl_stop: 止损比例，如 0.02；None 表示不止损
+            tp_stop: 止盈比例，如 0.04；None 表示不止盈
+            tsl_stop: 移动止损比例（相对入场以来最高价）；None 表示不启用
+            limit_offset: 限价入场相对信号K线收盘价的折价，如 0.005；None 表示市价入场
+            limit_expiry: 限价单有效K线数
+            entry_timing: 'close' 信号K线收盘价入场，'next_open' 下一根开盘价入场
+            stop_priority: 同一根K线止损和止盈都触及时按哪个成交，'stop'（保守）或 'take_profit'
+        """
+        if entry_timing not in ENTRY_TIMINGS:
+            raise ValueError(f"未知的入场时机: {entry_timing}，可选 {list(ENTRY_TIMINGS)}")
+        if stop_priority not in STOP_PRIORITIES:
+            raise ValueError(f"未知的止损优先级: {stop_priority}，可选 {list(STOP_PRIORITIES)}")
+        self.initial_capital = initial_capital
+        self.fees = fees
+        self.slippage = slippage
+        self.freq = freq
+        self.sl_stop = sl_stop
+        self.tp_stop = tp_stop
+        self.tsl_stop = tsl_stop
+        self.limit_offset = limit_offset
+        self.limit_expiry = limit_expiry
+        self.entry_timing = entry_timing
+        self.stop_priority = stop_priority
+
+    @classmethod
+    def from_engine(cls, engine, **kwargs) -> 'EventDrivenSimulator':
+        """使用 BacktestEngine 的资金、费率和频率配置"""
+        return cls(
+            initial_capital=engine.initial_capital,
+            fees=engine.fees,
+            slippage=engine.slippage,
+            freq=engine.freq,
+            **kwargs
+        )
+
+    def run(
+        self,
+        df: pd.DataFrame,
+        entries,
+        exits,
+        state: Optional[np.ndarray] = None,
+        index_offset: int = 0
+    ) -> Dict[str, Any]:
+        """
+        模拟
+
+        Args:
+            df: 价格数据（需要 open/high/low/close 列）
+            entries, exits: 信号 Series 或宽表（每列一个组合）
+            state: 上一段的结束状态（分块/增量回测），None 表示空仓开始
+            index_offset: df 第一根K线的全局位置（与 state 配合使用）
+
+        Returns:
+            {
+                'value': 权益 DataFrame（列与信号宽表一致）,
+                'trades': 交易记录结构化数组（TRADE_DTYPE）,
+                'state': 结束状态 (n_cols, N_STATE),
+            }
+        """
+        n_bars = len(df)
+        entries_arr = _as_matrix(entries, n_bars)
+        exits_arr = _as_matrix(exits, n_bars)
+        n_cols = entries_arr.shape[1]
+
+        if state is None:
+            state = initial_state(n_cols, self.initial_capital)
+        else:
+            state = np.array(state, dtype=float, copy=True)
+
+        prices = [np.ascontiguousarray(df[col].to_numpy(dtype=float)) for col in ('open', 'high', 'low', 'close')]
+        # 每笔交易都需要一个入场信号，另加一笔期初持仓
+        max_records = int(entries_arr.sum()) + n_cols
+
+        value, *fields, n_rec = simulate_nb(
+            *prices,
+            entries_arr, exits_arr,
+            _per_column(self.sl_stop, n_cols),
+            _per_column(self.tp_stop, n_cols),
+            _per_column(self.tsl_stop, n_cols),
+            _per_column(self.limit_offset, n_cols),
+            _per_column(self.limit_expiry, n_cols),
+            _per_column(self.fees, n_cols),
+            _per_column(self.slippage, n_cols),
+            ENTRY_TIMINGS[self.entry_timing],
+            STOP_PRIORITIES[self.stop_priority],
+            state, index_offset, max_records
+        )
+
+        trades = self._trade_records(fields, n_rec, state, prices[3], index_offset + n_bars - 1)
+        columns = entries.columns if isinstance(entries, pd.DataFrame) else pd.RangeIndex(n_cols)
+        return {
+            'value': pd.DataFrame(value, index=df.index, columns=columns),
+            'trades': trades,
+            'state': state,
+        }
+
+    def metrics(self, result: Dict[str, Any], df: pd.DataFrame) -> pd.DataFrame:
+        """
+        按列计算指标（与 PerformanceMetrics.calculate_columns 的列相同）
+
+        Args:
+            result: run() 的返回值
+            df: 价格数据（用于年化收益和持仓时长）
+        """
+        value = result['value']
+        n_cols = value.shape[1]
+        try:
+            n_days = (df['timestamp'].iloc[-1] - df['timestamp'].iloc[0]).days
+        except Exception:
+            n_days = 0
+        index = pd.DatetimeIndex(df['timestamp']) if 'timestamp' in df.columns else df.index
+
+        metrics = equity_stats_by_column(
+            value.to_numpy(),
+            _per_column(self.initial_capital, n_cols),
+            YEAR / pd.Timedelta(self.freq),
+            n_days / 365.25
+        )
+        metrics.update(trade_stats_by_column(result['trades'], index, n_cols))
+        return pd.DataFrame(metrics, index=value.columns)
+
+    @staticmethod
+    def _trade_records(fields, n_rec: int, state: np.ndarray, close: np.ndarray, last_idx: int) -> np.ndarray:
+        """组装已平仓交易记录，并按期末收盘价为未平仓持仓补一条 status=0 的记录"""
+        col, size, entry_idx, entry_price, entry_fees, exit_idx, exit_price, exit_fees, reason = fields
+        open_cols = np.flatnonzero(state[:, 1] > 0)
+
+        records = np.empty(n_rec + len(open_cols), dtype=TRADE_DTYPE)
+        records['col'] = np.concatenate([col, open_cols])
+        records['size'] = np.concatenate([size, state[open_cols, 1]])
+        records['entry_idx'] = np.concatenate([entry_idx, state[open_cols, 2].astype(np.int64)])
+        records['entry_price'] = np.concatenate([entry_price, state[open_cols, 3]])
+        records['entry_fees'] = np.concatenate([entry_fees, state[open_cols, 4]])
+        records['exit_idx'] = np.concatenate([exit_idx, np.full(len(open_cols), last_idx)])
+        records['exit_price'] = np.concatenate([exit_price, np.full(len(open_cols), close[-1])])
+        records['exit_fees'] = np.concatenate([exit_fees, np.zeros(len(open_cols))])
+        records['status'] = np.concatenate([np.ones(n_rec, dtype=np.int64), np.zeros(len(open_cols), dtype=np.int64)])
+        records['exit_reason'] = np.concatenate([reason, np.full(len(open_cols), -1)])
+
+        # 与 vectorbt 一致：收益率 = 盈亏 / 入场市值（不含手续费）
+        cost = records['size'] * records['entry_price']
+        records['pnl'] = records['size'] * (records['exit_price'] - records['entry_price']) \
+            - records['entry_fees'] - records['exit_fees']
+        records['return'] = np.divide(records['pnl'], cost, out=np.zeros(len(records)), where=cost != 0)
+
+        # 与 vectorbt 一致：按列、再按入场时间排序
+        return records[np.lexsort((records['entry_idx'], records['col']))]
+
+
+# ==================== 使用示例 ====================
+if __name__ == "__main__":
+    from data.fetcher import DataFetcher
+    from strategies.ema_cross import EMACrossStrategy
+    from backtest.engine import BacktestEngine
+
+    fetcher = DataFetcher()
+    df = fetcher.fetch_ohlcv("BTC/USDT", "1h", 1000)
+
+    engine = BacktestEngine(initial_capital=10000, fees=0.0004)
+    results = engine.run_event_driven(
+        df, EMACrossStrategy(20, 60),
+        sl_stop=0.02, tp_stop=0.04, tsl_stop=0.03
+    )
@@ -0,0 +1,346 @@
+"""
+分块回测
+按时间分块调用事件驱动模拟器，现金、持仓和挂单状态跨块传递；
+权益曲线和交易记录逐块追加写入磁盘，指标在写入时累计，内存占用只与块大小有关
+"""
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import config
+from .metrics import CLOSED, TRADING_DAYS, YEAR, trade_stats_by_column
+from .simulator import TRADE_DTYPE, EventDrivenSimulator
+
+# 输出目录中的文件
+EQUITY_FILE = "equity.f8"        # 权益 (n_bars, n_cols)，float64，按行追加
+TIMESTAMP_FILE = "timestamps.i8"  # K线时间，datetime64[ns]
+TRADES_FILE = "trades.bin"       # 交易记录，TRADE_DTYPE
+META_FILE = "meta.json"          # 列名、K线数、资金等
+
+
+class EquityAccumulator:
+    """
+    逐块累计权益指标（与 equity_stats_by_column 的定义一致）
+
+    总收益和最大回撤与一次性计算逐位相同；收益率的均值和方差按块合并（Chan 并行公式），
+    与一次性计算只有浮点舍入误差。
+    """
+
+    def __init__(self, init_cash: np.ndarray):
+        self.init_cash = np.asarray(init_cash, dtype=float)
+        n_cols = len(self.init_cash)
+        self.prev = self.init_cash.copy()
+        self.peak = np.full(n_cols, -np.inf)
+        self.min_drawdown = np.full(n_cols, np.nan)
+        self.n = np.zeros(n_cols)
+        self.mean = np.zeros(n_cols)
+        self.m2 = np.zeros(n_cols)
+        self.n_down = np.zeros(n_cols)
+        self.down_sq = np.zeros(n_cols)
+
+    def update(self, value: np.ndarray):
+        """累计一块权益 (n_bars, n_cols)"""
+        if len(value) == 0:
+            return
+        prev = np.vstack([self.prev[None, :], value[:-1]])
+        returns = np.divide(value - prev, prev, out=np.full_like(value, np.nan), where=prev != 0)
+        self.prev = value[-1].copy()
+
+        peak = np.maximum(np.maximum.accumulate(value, axis=0), self.peak)
+        self.peak = peak[-1]
+        self.min_drawdown = np.fmin(self.min_drawdown, np.nanmin(value / peak - 1, axis=0))
+
+        # 块内均值和离差平方和，再与之前的块合并
+        valid = ~np.isnan(returns)
+        n_b = valid.sum(axis=0)
+        block_mean = np.divide(np.where(valid, returns, 0.0).sum(axis=0), n_b, out=np.zeros_like(self.mean), where=n_b > 0)
+        block_m2 = (np.where(valid, returns - block_mean, 0.0) ** 2).sum(axis=0)
+        n = self.n + n_b
+        weight = np.divide(n_b, n, out=np.zeros_like(n), where=n > 0)
+        delta = block_mean - self.mean
+        self.mean = self.mean + delta * weight
+        self.m2 = self.m2 + block_m2 + delta ** 2 * self.n * weight
+        self.n = n
+
+        downside = np.where(returns < 0, returns, 0.0)
+        self.n_down += np.count_nonzero(returns < 0, axis=0)
+        self.down_sq += (downside ** 2).sum(axis=0)
+
+    def result(self, ann_factor: float, n_years: float = 0) -> Dict[str, np.ndarray]:
+        """指标字典（键与 equity_stats_by_column 相同）"""
+        n_cols = len(self.init_cash)
+        total_return = (self.prev - self.init_cash) / self.init_cash
+        annual_return = (1 + total_return) ** (1 / n_years) - 1 if n_years > 0 else np.zeros(n_cols)
+        max_drawdown = np.abs(self.min_drawdown)
+
+        mean = np.where(self.n > 0, self.mean, np.nan)
+        variance = np.divide(self.m2, np.maximum(self.n - 1, 1))
+        std = np.sqrt(variance)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sharpe = np.where(std == 0, np.inf, mean / std * np.sqrt(ann_factor))
+        sharpe = np.where(self.n < 2, np.nan, sharpe)
+
+        downside_std = np.sqrt(np.divide(self.down_sq, self.n_down, out=np.zeros(n_cols), where=self.n_down > 0))
+        sortino = np.divide(mean, downside_std, out=np.zeros(n_cols), where=downside_std != 0) * np.sqrt(TRADING_DAYS)
+        volatility = np.where(self.n > 1, std, np.nan) * np.sqrt(TRADING_DAYS)
+        calmar = np.divide(annual_return, max_drawdown, out=np.zeros(n_cols), where=max_drawdown != 0)
+
+        return {
+            'initial_capital': self.init_cash.copy(),
+            'final_value': self.prev.copy(),
+            'total_return': total_return,
+            'annual_return': annual_return,
+            'max_drawdown': max_drawdown,
+            'sharpe_ratio': sharpe,
+            'sortino_ratio': sortino,
+            'volatility': volatility,
+            'calmar_ratio': calmar,
+        }
+
+
+class StreamingBacktest:
+    """
+    分块回测
+
+    每块调用 EventDrivenSimulator.run，上一块的结束状态和全局K线位置传给下一块，
+    因此权益和交易记录与整段一次模拟完全一致。信号可以是完整数组（如 np.load(..., mmap_mode='r')
+    得到的内存映射，只有当前块会被读入内存），也可以按块由策略生成（见 run_strategy）。
+    """
+
+    def __init__(
+        self,
+        simulator: Optional[EventDrivenSimulator] = None,
+        block_size: int = config.STREAM_BLOCK_SIZE
+    ):
+        """
+        初始化
+
+        Args:
+            simulator: 事件驱动模拟器（资金、费率、止损等配置），None 表示使用默认配置
+            block_size: 每块的K线数
+        """
+        self.simulator = simulator or EventDrivenSimulator(
+            initial_capital=config.INITIAL_CAPITAL,
+            fees=config.TRADING_FEE,
+            slippage=config.SLIPPAGE,
+            freq=config.BACKTEST_FREQ
+        )
+        self.block_size = max(1, int(block_size))
+
+    @classmethod
+    def from_engine(cls, engine, block_size: int = config.STREAM_BLOCK_SIZE, **order_kwargs) -> 'StreamingBacktest':
+        """使用 BacktestEngine 的资金、费率和频率配置（order_kwargs 同 EventDrivenSimulator）"""
+        return cls(EventDrivenSimulator.from_engine(engine, **order_kwargs), block_size)
+
+    def run(self, df: pd.DataFrame, entries, exits, output_dir=None) -> Dict[str, Any]:
+        """
+        用完整信号分块回测
+
+        Args:
+            df: 价格数据（open/high/low/close，可选 timestamp）
+            entries, exits: 信号 Series / 宽表 / 数组（每列一个组合）
+            output_dir: 输出目录，None 表示 results/streaming/<时间>
+
+        Returns:
+            见 run_blocks
+        """
+        columns = entries.columns if isinstance(entries, pd.DataFrame) else None
+
+        def blocks():
+            for start in range(0, len(df), self.block_size):
+                stop = start + self.block_size
+                yield df.iloc[start:stop], _rows(entries, start, stop), _rows(exits, start, stop)
+
+        return self.run_blocks(blocks(), output_dir, columns)
+
+    def run_strategy(self, df: pd.DataFrame, strategy, output_dir=None, warmup: Optional[int] = None) -> Dict[str, Any]:
+        """
+        按块生成信号并回测
+
+        Args:
+            df: 价格数据
+            strategy: 交易策略对象
+            output_dir: 输出目录
+            warmup: 每块生成信号时向前多取的K线数。None 表示先在整段数据上生成信号
+                    （两列布尔值，结果与一次回测完全一致）；指定时只在 [块起点 - warmup, 块终点)
+                    上生成信号，有限窗口的指标（SMA、RSI 等）在 warmup 不小于窗口时结果一致，
+                    EMA 等递推指标只是近似
+        """
+        if warmup is None:
+            entries, exits = strategy.generate_signals(df)
+            return self.run(df, entries, exits, output_dir)
+
+        def blocks():
+            for start in range(0, len(df), self.block_size):
+                stop = start + self.block_size
+                lo = max(0, start - warmup)
+                entries, exits = strategy.generate_signals(df.iloc[lo:stop])
+                yield df.iloc[start:stop], _rows(entries, start - lo, None), _rows(exits, start - lo, None)
+
+        return self.run_blocks(blocks(), output_dir)
+
+    def run_blocks(
+        self,
+        blocks: Iterable[Tuple[pd.DataFrame, Any, Any]],
+        output_dir=None,
+        columns=None
+    ) -> Dict[str, Any]:
+        """
+        依次模拟 (价格块, 入场信号块, 离场信号块)，结果追加写入 output_dir
+
+        Returns:
+            {
+                'metrics': 指标 DataFrame（每列一行，列同 EventDrivenSimulator.metrics）,
+                'output_dir': 输出目录,
+                'n_bars': K线总数,
+                'state': 结束状态,
+            }
+        """
+        output_dir = Path(output_dir) if output_dir is not None else \
+            config.STREAM_OUTPUT_DIR / datetime.now().strftime('%Y%m%d_%H%M%S')
+        output_dir.mkdir(parents=True, exist_ok=True)
+        paths = {name: output_dir / name for name in (EQUITY_FILE, TIMESTAMP_FILE, TRADES_FILE)}
+        for path in paths.values():
+            path.unlink(missing_ok=True)
+
+        simulator = self.simulator
+        state = None
+        stats = None
+        offset = 0
+        first_ts = last_ts = None
+        last_block = None
+
+        with open(paths[EQUITY_FILE], 'ab') as equity_f, \
+                open(paths[TIMESTAMP_FILE], 'ab') as ts_f, \
+                open(paths[TRADES_FILE], 'ab') as trades_f:
+            for df_block, entries, exits, is_last in _lookahead(blocks):
+                if len(df_block) == 0:
+                    continue
+                result = simulator.run(df_block, entries, exits, state=state, index_offset=offset)
+                state = result['state']
+                value = result['value'].to_numpy()
+                if stats is None:
+                    n_cols = value.shape[1]
+                    stats = EquityAccumulator(np.broadcast_to(np.asarray(simulator.initial_capital, dtype=float), (n_cols,)))
+                    if columns is None:
+                        columns = result['value'].columns
+                stats.update(value)
+
+                # 未平仓的持仓会延续到下一块，只在最后一块写入（status=0）
+                trades = result['trades']
+                if not is_last:
+                    trades = trades[trades['status'] == CLOSED]
+                trades.tofile(trades_f)
+                np.ascontiguousarray(value).tofile(equity_f)
+
+                timestamps = bar_timestamps(df_block, offset)
+                timestamps.view('int64').tofile(ts_f)
+                first_ts = timestamps[0] if first_ts is None else first_ts
+                last_ts = timestamps[-1]
+                offset += len(df_block)
+                last_block = df_block
+
+        if stats is None:
+            raise ValueError("没有可回测的数据")
+
+        meta = {
+            'columns': [str(c) for c in columns],
+            'n_bars': offset,
+            'n_cols': len(columns),
+            'initial_capital': float(np.mean(simulator.initial_capital)),
+            'freq': simulator.freq,
+            'block_size': self.block_size,
+        }
+        with open(output_dir / META_FILE, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+        n_years = (pd.Timestamp(last_ts) - pd.Timestamp(first_ts)).days / 365.25 if last_block is not None else 0
+        metrics = stats.result(YEAR / pd.Timedelta(simulator.freq), n_years)
+        index = pd.DatetimeIndex(load_timestamps(output_dir))
+        metrics.update(trade_stats_by_column(load_trades(output_dir), index, len(columns)))
+
+        return {
+            'metrics': pd.DataFrame(metrics, index=pd.Index(columns)),
+            'output_dir': output_dir,
+            'n_bars': offset,
+            'state': state,
+        }
+
+
+# ==================== 读取输出 ====================
+
+def load_meta(output_dir) -> Dict[str, Any]:
+    """读取 meta.json"""
+    with open(Path(output_dir) / META_FILE, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_timestamps(output_dir) -> np.ndarray:
+    """K线时间（内存映射，datetime64[ns]）"""
+    return np.memmap(Path(output_dir) / TIMESTAMP_FILE, dtype='datetime64[ns]', mode='r')
+
+
+def load_equity(output_dir) -> pd.DataFrame:
+    """
+    权益曲线（数据为内存映射，按需读入）
+
+    Returns:
+        DataFrame，索引为K线时间，列与回测时的信号列一致
+    """
+    meta = load_meta(output_dir)
+    values = np.memmap(
+        Path(output_dir) / EQUITY_FILE, dtype=np.float64, mode='r',
+        shape=(meta['n_bars'], meta['n_cols'])
+    )
+    return pd.DataFrame(values, index=pd.DatetimeIndex(load_timestamps(output_dir)), columns=meta['columns'], copy=False)
+
+
+def load_trades(output_dir) -> np.ndarray:
+    """交易记录（TRADE_DTYPE，按列、再按入场时间排序，与一次模拟的顺序相同）"""
+    records = np.fromfile(Path(output_dir) / TRADES_FILE, dtype=TRADE_DTYPE)
+    return records[np.lexsort((records['entry_idx'], records['col']))]
+
+
+# ==================== 内部工具 ====================
+
+def _rows(signal, start: int, stop: Optional[int]):
+    """取信号的第 start 到 stop 行（Series/DataFrame 按位置，数组直接切片）"""
+    if isinstance(signal, (pd.Series, pd.DataFrame)):
+        return signal.iloc[start:stop]
+    return np.asarray(signal[start:stop])
+
+
+def bar_timestamps(df: pd.DataFrame, offset: int) -> np.ndarray:
+    """块内K线时间；没有 timestamp 列时用全局位置代替（纳秒）"""
+    if 'timestamp' in df.columns:
+        return np.asarray(pd.to_datetime(df['timestamp']), dtype='datetime64[ns]')
+    return np.arange(offset, offset + len(df)).astype('datetime64[ns]')
+
+
+def _lookahead(blocks: Iterable[Tuple[pd.DataFrame, Any, Any]]) -> Iterator[Tuple[pd.DataFrame, Any, Any, bool]]:
+    """逐块产出 (价格块, 入场信号, 离场信号, 是否最后一块)"""
+    iterator = iter(blocks)
+    current = next(iterator, None)
+    while current is not None:
+        following = next(iterator, None)
+        yield (*current, following is None)
+        current = following
+
+
+# ==================== 使用示例 ====================
+if __name__ == "__main__":
+    from data.fetcher import DataFetcher
+    from strategies.ema_cross import EMACrossStrategy
+    from backtest.engine import BacktestEngine
+
+    fetcher = DataFetcher()
+    df = fetcher.fetch_ohlcv("BTC/USDT", "1h", 1000)
+
+    stream = StreamingBacktest.from_engine(BacktestEngine(), block_size=200)
+    result = stream.run_strategy(df, EMACrossStrategy(20, 60))
+    print(result['metrics'].T)
+    print(load_equity(result['output_dir']).tail())
@@ -0,0 +1,513 @@
+"""
+组合清洗交叉验证（Combinatorial Purged Cross-Validation, CPCV）
+把K线按时间顺序分成 N 组，任取 k 组作为测试集、其余作为训练集（共 C(N, k) 种划分），
+训练集去掉紧邻测试集的清洗区（purge，测试集之前）和禁入区（embargo，测试集之后）；
+据此估计参数优化的回测过拟合概率（PBO）和收缩夏普比率（Deflated Sharpe Ratio）
+"""
+import gc
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations, product
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+import config
+from strategies.indicators import IndicatorCache
+from .engine import BacktestEngine
+from .metrics import YEAR
+from .parallel import SharedOHLCV, load_strategy, strategy_path
+
+
+# 每组分成三段：开头（前一组是测试集时作为禁入区去掉）、中间、结尾（后一组是测试集时作为清洗区去掉）
+HEAD, BODY, TAIL = 0, 1, 2
+
+# 每段累计的统计量：有效K线数、收益率的 1~4 次幂之和、对数收益之和
+N_MOMENTS = 6
+
+EULER_GAMMA = 0.5772156649015329
+
+
+# ==================== 划分 ====================
+
+def cpcv_splits(n_groups: int, n_test_groups: int) -> List[Tuple[int, ...]]:
+    """全部划分的测试组编号（按字典序）"""
+    if not 0 < n_test_groups < n_groups:
+        raise ValueError(f"测试组数需要在 1 到 {n_groups - 1} 之间: {n_test_groups}")
+    return list(combinations(range(n_groups), n_test_groups))
+
+
+def backtest_paths(splits: Sequence[Tuple[int, ...]], n_groups: int) -> np.ndarray:
+    """
+    把各划分的测试组拼成完整的回测路径
+
+    每一组在 C(N-1, k-1) 个划分中作为测试组出现，第 j 条路径取每组第 j 次出现时所在的划分，
+    共 C(N, k) * k / N 条路径，每条路径覆盖全部K线且每段都是样本外结果。
+
+    Returns:
+        (n_paths, n_groups) 数组，元素为划分序号
+    """
+    occurrences = [[i for i, test in enumerate(splits) if g in test] for g in range(n_groups)]
+    return np.array(occurrences).T
+
+
+def group_bounds(n_bars: int, n_groups: int, purge: int = 0, embargo: int = 0) -> np.ndarray:
+    """
+    各组三段的边界
+
+    Returns:
+        (n_groups, 4) 数组，每行为 [start, start + embargo, end - purge, end]
+    """
+    edges = np.linspace(0, n_bars, n_groups + 1).astype(int)
+    starts, ends = edges[:-1], edges[1:]
+    if (ends - starts <= purge + embargo).any():
+        raise ValueError(f"每组K线数 {int((ends - starts).min())} 不足以容纳 purge={purge} + embargo={embargo}")
+    return np.column_stack([starts, starts + embargo, ends - purge, ends])
+
+
+def segment_moments(returns: np.ndarray, bounds: np.ndarray) -> np.ndarray:
+    """
+    按段累计收益率的幂和（之后任意训练/测试组合的统计量都由这些段相加得到）
+
+    Args:
+        returns: 收益率矩阵 (n_bars, n_cols)，NaN 视为缺失
+        bounds: group_bounds 的结果
+
+    Returns:
+        (n_groups, 3, N_MOMENTS, n_cols) 数组
+    """
+    returns = np.asarray(returns, dtype=float)
+    if returns.ndim == 1:
+        returns = returns[:, None]
+    valid = ~np.isnan(returns)
+    r = np.where(valid, returns, 0.0)
+
+    starts = bounds[:, :3].ravel()
+    stops = bounds[:, 1:].ravel()
+    # 空段（purge/embargo 为 0）不参与 reduceat，相邻段首尾相接，结果仍是各段之和
+    nonempty = stops > starts
+    index = starts[nonempty]
+
+    out = np.zeros((len(starts), N_MOMENTS, r.shape[1]))
+    out[nonempty, 0] = np.add.reduceat(valid.astype(float), index, axis=0)
+    for power in range(1, 5):
+        out[nonempty, power] = np.add.reduceat(r ** power, index, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[nonempty, 5] = np.add.reduceat(np.log1p(r), index, axis=0)
+    return out.reshape(len(bounds), 3, N_MOMENTS, -1)
+
+
+def train_moments(moments: np.ndarray, test_groups: Sequence[int]) -> np.ndarray:
+    """训练集（测试组以外，去掉清洗区和禁入区）的统计量 (N_MOMENTS, n_cols)"""
+    test = set(test_groups)
+    total = np.zeros(moments.shape[2:])
+    for g in range(moments.shape[0]):
+        if g in test:
+            continue
+        total += moments[g, BODY]
+        if g - 1 not in test:
+            total += moments[g, HEAD]
+        if g + 1 not in test:
+            total += moments[g, TAIL]
+    return total
+
+
+def test_moments(moments: np.ndarray, test_groups: Sequence[int]) -> np.ndarray:
+    """测试集（完整的测试组）的统计量 (N_MOMENTS, n_cols)"""
+    return moments[list(test_groups)].sum(axis=(0, 1))
+
+
+# ==================== 统计量 ====================
+
+def sharpe_from_moments(moments: np.ndarray) -> np.ndarray:
+    """逐K线（未年化）夏普比率，样本标准差；没有波动（没有交易）时为 NaN"""
+    n, s1, s2 = moments[0], moments[1], moments[2]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = s1 / n
+        std = np.sqrt(np.maximum(s2 - s1 * mean, 0) / (n - 1))
+        return np.where((std > 0) & (n > 1), mean / std, np.nan)
+
+
+def shape_from_moments(moments: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """收益率的偏度和峰度（非超额峰度，正态分布为 3）"""
+    n = moments[0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mu = moments[1] / n
+        e2, e3, e4 = moments[2] / n, moments[3] / n, moments[4] / n
+        m2 = e2 - mu ** 2
+        m3 = e3 - 3 * mu * e2 + 2 * mu ** 3
+        m4 = e4 - 4 * mu * e3 + 6 * mu ** 2 * e2 - 3 * mu ** 4
+        return m3 / m2 ** 1.5, m4 / m2 ** 2
+
+
+def expected_max_sharpe(n_trials: int, variance: float) -> float:
+    """
+    在真实夏普为 0 的情况下，n_trials 次独立尝试中最大夏普比率的期望值
+    （False Strategy Theorem，Bailey & López de Prado）
+    """
+    from scipy.stats import norm
+
+    if n_trials < 2 or not np.isfinite(variance):
+        return 0.0
+    return float(np.sqrt(variance) * (
+        (1 - EULER_GAMMA) * norm.ppf(1 - 1 / n_trials)
+        + EULER_GAMMA * norm.ppf(1 - 1 / (n_trials * np.e))
+    ))
+
+
+def deflated_sharpe_ratio(
+    sharpe: float,
+    n_obs: int,
+    n_trials: int,
+    trials_variance: float,
+    skew: float = 0.0,
+    kurtosis: float = 3.0
+) -> float:
+    """
+    收缩夏普比率：扣除多重尝试带来的选择偏差后，真实夏普比率大于 0 的概率
+
+    Args:
+        sharpe: 选中策略的逐K线（未年化）夏普比率
+        n_obs: 收益率样本数
+        n_trials: 尝试过的参数组合数
+        trials_variance: 各组合（未年化）夏普比率的方差
+        skew: 选中策略收益率的偏度
+        kurtosis: 选中策略收益率的峰度（非超额）
+
+    Returns:
+        概率（0~1），通常以 0.95 作为显著的门槛
+    """
+    from scipy.stats import norm
+
+    threshold = expected_max_sharpe(n_trials, trials_variance)
+    denominator = 1 - skew * sharpe + (kurtosis - 1) / 4 * sharpe ** 2
+    if not np.isfinite(sharpe) or n_obs < 2 or denominator <= 0:
+        return float('nan')
+    return float(norm.cdf((sharpe - threshold) * np.sqrt(n_obs - 1) / np.sqrt(denominator)))
+
+
+def probability_of_overfitting(logits: np.ndarray) -> float:
+    """
+    回测过拟合概率（PBO）：样本内最优组合在样本外排名低于中位数（logit <= 0）的划分比例
+    """
+    logits = np.asarray(logits, dtype=float)
+    logits = logits[~np.isnan(logits)]
+    return float(np.mean(logits <= 0)) if len(logits) else float('nan')
+
+
+# ==================== 交叉验证 ====================
+
+class CombinatorialPurgedCV:
+    """
+    组合清洗交叉验证
+
+    整个参数网格只在全部数据上按批模拟一次（同一批共享指标缓存，各批可并行），
+    每批的逐K线收益率立即压缩成各段的幂和，不保存 K线数 x 组合数 的收益率矩阵；
+    之后每个划分的训练/测试夏普、每条回测路径的样本外表现都由段统计量相加得到，
+    总耗时约等于一次网格优化。
+
+    收益率来自连续的全样本模拟（持仓可以跨越组边界），清洗区和禁入区用于去掉
+    训练集中与测试集相邻、持仓或指标窗口可能重叠的K线。
+    """
+
+    def __init__(
+        self,
+        engine: Optional[BacktestEngine] = None,
+        n_groups: int = 6,
+        n_test_groups: int = 2,
+        purge: Union[int, float] = 0,
+        embargo: Union[int, float] = 0.01,
+        n_jobs: int = 1,
+        batch_size: int = config.OPTIMIZE_BATCH_SIZE
+    ):
+        """
+        初始化
+
+        Args:
+            engine: 回测引擎（提供资金、手续费、滑点、频率配置）
+            n_groups: 分组数 N
+            n_test_groups: 每个划分的测试组数 k
+            purge: 测试集之前从训练集去掉的K线数（小于 1 时为占全部K线的比例），
+                一般取策略最长的指标窗口或持仓周期
+            embargo: 测试集之后从训练集去掉的K线数（小于 1 时为比例）
+            n_jobs: 并行进程数，1 表示串行，-1 表示使用全部CPU
+            batch_size: 每次模拟的参数组合数（控制内存：K线数 x batch_size 个浮点数）
+        """
+        self.engine = engine or BacktestEngine()
+        self.n_groups = n_groups
+        self.n_test_groups = n_test_groups
+        self.purge = purge
+        self.embargo = embargo
+        self.n_jobs = n_jobs
+        self.batch_size = batch_size
+        self.splits = cpcv_splits(n_groups, n_test_groups)
+        self.paths = backtest_paths(self.splits, n_groups)
+
+    def bounds(self, n_bars: int) -> np.ndarray:
+        """各组三段的边界（见 group_bounds）"""
+        return group_bounds(n_bars, self.n_groups, _bars(self.purge, n_bars), _bars(self.embargo, n_bars))
+
+    def split(self, n_bars: int) -> Iterator[Dict[str, Any]]:
+        """
+        逐个生成划分的K线位置
+
+        Yields:
+            {'split', 'test_groups', 'train': 训练集位置, 'test': 测试集位置}
+        """
+        bounds = self.bounds(n_bars)
+        for i, test_groups in enumerate(self.splits):
+            test = set(test_groups)
+            train, test_idx = [], []
+            for g, (start, head_end, tail_start, end) in enumerate(bounds):
+                if g in test:
+                    test_idx.append(np.arange(start, end))
+                    continue
+                train.append(np.arange(start if g - 1 not in test else head_end,
+                                       end if g + 1 not in test else tail_start))
+            yield {
+                'split': i,
+                'test_groups': test_groups,
+                'train': np.concatenate(train),
+                'test': np.concatenate(test_idx),
+            }
+
+    def run(
+        self,
+        df: pd.DataFrame,
+        strategy_class,
+        param_ranges: Dict[str, list],
+        price_col: str = 'close'
+    ) -> Dict[str, Any]:
+        """
+        对参数网格做组合清洗交叉验证
+
+        Returns:
+            {
+                'splits': 每个划分的测试组、样本内最优参数、样本内/样本外夏普、样本外排名和 logit,
+                'paths': 每条回测路径的样本外夏普和总收益,
+                'scores': 每个参数组合的全样本夏普和总收益（参数列 + sharpe_ratio, total_return）,
+                'best_params': 全样本夏普最高的参数（即 optimize_parameters 会选出的参数）,
+                'metrics': PBO、收缩夏普比率等汇总,
+            }
+        """
+        param_names = list(param_ranges.keys())
+        param_list = [dict(zip(param_names, combo)) for combo in product(*param_ranges.values())]
+
+        print(f"\n{'='*60}")
+        print(f"🔀 组合清洗交叉验证: {strategy_class.__name__}（N={self.n_groups}, k={self.n_test_groups}，"
+              f"{len(self.splits)} 个划分，{len(self.paths)} 条路径）")
+        print(f"{'='*60}")
+        print(f"共 {len(param_list)} 种参数组合\n")
+
+        bounds = self.bounds(len(df))
+        moments = self.moments(df, strategy_class, param_list, bounds, price_col)
+        results = self.evaluate(moments, param_list)
+        self._print_summary(results)
+        return results
+
+    def moments(
+        self,
+        df: pd.DataFrame,
+        strategy_class,
+        param_list: List[dict],
+        bounds: np.ndarray,
+        price_col: str = 'close'
+    ) -> np.ndarray:
+        """
+        按批模拟参数网格并累计各段统计量
+
+        Returns:
+            (n_groups, 3, N_MOMENTS, n_combos) 数组，最后一维与 param_list 对应
+        """
+        batch_size = max(1, self.batch_size or len(param_list))
+        batches = [param_list[i:i + batch_size] for i in range(0, len(param_list), batch_size)]
+        n_workers = self.n_jobs if self.n_jobs >= 1 else (os.cpu_count() or 1)
+        engine_kwargs = self.engine._engine_kwargs()
+
+        parts = []
+        done = 0
+        if n_workers == 1 or len(batches) == 1:
+            cache = IndicatorCache(df)
+            outputs = (
+                _batch_moments(self.engine, df, strategy_class, batch, bounds, price_col, cache)
+                for batch in batches
+            )
+            for batch, part in zip(batches, outputs):
+                parts.append(part)
+                done += len(batch)
+                print(f"进度: {done}/{len(param_list)}")
+        else:
+            path = strategy_path(strategy_class)
+            with SharedOHLCV(df) as shared, ProcessPoolExecutor(
+                max_workers=min(n_workers, len(batches)),
+                initializer=_init_worker,
+                initargs=(shared.handle, engine_kwargs)
+            ) as pool:
+                futures = [pool.submit(_run_batch, path, batch, bounds, price_col) for batch in batches]
+                for batch, future in zip(batches, futures):
+                    parts.append(future.result())
+                    done += len(batch)
+                    print(f"进度: {done}/{len(param_list)}")
+
+        return np.concatenate(parts, axis=-1)
+
+    def evaluate(self, moments: np.ndarray, param_list: List[dict]) -> Dict[str, Any]:
+        """由段统计量计算各划分、各路径的结果和 PBO、收缩夏普比率（只有数组运算）"""
+        ann = np.sqrt(YEAR / pd.Timedelta(self.engine.freq))
+
+        # 全样本：每个组合的夏普（即网格优化的结果）和选中组合的收缩夏普
+        full = moments.sum(axis=(0, 1))
+        full_sharpe = sharpe_from_moments(full)
+        if np.isnan(full_sharpe).all():
+            raise ValueError("所有参数组合都没有有效的收益率（没有交易）")
+        best = int(np.nanargmax(full_sharpe))
+        skew, kurtosis = shape_from_moments(full[:, best])
+        n_trials = int(np.count_nonzero(~np.isnan(full_sharpe)))
+        trials_variance = float(np.nanvar(full_sharpe, ddof=1)) if n_trials > 1 else 0.0
+        deflated = deflated_sharpe_ratio(
+            full_sharpe[best], int(full[0, best]), n_trials, trials_variance, skew, kurtosis
+        )
+
+        # 各划分：训练集选出最优组合，看它在测试集上的排名
+        rows = []
+        chosen = np.zeros(len(self.splits), dtype=int)
+        for i, test_groups in enumerate(self.splits):
+            is_sharpe = sharpe_from_moments(train_moments(moments, test_groups))
+            oos_sharpe = sharpe_from_moments(test_moments(moments, test_groups))
+            if np.isnan(is_sharpe).all():
+                chosen[i] = -1
+                continue
+            j = int(np.nanargmax(is_sharpe))
+            chosen[i] = j
+            valid = ~np.isnan(oos_sharpe)
+            oos_rank, logit = np.nan, np.nan
+            if valid[j]:
+                # 相对排名 ω = 平均升序名次 / (有效组合数 + 1)，logit <= 0 表示低于样本外中位数
+                above = int(np.sum(oos_sharpe[valid] > oos_sharpe[j]))
+                ties = int(np.sum(oos_sharpe[valid] == oos_sharpe[j]))
+                omega = (valid.sum() - above - (ties - 1) / 2) / (valid.sum() + 1)
+                logit = float(np.log(omega / (1 - omega)))
+                oos_rank = above + 1
+            rows.append({
+                'split': i,
+                'test_groups': test_groups,
+                **param_list[j],
+                'is_sharpe': is_sharpe[j] * ann,
+                'oos_sharpe': oos_sharpe[j] * ann,
+                'oos_rank': oos_rank,
+                'logit': logit,
+            })
+        splits_df = pd.DataFrame(rows)
+
+        # 回测路径：每组取对应划分选出的组合在该组上的样本外收益
+        path_rows = []
+        for p, split_ids in enumerate(self.paths):
+            if (chosen[split_ids] < 0).any():
+                continue
+            total = sum(moments[g, :, :, chosen[s]].sum(axis=0) for g, s in enumerate(split_ids))
+            path_rows.append({
+                'path': p,
+                'sharpe_ratio': float(sharpe_from_moments(total[:, None])[0]) * ann,
+                'total_return': float(np.expm1(total[5])),
+            })
+        paths_df = pd.DataFrame(path_rows, columns=['path', 'sharpe_ratio', 'total_return'])
+
+        scores = pd.DataFrame(param_list)
+        scores['sharpe_ratio'] = full_sharpe * ann
+        scores['total_return'] = np.expm1(full[5])
+
+        metrics = {
+            'pbo': probability_of_overfitting(splits_df['logit'] if len(splits_df) else []),
+            'deflated_sharpe': deflated,
+            'sharpe_ratio': float(full_sharpe[best] * ann),
+            'expected_max_sharpe': float(expected_max_sharpe(n_trials, trials_variance) * ann),
+            'n_trials': n_trials,
+            'n_splits': len(self.splits),
+            'n_paths': len(path_rows),
+            'is_sharpe_mean': float(splits_df['is_sharpe'].mean()) if len(splits_df) else np.nan,
+            'oos_sharpe_mean': float(splits_df['oos_sharpe'].mean()) if len(splits_df) else np.nan,
+            'path_sharpe_mean': float(paths_df['sharpe_ratio'].mean()),
+            'path_sharpe_std': float(paths_df['sharpe_ratio'].std()),
+            'skew': float(skew),
+            'kurtosis': float(kurtosis),
+        }
+        return {
+            'splits': splits_df,
+            'paths': paths_df,
+            'scores': scores,
+            'best_params': param_list[best],
+            'metrics': metrics,
+        }
+
+    def _print_summary(self, results: Dict[str, Any]):
+        m = results['metrics']
+        print(f"\n{'='*60}")
+        print("🎯 交叉验证总结")
+        print(f"{'='*60}")
+        print(f"  全样本最优参数: {results['best_params']}（夏普 {m['sharpe_ratio']:.2f}）")
+        print(f"  {m['n_trials']} 次尝试的期望最大夏普: {m['expected_max_sharpe']:.2f}")
+        print(f"  收缩夏普比率（真实夏普 > 0 的概率）: {m['deflated_sharpe']:.2%}")
+        print(f"  回测过拟合概率 PBO: {m['pbo']:.2%}")
+        print(f"  样本内/样本外平均夏普: {m['is_sharpe_mean']:.2f} / {m['oos_sharpe_mean']:.2f}")
+        print(f"  {m['n_paths']} 条样本外路径的夏普: {m['path_sharpe_mean']:.2f} ± {m['path_sharpe_std']:.2f}")
+
+
+def _bars(value: Union[int, float], n_bars: int) -> int:
+    """K线数；小于 1 的小数视为占全部K线的比例"""
+    return int(round(value * n_bars)) if 0 < value < 1 else int(value)
+
+
+# ==================== 批量模拟（可在子进程中运行） ====================
+
+_WORKER: Dict[str, Any] = {}
+
+
+def _init_worker(handle: Dict[str, Any], engine_kwargs: Dict[str, Any]):
+    df, blocks = SharedOHLCV.attach(handle)
+    _WORKER['df'] = df
+    _WORKER['blocks'] = blocks
+    _WORKER['engine'] = BacktestEngine(**engine_kwargs)
+    # 同一进程处理的各批共享指标缓存
+    _WORKER['cache'] = IndicatorCache(df)
+
+
+def _run_batch(path, batch, bounds, price_col):
+    return _batch_moments(
+        _WORKER['engine'], _WORKER['df'], load_strategy(path), batch, bounds, price_col, _WORKER['cache']
+    )
+
+
+def _batch_moments(
+    engine: BacktestEngine,
+    df: pd.DataFrame,
+    strategy_class,
+    batch: List[dict],
+    bounds: np.ndarray,
+    price_col: str,
+    cache: IndicatorCache
+) -> np.ndarray:
+    """模拟一批参数组合，返回各段统计量（收益率矩阵用完即释放）"""
+    if getattr(strategy_class, 'supports_batch', False):
+        entries, exits = strategy_class.generate_signals_batch(df, batch, cache=cache)
+    else:
+        entries, exits = engine._stack_signals(df, [strategy_class(**params) for params in batch])
+    portfolio = engine._simulate(df[price_col], entries, exits)
+    returns = portfolio.returns().to_numpy()
+    del portfolio, entries, exits
+    gc.collect()  # vectorbt 组合对象有循环引用（见 BacktestEngine.evaluate_batch）
+    return segment_moments(returns, bounds)
+
+
+# ==================== 使用示例 ====================
+if __name__ == "__main__":
+    from data.fetcher import DataFetcher
+    from strategies.ema_cross import EMACrossStrategy
+
+    fetcher = DataFetcher()
+    df = fetcher.fetch_ohlcv("BTC/USDT", "1h", 3000)
+
+    cv = CombinatorialPurgedCV(BacktestEngine(initial_capital=10000, fees=0.0004),
+                               n_groups=6, n_test_groups=2, purge=60, embargo=0.01)
+    results = cv.run(df, EMACrossStrategy, {'fast_window': [10, 15, 20, 25], 'slow_window': [40, 50, 60, 70]})
+    print(results['splits'].to_string(index=False))
@@ -0,0 +1,256 @@
+"""
+步进式分析引擎（Walk-Forward）
+滚动/锚定窗口多折优化，各折并行，样本外权益曲线拼接
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from strategies.indicators import IndicatorCache
+from .engine import BacktestEngine, OPTIMIZE_METRICS
+from .metrics import PerformanceMetrics
+from .optimizers import objective_scores
+from .parallel import SharedOHLCV, load_strategy, strategy_path
+
+
+class WalkForwardEngine:
+    """
+    步进式分析引擎
+
+    每一折在样本内（train）窗口上对参数网格做一次批量评估（指标在该折内只计算一次，
+    整个网格共享），选出最优参数后在紧随其后的样本外（test）窗口上回测。
+    所有折的样本外收益拼接成一条权益曲线。
+
+    窗口模式:
+        rolling:  训练窗口长度固定，随测试窗口一起向前滚动
+        anchored: 训练窗口起点固定在数据开头，逐折变长
+    """
+
+    def __init__(
+        self,
+        engine: Optional[BacktestEngine] = None,
+        n_folds: int = 5,
+        train_size: Optional[int] = None,
+        test_size: Optional[int] = None,
+        train_fraction: float = 0.5,
+        mode: str = 'rolling',
+        objective: str = 'sharpe_ratio',
+        direction: Optional[str] = None,
+        n_jobs: int = 1
+    ):
+        """
+        初始化
+
+        Args:
+            engine: 回测引擎（提供资金、手续费、滑点、频率配置）
+            n_folds: 折数
+            train_size: 样本内K线数，None 表示按 train_fraction 计算
+            test_size: 每折样本外K线数，None 表示把剩余数据均分给各折
+            train_fraction: 第一折样本内数据占全部数据的比例
+            mode: 'rolling' 或 'anchored'
+            objective: 选择最优参数的指标（OPTIMIZE_METRICS 之一）
+            direction: 'max'（越大越好）或 'min'（越小越好），None 表示 max_drawdown 取 'min'，其余取 'max'
+            n_jobs: 并行进程数，1 表示串行，-1 表示使用全部CPU
+        """
+        if mode not in ('rolling', 'anchored'):
+            raise ValueError(f"未知的窗口模式: {mode}")
+        if objective not in OPTIMIZE_METRICS:
+            raise ValueError(f"objective 必须是 {OPTIMIZE_METRICS} 之一: {objective}")
+        direction = direction or ('min' if objective == 'max_drawdown' else 'max')
+        if direction not in ('max', 'min'):
+            raise ValueError(f"目标方向只能是 'max' 或 'min': {direction}")
+        self.engine = engine or BacktestEngine()
+        self.n_folds = n_folds
+        self.train_size = train_size
+        self.test_size = test_size
+        self.train_fraction = train_fraction
+        self.mode = mode
+        self.objective = objective
+        self.direction = direction
+        self.n_jobs = n_jobs
+
+    def split(self, n_bars: int) -> List[Dict[str, int]]:
+        """
+        生成各折的窗口位置
+
+        Returns:
+            [{'fold', 'train_start', 'train_end', 'test_start', 'test_end'}, ...]（左闭右开）
+        """
+        train_size = self.train_size or int(n_bars * self.train_fraction)
+        test_size = self.test_size or (n_bars - train_size) // self.n_folds
+        if train_size <= 0 or test_size <= 0 or train_size + test_size > n_bars:
+            raise ValueError(f"数据不足: {n_bars} 根K线无法划分 train={train_size}, test={test_size}")
+
+        folds = []
+        for k in range(self.n_folds):
+            test_start = train_size + k * test_size
+            test_end = min(test_start + test_size, n_bars)
+            if test_start >= n_bars:
+                break
+            train_start = 0 if self.mode == 'anchored' else test_start - train_size
+            folds.append({
+                'fold': k + 1,
+                'train_start': train_start,
+                'train_end': test_start,
+                'test_start': test_start,
+                'test_end': test_end
+            })
+        return folds
+
+    def run(
+        self,
+        df: pd.DataFrame,
+        strategy_class,
+        param_ranges: Dict[str, list],
+        price_col: str = 'close'
+    ) -> Dict[str, Any]:
+        """
+        运行步进式分析
+
+        Returns:
+            {
+                'folds': 每折的窗口、最优参数、样本内/样本外指标,
+                'returns': 拼接的样本外收益率序列,
+                'equity': 拼接的样本外权益曲线,
+                'metrics': 拼接曲线的总收益、夏普、最大回撤等,
+            }
+        """
+        print(f"\n{'='*60}")
+        print(f"🚶 步进式分析: {strategy_class.__name__}（{self.mode}，{self.n_folds} 折）")
+        print(f"{'='*60}")
+
+        param_names = list(param_ranges.keys())
+        param_list = [dict(zip(param_names, combo)) for combo in product(*param_ranges.values())]
+        folds = self.split(len(df))
+        print(f"每折 {len(param_list)} 种参数组合，共 {len(folds)} 折\n")
+
+        engine_kwargs = self.engine._engine_kwargs()
+        n_workers = self.n_jobs if self.n_jobs >= 1 else (os.cpu_count() or 1)
+
+        if n_workers == 1 or len(folds) == 1:
+            outputs = [
+                _evaluate_fold(df, strategy_class, param_list, fold, engine_kwargs, price_col,
+                               self.objective, self.direction)
+                for fold in folds
+            ]
+        else:
+            path = strategy_path(strategy_class)
+            with SharedOHLCV(df) as shared, ProcessPoolExecutor(
+                max_workers=min(n_workers, len(folds)),
+                initializer=_init_worker,
+                initargs=(shared.handle,)
+            ) as pool:
+                futures = [
+                    pool.submit(_run_fold, path, param_list, fold, engine_kwargs, price_col,
+                                self.objective, self.direction)
+                    for fold in folds
+                ]
+                outputs = [future.result() for future in futures]
+
+        for out in outputs:
+            print(f"第{out['fold']}折: 最优参数 {out['best_params']} - "
+                  f"样本内{self.objective} {out['is_' + self.objective]:.2f}, "
+                  f"样本外 {out['oos_' + self.objective]:.2f}")
+
+        return self._summarize(df, outputs)
+
+    def _summarize(self, df: pd.DataFrame, outputs: List[dict]) -> Dict[str, Any]:
+        """拼接各折样本外收益并汇总"""
+        index = df['timestamp'] if 'timestamp' in df.columns else df.index
+        positions = np.concatenate([np.arange(o['test_start'], o['test_end']) for o in outputs])
+        returns = pd.Series(np.concatenate([o['oos_returns'] for o in outputs]),
+                            index=pd.Index(np.asarray(index)[positions]))
+
+        equity = self.engine.initial_capital * (1 + returns).cumprod()
+        drawdown = equity / equity.cummax() - 1
+        stitched = returns.vbt.returns(freq=self.engine.freq)
+
+        folds_df = pd.DataFrame([
+            {k: v for k, v in o.items() if k not in ('oos_returns', 'best_params')} | o['best_params']
+            for o in outputs
+        ])
+
+        # 没有交易的折夏普为 inf，不参与平均
+        is_mean = folds_df['is_' + self.objective].replace([np.inf, -np.inf], np.nan).mean()
+        oos_mean = folds_df['oos_' + self.objective].replace([np.inf, -np.inf], np.nan).mean()
+        metrics = {
+            'total_return': equity.iloc[-1] / self.engine.initial_capital - 1,
+            'sharpe_ratio': stitched.sharpe_ratio(),
+            'max_drawdown': abs(drawdown.min()),
+            'oos_bars': len(returns),
+            # 样本外/样本内目标值之比（walk-forward efficiency），越接近1越稳健
+            'efficiency': oos_mean / is_mean if np.isfinite(is_mean) and is_mean != 0 else np.nan,
+        }
+
+        print(f"\n{'='*60}")
+        print("🎯 步进式分析总结（拼接的样本外权益）")
+        print(f"{'='*60}")
+        print(f"  总收益: {metrics['total_return']:.2%}")
+        print(f"  夏普比率: {metrics['sharpe_ratio']:.2f}")
+        print(f"  最大回撤: {metrics['max_drawdown']:.2%}")
+        print(f"  样本外/样本内效率: {metrics['efficiency']:.2f}")
+
+        return {'folds': folds_df, 'returns': returns, 'equity': equity, 'metrics': metrics}
+
+
+# ==================== 单折评估（可在子进程中运行） ====================
+
+_WORKER: Dict[str, Any] = {}
+
+
+def _init_worker(handle: Dict[str, Any]):
+    df, blocks = SharedOHLCV.attach(handle)
+    _WORKER['df'] = df
+    _WORKER['blocks'] = blocks
+
+
+def _run_fold(path, param_list, fold, engine_kwargs, price_col, objective, direction):
+    return _evaluate_fold(_WORKER['df'], load_strategy(path), param_list, fold, engine_kwargs, price_col,
+                          objective, direction)
+
+
+def _evaluate_fold(
+    df: pd.DataFrame,
+    strategy_class,
+    param_list: List[dict],
+    fold: Dict[str, int],
+    engine_kwargs: Dict[str, Any],
+    price_col: str,
+    objective: str,
+    direction: str = 'max'
+) -> Dict[str, Any]:
+    """样本内批量评估整个网格，选出最优参数后在样本外回测（没有交易或目标值无效的组合不参与选择）"""
+    engine = BacktestEngine(**engine_kwargs)
+
+    train = df.iloc[fold['train_start']:fold['train_end']]
+    in_sample = engine.evaluate_params(train, strategy_class, param_list, price_col, cache=IndicatorCache(train))
+    scores = objective_scores(in_sample, objective)
+    if direction == 'min':
+        scores = np.where(np.isfinite(scores), -scores, -np.inf)
+    if not np.isfinite(scores).any():
+        raise ValueError(f"第{fold['fold']}折样本内没有有效结果")
+    best_idx = int(np.argmax(scores))
+    best_params = param_list[best_idx]
+
+    # 样本外：用 训练窗口+测试窗口 生成信号（指标有足够的预热数据），只在测试窗口上交易
+    window = df.iloc[fold['train_start']:fold['test_end']]
+    entries, exits = strategy_class(**best_params).generate_signals(window)
+    n_test = fold['test_end'] - fold['test_start']
+    test = df.iloc[fold['test_start']:fold['test_end']]
+    portfolio = engine._simulate(test[price_col], entries.iloc[-n_test:], exits.iloc[-n_test:])
+    oos = PerformanceMetrics(portfolio, test).calculate_all()
+
+    return {
+        **fold,
+        'best_params': best_params,
+        'is_' + objective: in_sample[objective].iloc[best_idx],
+        'oos_' + objective: oos[objective],
+        'oos_total_return': oos['total_return'],
+        'oos_max_drawdown': oos['max_drawdown'],
+        'oos_trades': oos['total_trades'],
+        'oos_returns': portfolio.returns().to_numpy(),
+    }
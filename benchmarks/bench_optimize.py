@@ -0,0 +1,84 @@
+"""
+参数优化基准：逐个回测 vs 宽表批量模拟
+
+用法:
+    python -m benchmarks.bench_optimize
+    python -m benchmarks.bench_optimize --bars 5000 --serial-sample 100
+    python -m benchmarks.bench_optimize --full   # 逐个回测也跑完整网格（很慢）
+"""
+import argparse
+import contextlib
+import io
+import time
+
+from backtest.engine import BacktestEngine
+from strategies.ema_cross import EMACrossStrategy
+from .synthetic import make_ohlcv
+
+
+# 组合数 -> EMA 参数网格 (快线周期数 x 慢线周期数)
+GRIDS = {
+    25: (5, 5),
+    1_000: (25, 40),
+    10_000: (100, 100),
+}
+
+
+def make_grid(n_fast: int, n_slow: int) -> dict:
+    """生成 n_fast x n_slow 的 EMA 参数网格"""
+    return {
+        'fast_window': list(range(2, 2 + n_fast)),
+        'slow_window': list(range(2 + n_fast, 2 + n_fast + n_slow)),
+    }
+
+
+def timed_optimize(engine, df, param_ranges, vectorized: bool) -> float:
+    """运行一次优化并返回耗时（屏蔽打印输出）"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        engine.optimize_parameters(df, EMACrossStrategy, param_ranges, vectorized=vectorized)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="参数优化加速比基准")
+    parser.add_argument('--bars', type=int, default=2000, help="K线数量")
+    parser.add_argument('--serial-sample', type=int, default=50,
+                        help="逐个回测最多实际运行的组合数，超过部分按线性外推")
+    parser.add_argument('--full', action='store_true', help="逐个回测跑完整网格")
+    args = parser.parse_args()
+    
+    df = make_ohlcv(args.bars)
+    engine = BacktestEngine()
+    
+    # 预热：触发 numba 编译，避免计入第一组的耗时
+    warmup = make_grid(2, 2)
+    timed_optimize(engine, df, warmup, vectorized=False)
+    timed_optimize(engine, df, warmup, vectorized=True)
+    
+    print(f"数据: {args.bars} 根K线")
+    print(f"{'组合数':>8} {'逐个回测(s)':>14} {'批量模拟(s)':>12} {'加速比':>8}")
+    
+    for n_combos, (n_fast, n_slow) in GRIDS.items():
+        param_ranges = make_grid(n_fast, n_slow)
+        
+        # 逐个回测：超过采样数时只跑前 serial_sample 个组合再外推
+        if args.full or n_combos <= args.serial_sample:
+            serial = timed_optimize(engine, df, param_ranges, vectorized=False)
+            note = ""
+        else:
+            sample_fast = max(1, args.serial_sample // n_slow)
+            sample_ranges = {
+                'fast_window': param_ranges['fast_window'][:sample_fast],
+                'slow_window': param_ranges['slow_window'][:args.serial_sample // sample_fast],
+            }
+            n_sample = len(sample_ranges['fast_window']) * len(sample_ranges['slow_window'])
+            serial = timed_optimize(engine, df, sample_ranges, vectorized=False) * n_combos / n_sample
+            note = " (外推)"
+        
+        vectorized = timed_optimize(engine, df, param_ranges, vectorized=True)
+        print(f"{n_combos:>8} {serial:>14.2f} {vectorized:>12.2f} {serial / vectorized:>7.1f}x{note}")
+
+
+if __name__ == "__main__":
+    main()
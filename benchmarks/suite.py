@@ -0,0 +1,284 @@
+"""
+性能基准套件
+在合成数据上测量数据缓存加载、各技术指标、各策略信号、单次回测、参数优化和指标计算的耗时，
+结果保存为 JSON，并可与基线对比（回归时退出码为 1，便于在 CI 中使用）
+
+用法:
+    python -m benchmarks.suite                          # 默认 10k、1M 两档数据
+    python -m benchmarks.suite --sizes 10k,1m,10m       # 10M 档需要数 GB 内存
+    python -m benchmarks.suite --filter indicator       # 只跑名称包含 indicator 的基准
+    python -m benchmarks.suite --save-baseline          # 把本次结果保存为基线
+    python -m benchmarks.suite --compare results/benchmarks/baseline.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import config
+from .synthetic import make_ohlcv
+from .bench_optimize import make_grid
+
+
+# 数据规模
+SIZES = {
+    '10k': 10_000,
+    '1m': 1_000_000,
+    '10m': 10_000_000,
+}
+
+# 参数优化网格：名称 -> (快线周期数, 慢线周期数, 最多运行到的K线数)
+OPTIMIZE_GRIDS = {
+    'grid25': (5, 5, SIZES['10m']),
+    'grid400': (20, 20, SIZES['1m']),
+}
+
+# 向量化优化每批模拟的单元格数上限（K线数 x 组合数），控制大数据量下的内存
+OPTIMIZE_BATCH_CELLS = 10_000_000
+
+# DataProcessor.add_technical_indicators 支持的指标
+INDICATORS = ['ema', 'sma', 'rsi', 'macd', 'bb', 'atr', 'volume']
+
+BENCHMARK_DIR = config.RESULTS_DIR / "benchmarks"
+BASELINE_FILE = BENCHMARK_DIR / "baseline.json"
+
+# 中位数耗时超过基线的比例阈值（默认 20% 视为回归）
+REGRESSION_THRESHOLD = 0.2
+
+
+def timeit(func: Callable[[], object], repeat: int = 3, warmup: int = 1) -> Dict[str, float]:
+    """
+    多次运行 func 并统计耗时（屏蔽打印输出）
+
+    Returns:
+        {'median', 'min', 'max', 'repeat'}，单位秒
+    """
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(warmup):
+            func()
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+    return {
+        'median': statistics.median(times),
+        'min': min(times),
+        'max': max(times),
+        'repeat': repeat,
+    }
+
+
+# ==================== 基准定义 ====================
+# 每个构造函数返回 [(基准名, 待计时的无参函数), ...]，准备工作不计入耗时
+
+def fetcher_benchmarks(df: pd.DataFrame, size: str, workdir: Path) -> List[Tuple[str, Callable]]:
+    """DataFetcher 从 CSV 缓存加载"""
+    from data.fetcher import DataFetcher
+
+    fetcher = DataFetcher()
+    fetcher.cache_dir = workdir
+    symbol, timeframe = config.DEFAULT_SYMBOL, config.DEFAULT_TIMEFRAME
+    df.to_csv(fetcher._get_cache_filename(symbol, timeframe, len(df)), index=False)
+    return [(f"fetcher.cache_load[{size}]", lambda: fetcher.fetch_ohlcv(symbol, timeframe, len(df)))]
+
+
+def indicator_benchmarks(df: pd.DataFrame, size: str, workdir: Path) -> List[Tuple[str, Callable]]:
+    """DataProcessor 逐个技术指标"""
+    from data.processor import DataProcessor
+
+    return [
+        (f"indicator.{name}[{size}]", lambda name=name: DataProcessor.add_technical_indicators(df, [name]))
+        for name in INDICATORS
+    ]
+
+
+def signal_benchmarks(df: pd.DataFrame, size: str, workdir: Path) -> List[Tuple[str, Callable]]:
+    """已注册策略的 generate_signals（默认参数）"""
+    from strategies import registry
+
+    return [
+        (f"signals.{name}[{size}]", lambda strategy=registry.create(name): strategy.generate_signals(df))
+        for name in registry.names()
+    ]
+
+
+def engine_benchmarks(df: pd.DataFrame, size: str, workdir: Path) -> List[Tuple[str, Callable]]:
+    """BacktestEngine.run、optimize_parameters 和 PerformanceMetrics.calculate_all"""
+    from backtest.engine import BacktestEngine
+    from backtest.metrics import PerformanceMetrics
+    from strategies.ema_cross import EMACrossStrategy
+
+    engine = BacktestEngine()
+    strategy = EMACrossStrategy()
+    entries, exits = strategy.generate_signals(df)
+    portfolio = engine._simulate(df['close'], entries, exits)
+
+    benchmarks = [
+        (f"engine.run[{size}]", lambda: engine.run(df, strategy)),
+        (f"metrics.calculate_all[{size}]", lambda: PerformanceMetrics(portfolio, df).calculate_all()),
+    ]
+    batch_size = max(1, OPTIMIZE_BATCH_CELLS // len(df))
+    for grid, (n_fast, n_slow, max_bars) in OPTIMIZE_GRIDS.items():
+        if len(df) > max_bars:
+            continue
+        param_ranges = make_grid(n_fast, n_slow)
+        benchmarks.append((
+            f"engine.optimize.{grid}[{size}]",
+            lambda param_ranges=param_ranges: engine.optimize_parameters(
+                df, EMACrossStrategy, param_ranges, batch_size=batch_size
+            )
+        ))
+    return benchmarks
+
+
+SUITES = [fetcher_benchmarks, indicator_benchmarks, signal_benchmarks, engine_benchmarks]
+
+
+# ==================== 运行与对比 ====================
+
+def run_suite(
+    sizes: List[str],
+    name_filter: Optional[str] = None,
+    repeat: int = 3
+) -> Dict[str, dict]:
+    """
+    运行基准套件
+
+    Args:
+        sizes: SIZES 中的规模名称
+        name_filter: 只运行名称包含该字符串的基准
+        repeat: 每个基准的计时次数（另有一次不计时的预热）
+
+    Returns:
+        {'meta': 运行环境, 'results': {基准名: {'median', 'min', 'max', 'repeat', 'n_bars'}}}
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            n_bars = SIZES[size]
+            df = make_ohlcv(n_bars)
+            print(f"\n📏 数据规模 {size}（{n_bars:,} 根K线）")
+
+            for suite in SUITES:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    benchmarks = suite(df, size, Path(tmp))
+                for name, func in benchmarks:
+                    if name_filter and name_filter not in name:
+                        continue
+                    stats = timeit(func, repeat=repeat)
+                    stats['n_bars'] = n_bars
+                    results[name] = stats
+                    print(f"  {name:<40} {stats['median'] * 1e3:12.2f} ms")
+
+    return {'meta': environment(), 'results': results}
+
+
+def environment() -> Dict[str, str]:
+    """运行环境信息（对比不同机器的结果时参考）"""
+    import vectorbt as vbt
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'vectorbt': vbt.__version__,
+    }
+
+
+def compare(current: Dict[str, dict], baseline: Dict[str, dict], threshold: float = REGRESSION_THRESHOLD) -> pd.DataFrame:
+    """
+    按中位数耗时与基线对比
+
+    Args:
+        current: 本次结果的 'results'
+        baseline: 基线结果的 'results'
+        threshold: 变慢超过该比例视为回归
+
+    Returns:
+        DataFrame（列: baseline, current, ratio, status），只包含两边都有的基准
+    """
+    rows = {}
+    for name, stats in current.items():
+        if name not in baseline:
+            continue
+        ratio = stats['median'] / baseline[name]['median']
+        if ratio > 1 + threshold:
+            status = 'regression'
+        elif ratio < 1 / (1 + threshold):
+            status = 'improvement'
+        else:
+            status = 'ok'
+        rows[name] = {
+            'baseline': baseline[name]['median'],
+            'current': stats['median'],
+            'ratio': ratio,
+            'status': status,
+        }
+    return pd.DataFrame.from_dict(rows, orient='index', columns=['baseline', 'current', 'ratio', 'status'])
+
+
+def save(report: dict, path: Path) -> Path:
+    """保存 JSON 报告"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"💾 结果已保存到: {path}")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="性能基准套件")
+    parser.add_argument('--sizes', default='10k,1m', help=f"数据规模，逗号分隔，可选 {','.join(SIZES)}")
+    parser.add_argument('--filter', default=None, help="只运行名称包含该字符串的基准")
+    parser.add_argument('--repeat', type=int, default=3, help="每个基准的计时次数")
+    parser.add_argument('--output', type=Path, default=None, help="结果文件，默认 results/benchmarks/<时间>.json")
+    parser.add_argument('--compare', type=Path, default=None, help="与该基线文件对比")
+    parser.add_argument('--save-baseline', action='store_true', help=f"同时保存为基线 {BASELINE_FILE}")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD, help="回归阈值（比例）")
+    args = parser.parse_args()
+
+    sizes = [s.strip().lower() for s in args.sizes.split(',') if s.strip()]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        parser.error(f"未知的数据规模: {unknown}，可选 {list(SIZES)}")
+
+    report = run_suite(sizes, args.filter, args.repeat)
+    output = args.output or BENCHMARK_DIR / f"{datetime.now():%Y%m%d_%H%M%S}.json"
+    save(report, output)
+    if args.save_baseline:
+        save(report, BASELINE_FILE)
+
+    if args.compare is not None:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        diff = compare(report['results'], baseline['results'], args.threshold)
+        print(f"\n📊 与基线对比（{args.compare}，阈值 {args.threshold:.0%}）:")
+        print(diff.to_string(formatters={
+            'baseline': lambda v: f"{v * 1e3:.2f}ms",
+            'current': lambda v: f"{v * 1e3:.2f}ms",
+            'ratio': lambda v: f"{v:.2f}x",
+        }))
+        regressions = diff.index[diff['status'] == 'regression'].tolist()
+        if regressions:
+            print(f"\n❌ {len(regressions)} 个基准变慢: {regressions}")
+            sys.exit(1)
+        print("\n✅ 没有性能回归")
+
+
+if __name__ == "__main__":
+    main()
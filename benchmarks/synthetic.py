@@ -0,0 +1,39 @@
+"""
+合成行情数据
+生成可复现的 OHLCV 数据，供基准测试使用（不依赖网络）
+"""
+import numpy as np
+import pandas as pd
+
+
+def make_ohlcv(n_bars: int = 10_000, seed: int = 42, freq: str = '1h', start: str = '2020-01-01') -> pd.DataFrame:
+    """
+    生成几何布朗运动的 OHLCV 数据
+    
+    Args:
+        n_bars: K线数量
+        seed: 随机种子
+        freq: K线周期
+        start: 起始时间
+        
+    Returns:
+        包含 timestamp/open/high/low/close/volume 列的 DataFrame
+    """
+    rng = np.random.default_rng(seed)
+    
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_bars)))
+    open_ = np.empty(n_bars)
+    open_[0] = close[0]
+    open_[1:] = close[:-1] * (1 + rng.normal(0, 0.001, n_bars - 1))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.003, n_bars)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.003, n_bars)))
+    volume = rng.lognormal(3, 1, n_bars)
+    
+    return pd.DataFrame({
+        'timestamp': pd.date_range(start, periods=n_bars, freq=freq),
+        'open': open_,
+        'high': high,
+        'low': low,
+        'close': close,
+        'volume': volume
+    })
@@ -28,6 +28,33 @@ SUPPORTED_EXCHANGES = ["binance", "okx", "bybit", "coinbase"]
 INITIAL_CAPITAL = 10000  # 初始资金（USDT）
 TRADING_FEE = 0.0004     # 交易手续费 0.04%
 SLIPPAGE = 0.0001        # 滑点 0.01%
+BACKTEST_FREQ = '1H'     # K线频率（用于年化夏普等指标）
+
+# 成本敏感性分析的默认网格（手续费 0.02%~0.2%，滑点 0~0.1%）
+SENSITIVITY_FEES = [0.0002, 0.0004, 0.0006, 0.001, 0.0015, 0.002]
+SENSITIVITY_SLIPPAGE = [0.0, 0.0001, 0.0005, 0.001]
+
+# ==================== 优化配置 ====================
+OPTIMIZE_BATCH_SIZE = 1000  # 向量化优化时每次模拟的参数组合数（限制内存占用）
+
+# ==================== 蒙特卡洛配置 ====================
+MONTE_CARLO_PATHS = 10000       # 每种扰动方法的模拟路径数
+MONTE_CARLO_CHUNK_MB = 128      # 每块路径矩阵的内存上限（MB）
+MONTE_CARLO_CONFIDENCE = 0.95   # 置信区间水平
+
+# ==================== 策略组合 ====================
+ENSEMBLE_WINDOW = 720      # 估计收益均值和协方差的滚动窗口（K线数，1小时K线约30天）
+ENSEMBLE_REFIT_STEP = 24   # 每隔多少根K线重新计算一次权重
+
+# ==================== 回测结果缓存 ====================
+RESULT_CACHE_DIR = RESULTS_DIR / "backtest_cache"  # 磁盘缓存目录
+RESULT_CACHE_MEMORY_ENTRIES = 32                  # 内存中最多保留的回测结果数
+RESULT_CACHE_DISK_MB = 512                        # 磁盘缓存上限（MB），超出时删除最久未使用的
+
+# ==================== 分块回测 ====================
+STREAM_BLOCK_SIZE = 500_000                    # 分块回测每块的K线数
+STREAM_OUTPUT_DIR = RESULTS_DIR / "streaming"  # 分块回测的权益/交易记录输出目录
+INCREMENTAL_DIR = RESULTS_DIR / "incremental"  # 增量回测的状态目录
 
 # ==================== 策略配置 ====================
 # EMA 交叉策略参数
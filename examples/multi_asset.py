@@ -0,0 +1,56 @@
+"""
+示例5: 多资产组合回测
+多个交易对共享同一资金池，按分配规则下单，一次模拟完成
+"""
+import sys
+sys.path.append('..')
+
+from data.fetcher import DataFetcher
+from data.processor import DataProcessor
+from strategies.ema_cross import EMACrossStrategy
+from backtest.engine import BacktestEngine
+
+
+def main():
+    """主函数"""
+    print("=" * 80)
+    print("示例5: 多资产组合回测")
+    print("=" * 80)
+    
+    # ==================== 1. 获取数据 ====================
+    print("\n📊 获取数据...")
+    symbols = ["BTC/USDT", "ETH/USDT", "BNB/USDT", "SOL/USDT", "XRP/USDT", "ADA/USDT"]
+    fetcher = DataFetcher("binance")
+    data = fetcher.fetch_multiple_symbols(symbols, "1h", 1000)
+    
+    processor = DataProcessor()
+    data = {symbol: processor.clean_data(df) for symbol, df in data.items()}
+    
+    print(f"✅ 数据准备完成: {len(data)} 个交易对")
+    
+    # ==================== 2. 对比分配规则 ====================
+    engine = BacktestEngine(
+        initial_capital=10000,
+        fees=0.0004
+    )
+    strategy = EMACrossStrategy(fast_window=20, slow_window=60)
+    
+    summary = {}
+    for allocation in ['equal', 'active']:
+        results = engine.run_multi_asset(data, strategy, allocation=allocation)
+        summary[allocation] = results
+    
+    # ==================== 3. 汇总 ====================
+    print("\n" + "=" * 80)
+    print("🏆 分配规则对比")
+    print("=" * 80)
+    for allocation, r in summary.items():
+        print(f"  {allocation:<8} 总收益: {r['total_return']:.2%}  "
+              f"夏普: {r['sharpe_ratio']:.2f}  最大回撤: {r['max_drawdown']:.2%}  "
+              f"交易次数: {r['total_trades']}")
+    
+    print("\n" + "=" * 80)
+
+
+if __name__ == "__main__":
+    main()
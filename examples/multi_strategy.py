@@ -10,7 +10,8 @@ from data.processor import DataProcessor
 from strategies.ema_cross import EMACrossStrategy
 from strategies.rsi_strategy import RSIStrategy
 from strategies.macd_strategy import MACDStrategy, MACDAdvancedStrategy
-from backtest.engine import BacktestEngine
+from backtest.engine import BacktestEngine, format_comparison
+from backtest.optimizers import objective_scores
 import pandas as pd
 
 
@@ -72,13 +73,16 @@ def main():
     print("🏆 推荐策略")
     print("=" * 80)
     
-    # 根据不同维度推荐
+    # 根据不同维度推荐（对比表是数值列，可以直接排序）
     print("\n📈 按总收益排名:")
-    # 注意：这里需要处理百分比字符串，实际使用时可以优化
-    print(comparison_df.nlargest(3, '策略名称')[['策略名称', '总收益率', '最大回撤']].to_string(index=False))
+    top = comparison_df.nlargest(3, 'total_return')
+    print(format_comparison(top)[['策略名称', '总收益率', '最大回撤']].to_string(index=False))
     
     print("\n💎 按夏普比率排名（风险调整后收益）:")
-    print(comparison_df.nlargest(3, '策略名称')[['策略名称', '夏普比率', '年化收益']].to_string(index=False))
+    # 没有交易的策略夏普为 inf，不参与排名
+    ranked = comparison_df[objective_scores(comparison_df, 'sharpe_ratio') > float('-inf')]
+    top = ranked.nlargest(3, 'sharpe_ratio')
+    print(format_comparison(top)[['策略名称', '夏普比率', '年化收益']].to_string(index=False))
     
     print("\n" + "=" * 80)
 
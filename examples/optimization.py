@@ -10,6 +10,10 @@ from data.processor import DataProcessor
 from strategies.ema_cross import EMACrossStrategy
 from strategies.rsi_strategy import RSIStrategy
 from backtest.engine import BacktestEngine
+from backtest.cache import data_fingerprint
+from backtest.walk_forward import WalkForwardEngine
+from backtest.validation import CombinatorialPurgedCV
+from backtest.monte_carlo import MonteCarloAnalyzer
 from utils.visualization import Visualizer
 import pandas as pd
 
@@ -36,11 +40,13 @@ def optimize_ema_strategy():
         'slow_window': [40, 50, 60, 70, 80]
     }
     
-    # 运行优化
+    # 运行优化（指定 run_id 后每个组合的结果都会写入运行日志，中断后重新运行会跳过已完成的组合；
+    # run_id 包含数据指纹，新拉取的数据不同时会开始新的运行，而不是返回旧结果）
     best_params, best_result, results_df = engine.optimize_parameters(
         df=df,
         strategy_class=EMACrossStrategy,
-        param_ranges=param_ranges
+        param_ranges=param_ranges,
+        run_id=f"ema_btc_usdt_1h_{data_fingerprint(df)[:12]}"
     )
     
     # 保存优化结果
@@ -84,7 +90,8 @@ def optimize_rsi_strategy():
     best_params, best_result, results_df = engine.optimize_parameters(
         df=df,
         strategy_class=RSIStrategy,
-        param_ranges=param_ranges
+        param_ranges=param_ranges,
+        run_id=f"rsi_eth_usdt_4h_{data_fingerprint(df)[:12]}"
     )
     
     # 保存结果
@@ -98,7 +105,7 @@ def optimize_rsi_strategy():
 def walk_forward_analysis():
     """
     步进式分析（Walk-Forward Analysis）
-    将数据分为训练集和测试集，避免过拟合
+    滚动窗口多折优化：每折在训练窗口上选参数，在随后的测试窗口上验证，避免过拟合
     """
     print("\n" + "=" * 80)
     print("示例3C: 步进式分析（防止过拟合）")
@@ -111,16 +118,6 @@ def walk_forward_analysis():
     processor = DataProcessor()
     df = processor.clean_data(df)
     
-    # 分割数据：70%训练，30%测试
-    train_size = int(len(df) * 0.7)
-    df_train = df.iloc[:train_size].copy()
-    df_test = df.iloc[train_size:].copy()
-    
-    print(f"训练集: {len(df_train)} 根K线")
-    print(f"测试集: {len(df_test)} 根K线")
-    
-    # 在训练集上优化参数
-    print("\n🔍 在训练集上寻找最优参数...")
     engine = BacktestEngine(initial_capital=10000, fees=0.0004)
     
     param_ranges = {
@@ -128,32 +125,79 @@ def walk_forward_analysis():
         'slow_window': [50, 60, 70]
     }
     
-    best_params, _, _ = engine.optimize_parameters(
-        df=df_train,
-        strategy_class=EMACrossStrategy,
-        param_ranges=param_ranges
-    )
+    # 前50%数据作为第一折的训练窗口，剩余数据分成5个测试窗口；各折并行运行
+    wfa = WalkForwardEngine(engine, n_folds=5, train_fraction=0.5, mode='rolling', n_jobs=-1)
+    result = wfa.run(df, EMACrossStrategy, param_ranges)
+    
+    print("\n各折结果:")
+    print(result['folds'].to_string(index=False))
+    
+    if result['metrics']['sharpe_ratio'] > 1.0:
+        print("\n✅ 策略在样本外表现良好，可能具有实战价值")
+    else:
+        print("\n⚠️  策略在样本外表现一般，可能存在过拟合")
+
+
+def cross_validation_analysis():
+    """
+    组合清洗交叉验证（CPCV）
+    估计参数优化的过拟合概率（PBO），并用收缩夏普比率扣除多次尝试带来的选择偏差
+    """
+    print("\n" + "=" * 80)
+    print("示例3E: 组合清洗交叉验证（过拟合概率）")
+    print("=" * 80)
     
-    # 在测试集上验证
-    print("\n✅ 使用最优参数在测试集上验证...")
-    strategy = EMACrossStrategy(**best_params)
+    fetcher = DataFetcher("binance")
+    df = fetcher.fetch_ohlcv("BTC/USDT", "1h", 3000)
     
-    test_results = engine.run(df_test, strategy)
+    processor = DataProcessor()
+    df = processor.clean_data(df)
     
+    engine = BacktestEngine(initial_capital=10000, fees=0.0004)
+    
+    # 分成6组，每次取2组作为测试集（15个划分、5条样本外路径）；
+    # 测试集之前去掉最长的慢线周期作为清洗区，之后去掉1%的K线作为禁入区
+    cv = CombinatorialPurgedCV(engine, n_groups=6, n_test_groups=2, purge=70, embargo=0.01, n_jobs=-1)
+    result = cv.run(df, EMACrossStrategy, {
+        'fast_window': [10, 15, 20, 25],
+        'slow_window': [40, 50, 60, 70]
+    })
+    
+    if result['metrics']['pbo'] > 0.5 or result['metrics']['deflated_sharpe'] < 0.95:
+        print("\n⚠️  过拟合概率较高或收缩夏普不显著，最优参数可能只是运气")
+    else:
+        print("\n✅ 最优参数在各划分的样本外表现稳定")
+
+
+def monte_carlo_analysis():
+    """
+    蒙特卡洛检验
+    对优化得到的最优参数做扰动，看结果有多脆弱
+    """
     print("\n" + "=" * 80)
-    print("🎯 步进式分析总结")
+    print("示例3D: 最优参数的蒙特卡洛检验")
     print("=" * 80)
-    print(f"最优参数: {best_params}")
-    print(f"测试集表现:")
-    print(f"  - 总收益: {test_results['total_return']:.2%}")
-    print(f"  - 夏普比率: {test_results['sharpe_ratio']:.2f}")
-    print(f"  - 最大回撤: {test_results['max_drawdown']:.2%}")
-    print(f"  - 胜率: {test_results['win_rate']:.2%}")
-    
-    if test_results['sharpe_ratio'] > 1.0:
-        print("\n✅ 策略在测试集上表现良好，可能具有实战价值")
+    
+    fetcher = DataFetcher("binance")
+    df = fetcher.fetch_ohlcv("BTC/USDT", "1h", 2000)
+    
+    processor = DataProcessor()
+    df = processor.clean_data(df)
+    
+    engine = BacktestEngine(initial_capital=10000, fees=0.0004)
+    best_params, _, _ = engine.optimize_parameters(
+        df,
+        EMACrossStrategy,
+        EMACrossStrategy.param_grid()
+    )
+    
+    analyzer = MonteCarloAnalyzer(n_paths=10000, seed=42, n_jobs=-1)
+    results = analyzer.run(engine, df, EMACrossStrategy(**best_params))
+    
+    if results['block_bootstrap']['prob_loss'] > 0.5:
+        print("\n⚠️  重采样后超过一半的路径亏损，最优参数可能只是运气")
     else:
-        print("\n⚠️  策略在测试集上表现一般，可能存在过拟合")
+        print("\n✅ 重采样后多数路径盈利，结果相对稳健")
 
 
 def main():
@@ -165,9 +209,11 @@ def main():
     print("1. EMA策略优化")
     print("2. RSI策略优化")
     print("3. 步进式分析（推荐）")
-    print("4. 全部运行")
+    print("4. 蒙特卡洛检验")
+    print("5. 组合清洗交叉验证")
+    print("6. 全部运行")
     
-    choice = input("\n请输入选项 (1-4): ").strip()
+    choice = input("\n请输入选项 (1-6): ").strip()
     
     if choice == "1":
         optimize_ema_strategy()
@@ -176,9 +222,15 @@ def main():
     elif choice == "3":
         walk_forward_analysis()
     elif choice == "4":
+        monte_carlo_analysis()
+    elif choice == "5":
+        cross_validation_analysis()
+    elif choice == "6":
         optimize_ema_strategy()
         optimize_rsi_strategy()
         walk_forward_analysis()
+        monte_carlo_analysis()
+        cross_validation_analysis()
     else:
         print("默认运行步进式分析...")
         walk_forward_analysis()
@@ -71,8 +71,8 @@ def main():
     
     viz = Visualizer()
     
-    # 生成信号用于可视化
-    entries, exits = strategy.generate_signals(df)
+    # 复用回测时生成的信号
+    entries, exits = engine.get_signals()
     
     # 绘制K线图和交易信号
     print("绘制K线图...")
@@ -84,8 +84,7 @@ def main():
     
     # 绘制回测结果（权益曲线和回撤）
     print("绘制回测结果...")
-    portfolio = engine.get_portfolio()
-    viz.plot_backtest_results(portfolio, df)
+    viz.plot_backtest_results(results, df)
     
     # ==================== 6. 结果分析 ====================
     print("\n📊 步骤6: 结果分析")
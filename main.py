@@ -10,15 +10,18 @@ import vectorbt as vbt
 # 导入自定义模块
 from data.fetcher import DataFetcher
 from data.processor import DataProcessor
-from strategies.ema_cross import EMACrossStrategy
-from strategies.rsi_strategy import RSIStrategy
-from strategies.macd_strategy import MACDStrategy
+from strategies.registry import registry
 from backtest.engine import BacktestEngine
+from backtest.cache import ResultCache
 from utils.visualization import Visualizer
 from utils.risk_manager import RiskManager
 import config
 
 
+# 交互式使用时反复运行相同的回测，结果直接从缓存读取
+RESULT_CACHE = ResultCache()
+
+
 def quick_start():
     """
     快速开始 - 简单的回测示例
@@ -35,20 +38,21 @@ def quick_start():
     
     # 2. 创建策略
     print("\n🎯 步骤2: 创建策略...")
-    strategy = EMACrossStrategy(fast_window=20, slow_window=60)
+    strategy = registry.create("ema_cross", fast_window=20, slow_window=60)
     print(f"✅ 策略: {strategy}")
     
     # 3. 运行回测
     print("\n🚀 步骤3: 运行回测...")
     engine = BacktestEngine(
         initial_capital=10000,
-        fees=0.0004
+        fees=0.0004,
+        cache=RESULT_CACHE
     )
     results = engine.run(df, strategy)
     
-    # 4. 可视化
+    # 4. 可视化（复用回测时生成的信号）
     print("\n📈 步骤4: 可视化结果...")
-    entries, exits = strategy.generate_signals(df)
+    entries, exits = engine.get_signals()
     
     viz = Visualizer()
     viz.plot_candlestick(
@@ -57,8 +61,7 @@ def quick_start():
         signals={'entries': entries, 'exits': exits}
     )
     
-    portfolio = engine.get_portfolio()
-    viz.plot_backtest_results(portfolio, df)
+    viz.plot_backtest_results(results, df)
     
     print("\n✅ 完成！")
 
@@ -114,37 +117,47 @@ def single_strategy_backtest():
     timeframes = {"1": "1h", "2": "4h", "3": "1d"}
     timeframe = timeframes.get(tf_choice, "1h")
     
-    # 选择策略
-    print("\n策略类型:")
-    print("1. EMA交叉策略")
-    print("2. RSI策略")
-    print("3. MACD策略")
-    strategy_choice = input("请选择 (默认1): ").strip() or "1"
-    
-    if strategy_choice == "1":
-        fast = int(input("快线周期 (默认20): ").strip() or "20")
-        slow = int(input("慢线周期 (默认60): ").strip() or "60")
-        strategy = EMACrossStrategy(fast_window=fast, slow_window=slow)
-    elif strategy_choice == "2":
-        period = int(input("RSI周期 (默认14): ").strip() or "14")
-        oversold = int(input("超卖线 (默认30): ").strip() or "30")
-        overbought = int(input("超买线 (默认70): ").strip() or "70")
-        strategy = RSIStrategy(period=period, oversold=oversold, overbought=overbought)
-    else:
-        strategy = MACDStrategy()
+    # 选择策略（菜单由策略注册表生成，只导入被选中的策略）
+    strategy = choose_strategy()
     
     # 执行回测
     fetcher = DataFetcher()
     df = fetcher.fetch_ohlcv(symbol, timeframe, 1000)
     
-    engine = BacktestEngine()
+    engine = BacktestEngine(cache=RESULT_CACHE)
     results = engine.run(df, strategy)
     
-    # 可视化
-    entries, exits = strategy.generate_signals(df)
+    # 可视化（复用回测时生成的信号）
+    entries, exits = engine.get_signals()
     viz = Visualizer()
     viz.plot_candlestick(df, title=f"{symbol} {timeframe}", signals={'entries': entries, 'exits': exits})
-    viz.plot_backtest_results(engine.get_portfolio(), df)
+    viz.plot_backtest_results(results, df)
+
+
+def choose_strategy():
+    """从策略注册表中选择策略并按参数模式输入参数"""
+    specs = registry.specs()
+    
+    print("\n策略类型:")
+    for i, spec in enumerate(specs, 1):
+        print(f"{i}. {spec.display_name}")
+    choice = input("请选择 (默认1): ").strip() or "1"
+    
+    try:
+        spec = specs[int(choice) - 1]
+    except (ValueError, IndexError):
+        spec = specs[0]
+    
+    strategy_class = spec.load()
+    params = {}
+    for name, schema in strategy_class.param_schema.items():
+        default = schema.get('default')
+        label = schema.get('label', name)
+        cast = schema.get('type', type(default))
+        raw = input(f"{label} (默认{default}): ").strip()
+        params[name] = cast(raw) if raw else default
+    
+    return strategy_class(**params)
 
 
 def multi_strategy_comparison():
@@ -1,14 +1,43 @@
 """
 策略模块
+
+具体策略按需导入（PEP 562），`import strategies` 不会加载 ta 等依赖
 """
+import importlib
+
 from .base import BaseStrategy
-from .ema_cross import EMACrossStrategy
-from .rsi_strategy import RSIStrategy
-from .macd_strategy import MACDStrategy
+from .registry import StrategyRegistry, registry, list_strategies, get_strategy, create_strategy
+
+# 导出名称 -> 所在模块
+_LAZY_EXPORTS = {
+    "EMACrossStrategy": ".ema_cross",
+    "RSIStrategy": ".rsi_strategy",
+    "MACDStrategy": ".macd_strategy",
+    "MACDAdvancedStrategy": ".macd_strategy",
+}
 
 __all__ = [
     "BaseStrategy",
     "EMACrossStrategy",
     "RSIStrategy",
-    "MACDStrategy"
-]
\ No newline at end of file
+    "MACDStrategy",
+    "MACDAdvancedStrategy",
+    "StrategyRegistry",
+    "registry",
+    "list_strategies",
+    "get_strategy",
+    "create_strategy",
+]
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        module = importlib.import_module(_LAZY_EXPORTS[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -3,8 +3,9 @@
 所有交易策略都应该继承这个类
 """
 from abc import ABC, abstractmethod
+import numpy as np
 import pandas as pd
-from typing import Tuple
+from typing import Any, Dict, List, Tuple
 
 
 class BaseStrategy(ABC):
@@ -12,7 +13,20 @@ class BaseStrategy(ABC):
     策略基类
     
     子类需要实现 generate_signals 方法
+
+    类属性（供策略注册表使用，可选）:
+        registry_name: 注册名称，默认由类名推导（EMACrossStrategy -> ema_cross）
+        display_name: 显示名称
+        param_schema: 参数模式 {参数名: {'type', 'default', 'grid', 'label'}}
+        supports_batch: 是否实现了共享指标的批量信号生成（generate_signals_batch）
+        supports_incremental: 是否实现了增量信号（signal_state / update_signals），
+            追加K线时只计算新K线的指标
     """
+
+    display_name: str = "BaseStrategy"
+    param_schema: Dict[str, dict] = {}
+    supports_batch: bool = False
+    supports_incremental: bool = False
     
     def __init__(self, name: str = "BaseStrategy"):
         """
@@ -37,6 +51,68 @@ class BaseStrategy(ABC):
         """
         pass
     
+    @classmethod
+    def generate_signals_batch(
+        cls,
+        df: pd.DataFrame,
+        param_list: List[dict],
+        cache=None
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        批量生成多个参数组合的信号
+
+        默认实现逐个组合调用 generate_signals；子类可以借助 IndicatorCache
+        覆盖此方法，让相同参数的指标只计算一次。
+        
+        Args:
+            df: 价格数据
+            param_list: 参数字典列表
+            cache: IndicatorCache（默认实现不使用）
+            
+        Returns:
+            (entries, exits) 宽表，第 j 列对应 param_list[j]
+        """
+        entries = np.zeros((len(df), len(param_list)), dtype=bool)
+        exits = np.zeros((len(df), len(param_list)), dtype=bool)
+        
+        for j, params in enumerate(param_list):
+            e, x = cls(**params).generate_signals(df)
+            entries[:, j] = np.asarray(e, dtype=bool)
+            exits[:, j] = np.asarray(x, dtype=bool)
+        
+        return cls._signal_frames(df, entries, exits)
+    
+    def signal_state(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """
+        指标在 df 最后一根K线上的递推状态（supports_incremental 的策略实现）
+        
+        状态必须可以 pickle；之后用 update_signals 为追加的K线生成信号，
+        结果应与在整段数据上调用 generate_signals 完全一致。
+        """
+        raise NotImplementedError(f"{type(self).__name__} 不支持增量信号")
+    
+    def update_signals(self, state: Dict[str, Any], df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        为追加的K线生成信号，并原地更新 state
+        
+        Args:
+            state: signal_state 或上一次 update_signals 之后的状态
+            df: 只包含新K线的价格数据
+            
+        Returns:
+            (entries, exits) 布尔数组，长度与 df 相同
+        """
+        raise NotImplementedError(f"{type(self).__name__} 不支持增量信号")
+    
+    @staticmethod
+    def _signal_frames(df: pd.DataFrame, entries: np.ndarray, exits: np.ndarray) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """把信号矩阵包装成与 df 同索引的 DataFrame"""
+        columns = pd.RangeIndex(entries.shape[1])
+        return (
+            pd.DataFrame(entries, index=df.index, columns=columns),
+            pd.DataFrame(exits, index=df.index, columns=columns)
+        )
+    
     def set_params(self, **kwargs):
         """设置策略参数"""
         self.params.update(kwargs)
@@ -46,6 +122,19 @@ class BaseStrategy(ABC):
         """获取策略参数"""
         return self.params
     
+    @classmethod
+    def param_grid(cls, **overrides) -> Dict[str, list]:
+        """
+        由参数模式生成参数网格（可直接传给 optimize_parameters）
+
+        Args:
+            **overrides: 覆盖某些参数的候选值
+        """
+        return {
+            name: list(overrides.get(name, schema.get('grid') or [schema.get('default')]))
+            for name, schema in cls.param_schema.items()
+        }
+    
     def __repr__(self):
         params_str = ', '.join([f"{k}={v}" for k, v in self.params.items()])
         return f"{self.name}({params_str})"
\ No newline at end of file
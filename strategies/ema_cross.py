@@ -2,10 +2,12 @@
 EMA 均线交叉策略
 当快线上穿慢线时买入，下穿时卖出
 """
+import numpy as np
 import pandas as pd
 import ta
-from typing import Tuple
+from typing import List, Tuple
 from .base import BaseStrategy
+from .indicators import IndicatorCache, EWMState, crossed_above, crossed_below, ewm_alpha
 import config
 
 
@@ -17,9 +19,17 @@ class EMACrossStrategy(BaseStrategy):
         fast_window: 快速EMA周期 (默认20)
         slow_window: 慢速EMA周期 (默认60)
     """
+
+    display_name = "EMA交叉策略"
+    param_schema = {
+        'fast_window': {'type': int, 'default': config.EMA_FAST_WINDOW, 'grid': [10, 15, 20, 25, 30], 'label': '快线周期'},
+        'slow_window': {'type': int, 'default': config.EMA_SLOW_WINDOW, 'grid': [40, 50, 60, 70, 80], 'label': '慢线周期'},
+    }
+    supports_batch = True
+    supports_incremental = True
     
     def __init__(self, fast_window: int = None, slow_window: int = None):
-        super().__init__("EMA交叉策略")
+        super().__init__(self.display_name)
         
         self.fast_window = fast_window or config.EMA_FAST_WINDOW
         self.slow_window = slow_window or config.EMA_SLOW_WINDOW
@@ -52,6 +62,49 @@ class EMACrossStrategy(BaseStrategy):
                 (df['ema_fast'].shift(1) >= df['ema_slow'].shift(1))
         
         return entries, exits
+    
+    @classmethod
+    def generate_signals_batch(
+        cls,
+        df: pd.DataFrame,
+        param_list: List[dict],
+        cache: IndicatorCache = None
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """批量生成信号，每个EMA周期只计算一次"""
+        cache = cache if cache is not None else IndicatorCache(df)
+        entries = np.zeros((len(df), len(param_list)), dtype=bool)
+        exits = np.zeros((len(df), len(param_list)), dtype=bool)
+        
+        for j, params in enumerate(param_list):
+            strategy = cls(**params)
+            fast = cache.ema(strategy.fast_window)
+            slow = cache.ema(strategy.slow_window)
+            entries[:, j] = crossed_above(fast, slow)
+            exits[:, j] = crossed_below(fast, slow)
+        
+        return cls._signal_frames(df, entries, exits)
+    
+    def signal_state(self, df: pd.DataFrame) -> dict:
+        """两条EMA的递推状态和最后一根K线上的值"""
+        close = df['close'].to_numpy(dtype=float)
+        fast = ta.trend.ema_indicator(df['close'], window=self.fast_window).to_numpy(dtype=float)
+        slow = ta.trend.ema_indicator(df['close'], window=self.slow_window).to_numpy(dtype=float)
+        return {
+            'fast': EWMState.from_history(close, ewm_alpha(span=self.fast_window), self.fast_window, fast),
+            'slow': EWMState.from_history(close, ewm_alpha(span=self.slow_window), self.slow_window, slow),
+            'previous': (fast[-1], slow[-1]) if len(df) else (np.nan, np.nan),
+        }
+    
+    def update_signals(self, state: dict, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """只计算新K线上的EMA并生成信号"""
+        close = df['close'].to_numpy(dtype=float)
+        fast = state['fast'].update(close)
+        slow = state['slow'].update(close)
+        entries = crossed_above(fast, slow, state['previous'])
+        exits = crossed_below(fast, slow, state['previous'])
+        if len(close):
+            state['previous'] = (fast[-1], slow[-1])
+        return entries, exits
 
 
 # ==================== 使用示例 ====================
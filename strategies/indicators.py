@@ -0,0 +1,186 @@
+"""
+指标缓存
+同一份数据上的多个参数组合共享指标计算结果，供批量信号生成使用
+"""
+import numpy as np
+import pandas as pd
+import ta
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+
+class IndicatorCache:
+    """
+    指标缓存
+
+    以 (指标名, 参数) 为键缓存 numpy 数组，绑定到一份价格数据上。
+    例如网格中有 25 种 EMA 参数组合，但只有 10 个不同的周期，
+    那么 EMA 只需计算 10 次。
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        """
+        初始化
+
+        Args:
+            df: 价格数据（缓存只对这份数据有效）
+        """
+        self.df = df
+        self._store: Dict[Hashable, object] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, func: Callable[[], object]):
+        """获取缓存值，不存在时调用 func 计算并缓存"""
+        if key in self._store:
+            self.hits += 1
+            return self._store[key]
+        self.misses += 1
+        value = func()
+        self._store[key] = value
+        return value
+
+    def ema(self, window: int, col: str = 'close') -> np.ndarray:
+        """EMA（与 ta.trend.ema_indicator 一致）"""
+        return self.get(
+            ('ema', col, window),
+            lambda: ta.trend.ema_indicator(self.df[col], window=window).to_numpy(dtype=float)
+        )
+
+    def rsi(self, window: int, col: str = 'close') -> np.ndarray:
+        """RSI（与 ta.momentum.rsi 一致）"""
+        return self.get(
+            ('rsi', col, window),
+            lambda: ta.momentum.rsi(self.df[col], window=window).to_numpy(dtype=float)
+        )
+
+    def macd(self, fast: int, slow: int, signal: int, col: str = 'close') -> Tuple[np.ndarray, np.ndarray]:
+        """MACD 线和信号线（与 ta.trend.MACD 一致）"""
+        def compute():
+            indicator = ta.trend.MACD(
+                self.df[col], window_slow=slow, window_fast=fast, window_sign=signal
+            )
+            return (
+                indicator.macd().to_numpy(dtype=float),
+                indicator.macd_signal().to_numpy(dtype=float)
+            )
+        return self.get(('macd', col, fast, slow, signal), compute)
+
+    def __len__(self):
+        return len(self._store)
+
+    def clear(self):
+        self._store.clear()
+
+
+def shift(values: np.ndarray, periods: int = 1) -> np.ndarray:
+    """与 pd.Series.shift 相同语义的数组平移（空出的位置为 NaN）"""
+    result = np.empty_like(values, dtype=float)
+    if periods > 0:
+        result[:periods] = np.nan
+        result[periods:] = values[:-periods]
+    else:
+        result[:] = values
+    return result
+
+
+def _previous(values, previous):
+    """上一根K线的值：previous 为 None 时等同 shift(1)，否则以 previous 作为第一根之前的值"""
+    if not isinstance(values, np.ndarray):
+        return values
+    return shift(values) if previous is None else append_previous(previous, values)
+
+
+def crossed_above(a: np.ndarray, b, previous: Optional[Tuple[float, float]] = None) -> np.ndarray:
+    """
+    a 上穿 b: (a > b) & (a.shift(1) <= b.shift(1))
+
+    previous: 增量计算时 a、b 在第一根之前那根K线上的值
+    """
+    a_prev, b_prev = previous if previous is not None else (None, None)
+    return (a > b) & (_previous(a, a_prev) <= _previous(b, b_prev))
+
+
+def crossed_below(a: np.ndarray, b, previous: Optional[Tuple[float, float]] = None) -> np.ndarray:
+    """a 下穿 b: (a < b) & (a.shift(1) >= b.shift(1))，previous 同 crossed_above"""
+    a_prev, b_prev = previous if previous is not None else (None, None)
+    return (a < b) & (_previous(a, a_prev) >= _previous(b, b_prev))
+
+
+# ==================== 增量计算 ====================
+
+def ewm_alpha(span: Optional[float] = None, alpha: Optional[float] = None) -> float:
+    """与 pandas 相同的平滑系数（先换算成质心 com，再取 1 / (1 + com)，保证逐位一致）"""
+    com = (span - 1) / 2.0 if span is not None else (1 - alpha) / alpha
+    return 1.0 / (1.0 + com)
+
+
+class EWMState:
+    """
+    ewm(adjust=False, ignore_na=False).mean() 的递推状态
+
+    ta 的 EMA、MACD 和 RSI 都基于这个递推。保存末尾的状态后，追加新数据时只计算新的部分，
+    结果与在整段数据上重新计算逐位一致（按 pandas 的递推公式逐步计算）。
+    """
+
+    def __init__(self, alpha: float, min_periods: int = 0):
+        """
+        初始化
+
+        Args:
+            alpha: 平滑系数（用 ewm_alpha 换算）
+            min_periods: 有效观测数达到该值之前输出 NaN
+        """
+        self.alpha = alpha
+        self.min_periods = max(int(min_periods), 1)
+        self.weighted = np.nan
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    @classmethod
+    def from_history(cls, values: np.ndarray, alpha: float, min_periods: int = 0,
+                     output: Optional[np.ndarray] = None) -> 'EWMState':
+        """
+        由历史数据得到末尾状态
+
+        Args:
+            values: 历史输入
+            alpha: 平滑系数
+            min_periods: 最少观测数
+            output: 历史输入上 pandas 计算的结果；末尾是有效观测且结果非 NaN 时直接取用，免去逐步递推
+        """
+        state = cls(alpha, min_periods)
+        values = np.asarray(values, dtype=float)
+        if output is not None and len(values) > 0 and not np.isnan(values[-1]) and not np.isnan(output[-1]):
+            state.weighted = float(output[-1])
+            state.nobs = int(np.count_nonzero(~np.isnan(values)))
+        else:
+            state.update(values)
+        return state
+
+    def update(self, values: np.ndarray) -> np.ndarray:
+        """追加新数据，返回新数据对应的输出"""
+        values = np.asarray(values, dtype=float)
+        out = np.empty(len(values))
+        old_wt_factor = 1.0 - self.alpha
+        new_wt = self.alpha
+        weighted, old_wt, nobs = self.weighted, self.old_wt, self.nobs
+        for i, cur in enumerate(values):
+            is_observation = cur == cur
+            nobs += is_observation
+            if weighted == weighted:
+                old_wt *= old_wt_factor
+                if is_observation:
+                    # 与 pandas 相同：值不变时跳过，避免常数序列的舍入误差
+                    if weighted != cur:
+                        weighted = (old_wt * weighted + new_wt * cur) / (old_wt + new_wt)
+                    old_wt = 1.0
+            elif is_observation:
+                weighted = cur
+            out[i] = weighted if nobs >= self.min_periods else np.nan
+        self.weighted, self.old_wt, self.nobs = weighted, old_wt, nobs
+        return out
+
+
+def append_previous(previous: float, values: np.ndarray) -> np.ndarray:
+    """新数据的上一根值序列：[previous, values[:-1]]（增量计算时代替 shift(1)）"""
+    return np.concatenate([[previous], values[:-1]]) if len(values) else np.empty(0)
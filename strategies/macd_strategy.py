@@ -2,10 +2,12 @@
 MACD 策略
 基于MACD指标的交易策略
 """
+import numpy as np
 import pandas as pd
 import ta
-from typing import Tuple
+from typing import List, Tuple
 from .base import BaseStrategy
+from .indicators import IndicatorCache, EWMState, crossed_above, crossed_below, ewm_alpha
 import config
 
 
@@ -22,6 +24,15 @@ class MACDStrategy(BaseStrategy):
         slow: 慢速EMA周期 (默认26)
         signal: 信号线周期 (默认9)
     """
+
+    display_name = "MACD策略"
+    param_schema = {
+        'fast': {'type': int, 'default': config.MACD_FAST, 'grid': [8, 12, 16], 'label': '快线周期'},
+        'slow': {'type': int, 'default': config.MACD_SLOW, 'grid': [21, 26, 31], 'label': '慢线周期'},
+        'signal': {'type': int, 'default': config.MACD_SIGNAL, 'grid': [7, 9, 11], 'label': '信号线周期'},
+    }
+    supports_batch = True
+    supports_incremental = True
     
     def __init__(
         self,
@@ -29,7 +40,7 @@ class MACDStrategy(BaseStrategy):
         slow: int = None,
         signal: int = None
     ):
-        super().__init__("MACD策略")
+        super().__init__(self.display_name)
         
         self.fast = fast or config.MACD_FAST
         self.slow = slow or config.MACD_SLOW
@@ -71,6 +82,36 @@ class MACDStrategy(BaseStrategy):
                 (df['macd'].shift(1) >= df['macd_signal'].shift(1))
         
         return entries, exits
+    
+    @classmethod
+    def generate_signals_batch(
+        cls,
+        df: pd.DataFrame,
+        param_list: List[dict],
+        cache: IndicatorCache = None
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """批量生成信号，相同 (fast, slow, signal) 的MACD只计算一次"""
+        cache = cache if cache is not None else IndicatorCache(df)
+        entries = np.zeros((len(df), len(param_list)), dtype=bool)
+        exits = np.zeros((len(df), len(param_list)), dtype=bool)
+        
+        for j, params in enumerate(param_list):
+            strategy = cls(**params)
+            macd, macd_signal = cache.macd(strategy.fast, strategy.slow, strategy.signal)
+            entries[:, j] = crossed_above(macd, macd_signal)
+            exits[:, j] = crossed_below(macd, macd_signal)
+        
+        return cls._signal_frames(df, entries, exits)
+    
+    def signal_state(self, df: pd.DataFrame) -> dict:
+        """快慢EMA和信号线的递推状态"""
+        return _macd_state(df, self.fast, self.slow, self.signal)
+    
+    def update_signals(self, state: dict, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """只计算新K线上的MACD并生成信号"""
+        previous = state['previous']
+        macd, macd_signal = _macd_update(state, df)
+        return crossed_above(macd, macd_signal, previous), crossed_below(macd, macd_signal, previous)
 
 
 class MACDAdvancedStrategy(BaseStrategy):
@@ -81,9 +122,18 @@ class MACDAdvancedStrategy(BaseStrategy):
     - 只在MACD > 0时做多
     - 只在MACD < 0时观望或做空
     """
+
+    display_name = "MACD高级策略"
+    param_schema = {
+        'fast': {'type': int, 'default': 12, 'grid': [8, 12, 16], 'label': '快线周期'},
+        'slow': {'type': int, 'default': 26, 'grid': [21, 26, 31], 'label': '慢线周期'},
+        'signal': {'type': int, 'default': 9, 'grid': [7, 9, 11], 'label': '信号线周期'},
+    }
+    supports_batch = True
+    supports_incremental = True
     
     def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
-        super().__init__("MACD高级策略")
+        super().__init__(self.display_name)
         
         self.fast = fast
         self.slow = slow
@@ -124,6 +174,63 @@ class MACDAdvancedStrategy(BaseStrategy):
                 ((df['macd'] < 0) & (df['macd'].shift(1) >= 0))
         
         return entries, exits
+    
+    @classmethod
+    def generate_signals_batch(
+        cls,
+        df: pd.DataFrame,
+        param_list: List[dict],
+        cache: IndicatorCache = None
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """批量生成信号，相同 (fast, slow, signal) 的MACD只计算一次"""
+        cache = cache if cache is not None else IndicatorCache(df)
+        entries = np.zeros((len(df), len(param_list)), dtype=bool)
+        exits = np.zeros((len(df), len(param_list)), dtype=bool)
+        
+        for j, params in enumerate(param_list):
+            strategy = cls(**params)
+            macd, macd_signal = cache.macd(strategy.fast, strategy.slow, strategy.signal)
+            entries[:, j] = crossed_above(macd, macd_signal) & (macd > 0)
+            exits[:, j] = crossed_below(macd, macd_signal) | crossed_below(macd, 0)
+        
+        return cls._signal_frames(df, entries, exits)
+    
+    def signal_state(self, df: pd.DataFrame) -> dict:
+        """快慢EMA和信号线的递推状态"""
+        return _macd_state(df, self.fast, self.slow, self.signal)
+    
+    def update_signals(self, state: dict, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """只计算新K线上的MACD并生成信号"""
+        previous = state['previous']
+        macd, macd_signal = _macd_update(state, df)
+        entries = crossed_above(macd, macd_signal, previous) & (macd > 0)
+        exits = crossed_below(macd, macd_signal, previous) | crossed_below(macd, 0, (previous[0], 0))
+        return entries, exits
+
+
+def _macd_state(df: pd.DataFrame, fast: int, slow: int, signal: int) -> dict:
+    """MACD 各条EMA在最后一根K线上的递推状态（与 ta.trend.MACD 的计算方式相同）"""
+    close = df['close'].to_numpy(dtype=float)
+    indicator = ta.trend.MACD(df['close'], window_slow=slow, window_fast=fast, window_sign=signal)
+    macd = indicator.macd().to_numpy(dtype=float)
+    macd_signal = indicator.macd_signal().to_numpy(dtype=float)
+    ema = lambda window: ta.trend.ema_indicator(df['close'], window=window).to_numpy(dtype=float)
+    return {
+        'fast': EWMState.from_history(close, ewm_alpha(span=fast), fast, ema(fast)),
+        'slow': EWMState.from_history(close, ewm_alpha(span=slow), slow, ema(slow)),
+        'signal': EWMState.from_history(macd, ewm_alpha(span=signal), signal, macd_signal),
+        'previous': (macd[-1], macd_signal[-1]) if len(df) else (np.nan, np.nan),
+    }
+
+
+def _macd_update(state: dict, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """新K线上的 MACD 线和信号线，并更新 state"""
+    close = df['close'].to_numpy(dtype=float)
+    macd = state['fast'].update(close) - state['slow'].update(close)
+    macd_signal = state['signal'].update(macd)
+    if len(close):
+        state['previous'] = (macd[-1], macd_signal[-1])
+    return macd, macd_signal
 
 
 # ==================== 使用示例 ====================
@@ -0,0 +1,302 @@
+"""
+策略注册表
+按名称发现策略（包内扫描 + entry points），只在被选中时才导入策略模块
+"""
+import ast
+import importlib
+import importlib.util
+import re
+from importlib import metadata
+from itertools import product
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+# 第三方包可以通过该 entry point 组注册策略，例如 pyproject.toml 中：
+# [project.entry-points."quant_demo.strategies"]
+# my_strategy = "my_pkg.my_module:MyStrategy"
+ENTRY_POINT_GROUP = "quant_demo.strategies"
+
+# 包内扫描时跳过的模块（不包含具体策略）
+_SKIP_MODULES = {"__init__", "base", "registry"}
+
+
+def _default_key(class_name: str) -> str:
+    """EMACrossStrategy -> ema_cross, MACDAdvancedStrategy -> macd_advanced"""
+    name = re.sub(r"Strategy$", "", class_name) or class_name
+    name = re.sub(r"([A-Z]+)([A-Z][a-z])", r"\1_\2", name)
+    name = re.sub(r"([a-z0-9])([A-Z])", r"\1_\2", name)
+    return name.lower()
+
+
+class StrategySpec:
+    """
+    策略描述（尚未导入）
+
+    只记录模块路径和类名，调用 load() 时才真正导入
+    """
+
+    def __init__(
+        self,
+        name: str,
+        module: str,
+        class_name: str,
+        display_name: Optional[str] = None,
+        source: str = "package"
+    ):
+        self.name = name
+        self.module = module
+        self.class_name = class_name
+        self.display_name = display_name or class_name
+        self.source = source
+        self._cls = None
+
+    @property
+    def path(self) -> str:
+        """'module:Class' 形式的导入路径（可以安全地传给子进程）"""
+        return f"{self.module}:{self.class_name}"
+
+    @property
+    def loaded(self) -> bool:
+        return self._cls is not None
+
+    def load(self):
+        """导入并返回策略类"""
+        if self._cls is None:
+            module = importlib.import_module(self.module)
+            self._cls = getattr(module, self.class_name)
+        return self._cls
+
+    def __repr__(self):
+        return f"StrategySpec({self.name!r}, {self.path!r}, source={self.source!r})"
+
+
+class StrategyRegistry:
+    """
+    策略注册表
+
+    发现顺序:
+    1. 扫描策略包中的 .py 文件（用 ast 解析，不导入模块）
+    2. entry points 组 ENTRY_POINT_GROUP 中声明的第三方策略
+    3. 通过 register() 手动注册的策略
+    """
+
+    def __init__(self, package: str = "strategies", entry_point_group: str = ENTRY_POINT_GROUP):
+        """
+        初始化注册表
+
+        Args:
+            package: 要扫描的策略包名
+            entry_point_group: entry points 组名，None 表示不加载 entry points
+        """
+        self.package = package
+        self.entry_point_group = entry_point_group
+        self._specs: Dict[str, StrategySpec] = {}
+        self._discovered = False
+
+    # ==================== 发现 ====================
+
+    def discover(self, force: bool = False) -> "StrategyRegistry":
+        """扫描包和 entry points，建立名称到策略描述的映射"""
+        if self._discovered and not force:
+            return self
+
+        manual = {k: v for k, v in self._specs.items() if v.source == "manual"}
+        self._specs = {}
+        self._scan_package()
+        self._scan_entry_points()
+        self._specs.update(manual)
+        self._discovered = True
+        return self
+
+    def _scan_package(self):
+        """用 ast 解析包内模块，找出继承 BaseStrategy 的类"""
+        spec = importlib.util.find_spec(self.package)
+        if spec is None or not spec.submodule_search_locations:
+            return
+
+        for location in spec.submodule_search_locations:
+            for path in sorted(Path(location).glob("*.py")):
+                if path.stem in _SKIP_MODULES or path.stem.startswith("_"):
+                    continue
+                try:
+                    tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+                except (OSError, SyntaxError) as e:
+                    print(f"⚠️  无法解析策略模块 {path.name}: {e}")
+                    continue
+
+                for node in tree.body:
+                    if isinstance(node, ast.ClassDef) and self._is_strategy_class(node):
+                        attrs = self._class_str_attrs(node)
+                        name = attrs.get("registry_name") or _default_key(node.name)
+                        self._specs[name] = StrategySpec(
+                            name=name,
+                            module=f"{self.package}.{path.stem}",
+                            class_name=node.name,
+                            display_name=attrs.get("display_name"),
+                            source="package"
+                        )
+
+    def _scan_entry_points(self):
+        """加载 entry points 中声明的策略（仅记录路径，不导入）"""
+        if not self.entry_point_group:
+            return
+        try:
+            eps = metadata.entry_points(group=self.entry_point_group)
+        except Exception as e:
+            print(f"⚠️  读取 entry points 失败: {e}")
+            return
+
+        for ep in eps:
+            module, _, class_name = ep.value.partition(":")
+            if not class_name:
+                print(f"⚠️  entry point {ep.name} 格式无效: {ep.value}")
+                continue
+            self._specs[ep.name] = StrategySpec(
+                name=ep.name,
+                module=module.strip(),
+                class_name=class_name.strip(),
+                source="entry_point"
+            )
+
+    @staticmethod
+    def _is_strategy_class(node: ast.ClassDef) -> bool:
+        for base in node.bases:
+            base_name = base.attr if isinstance(base, ast.Attribute) else getattr(base, "id", None)
+            if base_name == "BaseStrategy":
+                return True
+        return False
+
+    @staticmethod
+    def _class_str_attrs(node: ast.ClassDef) -> Dict[str, str]:
+        """读取类体中的字符串常量属性（如 registry_name、display_name）"""
+        attrs = {}
+        for stmt in node.body:
+            if (
+                isinstance(stmt, ast.Assign)
+                and len(stmt.targets) == 1
+                and isinstance(stmt.targets[0], ast.Name)
+                and isinstance(stmt.value, ast.Constant)
+                and isinstance(stmt.value.value, str)
+            ):
+                attrs[stmt.targets[0].id] = stmt.value.value
+        return attrs
+
+    # ==================== 注册与查询 ====================
+
+    def register(self, name: str, target, display_name: Optional[str] = None):
+        """
+        手动注册策略
+
+        Args:
+            name: 策略名称
+            target: 策略类，或 'module:Class' 形式的导入路径
+            display_name: 显示名称
+        """
+        self.discover()
+        if isinstance(target, str):
+            module, _, class_name = target.partition(":")
+            spec = StrategySpec(name, module, class_name, display_name, source="manual")
+        else:
+            spec = StrategySpec(
+                name, target.__module__, target.__qualname__,
+                display_name or getattr(target, "display_name", None), source="manual"
+            )
+            spec._cls = target
+        self._specs[name] = spec
+        return spec
+
+    def names(self) -> List[str]:
+        """所有已发现的策略名称"""
+        return list(self.discover()._specs)
+
+    def specs(self) -> List[StrategySpec]:
+        """所有策略描述"""
+        return list(self.discover()._specs.values())
+
+    def spec(self, name: str) -> StrategySpec:
+        """按名称获取策略描述"""
+        self.discover()
+        if name not in self._specs:
+            raise KeyError(f"未知策略: {name}，可用策略: {', '.join(self._specs)}")
+        return self._specs[name]
+
+    def get(self, name: str):
+        """按名称获取策略类（此时才导入模块）"""
+        return self.spec(name).load()
+
+    def create(self, name: str, **params):
+        """按名称创建策略实例"""
+        return self.get(name)(**params)
+
+    def name_of(self, strategy_class) -> Optional[str]:
+        """反查策略类对应的注册名称"""
+        for spec in self.specs():
+            if spec.module == strategy_class.__module__ and spec.class_name == strategy_class.__qualname__:
+                return spec.name
+        return None
+
+    # ==================== 参数模式 ====================
+
+    def get_param_schema(self, name: str) -> Dict[str, dict]:
+        """
+        获取策略的参数模式
+
+        Returns:
+            {参数名: {'type': 类型, 'default': 默认值, 'grid': 候选值列表, 'label': 说明}}
+        """
+        return dict(getattr(self.get(name), "param_schema", {}))
+
+    def build_param_grid(self, name: str, **overrides) -> Dict[str, list]:
+        """
+        根据参数模式生成 optimize_parameters 所需的 param_ranges
+
+        Args:
+            name: 策略名称
+            **overrides: 覆盖某些参数的候选值，如 fast_window=[5, 10]
+        """
+        return self.get(name).param_grid(**overrides)
+
+    def iter_param_combinations(self, name: str, **overrides) -> List[dict]:
+        """展开参数网格为参数字典列表"""
+        grid = self.build_param_grid(name, **overrides)
+        keys = list(grid)
+        return [dict(zip(keys, combo)) for combo in product(*grid.values())]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.discover()._specs
+
+    def __len__(self):
+        return len(self.discover()._specs)
+
+
+# 默认注册表
+registry = StrategyRegistry()
+
+
+def list_strategies() -> List[str]:
+    """列出所有可用策略名称"""
+    return registry.names()
+
+
+def get_strategy(name: str):
+    """按名称获取策略类"""
+    return registry.get(name)
+
+
+def create_strategy(name: str, **params):
+    """按名称创建策略实例"""
+    return registry.create(name, **params)
+
+
+# ==================== 使用示例 ====================
+if __name__ == "__main__":
+    import sys
+
+    for spec in registry.specs():
+        print(f"{spec.name:<16} {spec.display_name:<12} {spec.path}")
+
+    # 只有被选中的策略模块才会被导入
+    print("\n已导入 ta:", "ta" in sys.modules)
+    print("EMA 参数模式:", registry.get_param_schema("ema_cross"))
+    print("EMA 参数网格:", registry.build_param_grid("ema_cross"))
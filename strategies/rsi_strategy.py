@@ -2,10 +2,12 @@
 RSI 策略
 基于相对强弱指标的超买超卖策略
 """
+import numpy as np
 import pandas as pd
 import ta
-from typing import Tuple
+from typing import List, Tuple
 from .base import BaseStrategy
+from .indicators import IndicatorCache, EWMState, append_previous, crossed_above, crossed_below, ewm_alpha
 import config
 
 
@@ -18,6 +20,15 @@ class RSIStrategy(BaseStrategy):
         oversold: 超卖线 (默认30)
         overbought: 超买线 (默认70)
     """
+
+    display_name = "RSI策略"
+    param_schema = {
+        'period': {'type': int, 'default': config.RSI_PERIOD, 'grid': [10, 14, 20], 'label': 'RSI周期'},
+        'oversold': {'type': int, 'default': config.RSI_OVERSOLD, 'grid': [20, 25, 30, 35], 'label': '超卖线'},
+        'overbought': {'type': int, 'default': config.RSI_OVERBOUGHT, 'grid': [65, 70, 75, 80], 'label': '超买线'},
+    }
+    supports_batch = True
+    supports_incremental = True
     
     def __init__(
         self,
@@ -25,7 +36,7 @@ class RSIStrategy(BaseStrategy):
         oversold: int = None,
         overbought: int = None
     ):
-        super().__init__("RSI策略")
+        super().__init__(self.display_name)
         
         self.period = period or config.RSI_PERIOD
         self.oversold = oversold or config.RSI_OVERSOLD
@@ -58,6 +69,65 @@ class RSIStrategy(BaseStrategy):
                 (df['rsi'].shift(1) >= self.overbought)
         
         return entries, exits
+    
+    @classmethod
+    def generate_signals_batch(
+        cls,
+        df: pd.DataFrame,
+        param_list: List[dict],
+        cache: IndicatorCache = None
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """批量生成信号，每个RSI周期只计算一次"""
+        cache = cache if cache is not None else IndicatorCache(df)
+        entries = np.zeros((len(df), len(param_list)), dtype=bool)
+        exits = np.zeros((len(df), len(param_list)), dtype=bool)
+        
+        for j, params in enumerate(param_list):
+            strategy = cls(**params)
+            rsi = cache.rsi(strategy.period)
+            entries[:, j] = crossed_above(rsi, strategy.oversold)
+            exits[:, j] = crossed_below(rsi, strategy.overbought)
+        
+        return cls._signal_frames(df, entries, exits)
+    
+    def signal_state(self, df: pd.DataFrame) -> dict:
+        """涨跌幅平滑均值的递推状态（与 ta.momentum.rsi 的计算方式相同）"""
+        close = df['close'].to_numpy(dtype=float)
+        up, down = _directions(close, np.nan)
+        alpha = ewm_alpha(alpha=1 / self.period)
+        ewm = lambda values: pd.Series(values).ewm(
+            alpha=1 / self.period, min_periods=self.period, adjust=False
+        ).mean().to_numpy()
+        rsi = ta.momentum.rsi(df['close'], window=self.period).to_numpy(dtype=float)
+        return {
+            'up': EWMState.from_history(up, alpha, self.period, ewm(up)),
+            'down': EWMState.from_history(down, alpha, self.period, ewm(down)),
+            'close': close[-1] if len(close) else np.nan,
+            'rsi': rsi[-1] if len(rsi) else np.nan,
+        }
+    
+    def update_signals(self, state: dict, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """只计算新K线上的RSI并生成信号"""
+        close = df['close'].to_numpy(dtype=float)
+        up, down = _directions(close, state['close'])
+        emaup = state['up'].update(up)
+        emadn = state['down'].update(down)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = np.where(emadn == 0, 100, 100 - (100 / (1 + emaup / emadn)))
+        entries = crossed_above(rsi, self.oversold, (state['rsi'], self.oversold))
+        exits = crossed_below(rsi, self.overbought, (state['rsi'], self.overbought))
+        if len(close):
+            state['close'] = close[-1]
+            state['rsi'] = rsi[-1]
+        return entries, exits
+
+
+def _directions(close: np.ndarray, previous_close: float) -> Tuple[np.ndarray, np.ndarray]:
+    """上涨幅度和下跌幅度（与 ta 相同：close.diff() 的正部和负部，第一根为 0）"""
+    diff = close - append_previous(previous_close, close)
+    up = np.where(diff > 0, diff, 0.0)
+    down = -np.where(diff < 0, diff, 0.0)
+    return up, down
 
 
 # ==================== 使用示例 ====================
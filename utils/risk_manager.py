@@ -101,6 +101,10 @@ class RiskManager:
         """
         应用止损止盈规则到信号
         
+        注意：这里只用收盘价检查止损止盈，会忽略盘中的最高/最低价。
+        需要按盘中高低点成交（以及移动止损、限价入场）时，使用
+        backtest.simulator.EventDrivenSimulator 或 BacktestEngine.run_event_driven。
+        
         Args:
             df: 价格数据
             entries: 入场信号
@@ -206,7 +206,7 @@ class Visualizer:
     def plot_backtest_results(portfolio, df: pd.DataFrame):
         """
         绘制回测结果
-        包括权益曲线和回撤
+        包括权益曲线和回撤（portfolio 可以是 vectorbt 组合或 BacktestResult）
         """
         fig = make_subplots(
             rows=3, cols=1,
@@ -274,25 +274,39 @@ class Visualizer:
         对比多个策略的表现
         
         Args:
-            results_df: 策略对比结果DataFrame
+            results_df: 策略对比结果DataFrame（run_multiple_strategies 返回的数值表）
         """
-        import plotly.express as px
+        metrics = {
+            'total_return': ('总收益率 (%)', 100),
+            'sharpe_ratio': ('夏普比率', 1),
+            'max_drawdown': ('最大回撤 (%)', 100),
+            'win_rate': ('胜率 (%)', 100),
+        }
         
-        # 提取数值（去掉百分号等格式）
-        df = results_df.copy()
-        
-        # 创建子图
-        metrics = ['总收益率', '夏普比率', '最大回撤', '胜率']
+        # 同名策略用参数区分
+        labels = [
+            f"{name} {params}"
+            for name, params in zip(results_df['strategy_name'], results_df['strategy_params'])
+        ]
         
         fig = make_subplots(
             rows=2, cols=2,
-            subplot_titles=metrics
+            subplot_titles=[title for title, _ in metrics.values()]
         )
         
-        # 这里需要根据实际数据格式调整
-        # 简化版本：使用柱状图
-        print("\n策略对比可视化（简化版）:")
-        print(results_df)
+        for i, (col, (title, scale)) in enumerate(metrics.items()):
+            fig.add_trace(
+                go.Bar(x=labels, y=results_df[col] * scale, name=title),
+                row=i // 2 + 1, col=i % 2 + 1
+            )
+        
+        fig.update_layout(
+            height=800,
+            title_text="策略对比",
+            showlegend=False
+        )
+        
+        fig.show()
     
     @staticmethod
     def plot_parameter_optimization(results_df: pd.DataFrame, param1: str, param2: str):